@@ -0,0 +1,337 @@
+"""
+Benchmarks of scrapli_transfer_utils against emulated devices
+
+Runs `file_transfer` against local `DeviceEmulator` instances and writes the results as JSON, so
+runs of different releases (or tuning settings) can be compared:
+
+    python benchmarks/bench.py --output before.json
+    python benchmarks/bench.py --output after.json --compare before.json
+
+Emulators and transfers share the same process (and CPU), absolute numbers are only comparable
+between runs on the same machine with the same arguments.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone
+from importlib import metadata
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional
+
+from scrapli import AsyncScrapli
+
+from scrapli_transfer_utils.async_transfer.base import AsyncTransferFeature
+from scrapli_transfer_utils.bulk import bulk_file_transfer
+from scrapli_transfer_utils.dataclasses import BulkTransferSpec, TransferTuning
+from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
+from scrapli_transfer_utils.hashing import async_hash_file, hash_file
+
+# the device emulator lives with the tests, it is not part of the installed package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "tests"))
+from emulator import DeviceEmulator  # noqa: E402 pylint: disable=wrong-import-position
+
+MB = 1024 * 1024
+PLATFORMS = ["cisco_iosxe", "huawei_vrp"]
+
+
+def _create_file(directory: str, size: int) -> str:
+    file_name = os.path.join(directory, f"src_{size}.bin")
+    if not os.path.exists(file_name):
+        with open(file_name, "wb") as local_file:
+            for offset in range(0, size, MB):
+                local_file.write(os.urandom(min(MB, size - offset)))
+    return file_name
+
+
+def _emulator(args: argparse.Namespace, device_platform: str) -> DeviceEmulator:
+    return DeviceEmulator(
+        device_platform,
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+        flash_read_speed=args.flash_speed,
+        flash_write_speed=args.flash_speed,
+    )
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "median": statistics.median(values),
+        "min": min(values),
+        "max": max(values),
+    }
+
+
+async def _check_device_size(
+    transfer: AsyncTransferFeature, file_name: str, size: int
+) -> None:
+    """Make sure the device reports the size of the generated file (the get preflight uses it)"""
+    check_file = await transfer.check_device_file(await transfer._device_fs(), file_name)
+    if check_file.size != size:
+        raise RuntimeError(
+            f"Device reports {check_file.size} bytes for '{file_name}', generated {size} bytes"
+        )
+
+
+async def bench_throughput(args: argparse.Namespace, work_dir: str) -> List[Dict[str, Any]]:
+    """MB/s of the transfer phase for every platform, direction, file size and block size"""
+    results = []
+    for device_platform in args.platforms:
+        async with _emulator(args, device_platform) as device:
+            async with AsyncScrapli(**device.scrapli_kwargs(timeout_ops=300)) as conn:
+                transfer = AsyncSrapliTransferUtils(conn)
+                for size in args.sizes:
+                    src = _create_file(work_dir, int(size * MB))
+                    for block_size in args.block_sizes:
+                        tuning = TransferTuning(block_size=block_size)
+                        for operation in ("put", "get"):
+                            if operation == "put":
+                                file_src, file_dst = src, "image.bin"
+                            else:
+                                await _check_device_size(transfer, "image.bin", int(size * MB))
+                                file_src, file_dst = "image.bin", os.path.join(work_dir, "dst.bin")
+                            throughput = []
+                            for _ in range(args.repeat):
+                                result = await transfer.file_transfer(
+                                    operation, file_src, file_dst, overwrite=True, tuning=tuning
+                                )
+                                if not (result.transferred and result.verified):
+                                    raise RuntimeError(f"Transfer failed: {result}")
+                                throughput.append(result.throughput / MB)
+                            results.append(
+                                {
+                                    "platform": device_platform,
+                                    "operation": operation,
+                                    "size": int(size * MB),
+                                    "block_size": block_size,
+                                    "mb_per_s": _summary(throughput),
+                                }
+                            )
+                            print(
+                                f"throughput {device_platform} {operation} {size}MB "
+                                f"block {block_size}: {statistics.median(throughput):.1f} MB/s"
+                            )
+    return results
+
+
+async def bench_preflight(args: argparse.Namespace, work_dir: str) -> List[Dict[str, Any]]:
+    """Duration of a `file_transfer` call which finds the file already on the device"""
+    results = []
+    src = _create_file(work_dir, int(args.preflight_size * MB))
+    for device_platform in args.platforms:
+        async with _emulator(args, device_platform) as device:
+            async with AsyncScrapli(**device.scrapli_kwargs(timeout_ops=300)) as conn:
+                transfer = AsyncSrapliTransferUtils(conn)
+                await transfer.file_transfer("put", src, "image.bin")
+                await _check_device_size(transfer, "image.bin", int(args.preflight_size * MB))
+
+                durations = []
+                phases: Dict[str, List[float]] = {}
+                for _ in range(args.preflight_calls):
+                    start_time = monotonic()
+                    result = await transfer.file_transfer("put", src, "image.bin")
+                    durations.append(monotonic() - start_time)
+                    for phase, duration in vars(result.timings).items():
+                        phases.setdefault(phase, []).append(duration)
+
+        results.append(
+            {
+                "platform": device_platform,
+                "size": int(args.preflight_size * MB),
+                "calls": args.preflight_calls,
+                "seconds": _summary(durations),
+                "phases": {phase: statistics.median(values) for phase, values in phases.items()},
+            }
+        )
+        print(
+            f"preflight {device_platform}: {statistics.median(durations) * 1000:.1f} ms per call"
+        )
+    return results
+
+
+async def bench_hashing(args: argparse.Namespace, work_dir: str) -> List[Dict[str, Any]]:
+    """Peak of the memory allocated while hashing a local file"""
+    results = []
+    hash_functions: Dict[str, Callable[[str], Any]] = {
+        "hash_file": hash_file,
+        "async_hash_file": async_hash_file,
+    }
+    for size in args.sizes:
+        src = _create_file(work_dir, int(size * MB))
+        for name, hash_function in hash_functions.items():
+            tracemalloc.start()
+            start_time = monotonic()
+            file_hash = hash_function(src)
+            if asyncio.iscoroutine(file_hash):
+                await file_hash
+            duration = monotonic() - start_time
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append(
+                {
+                    "function": name,
+                    "size": int(size * MB),
+                    "peak_bytes": peak,
+                    "mb_per_s": size / duration if duration else 0.0,
+                }
+            )
+            print(f"hashing {name} {size}MB: peak {peak / 1024:.0f} KiB")
+    return results
+
+
+async def bench_scaling(args: argparse.Namespace, work_dir: str) -> List[Dict[str, Any]]:
+    """Bulk transfer of one file to a growing number of emulated devices"""
+    results = []
+    src = _create_file(work_dir, int(args.scaling_size * MB))
+    for device_platform in args.platforms:
+        for device_count in args.device_counts:
+            emulators = [_emulator(args, device_platform) for _ in range(device_count)]
+            try:
+                await asyncio.gather(*(device.start() for device in emulators))
+                devices = [device.scrapli_kwargs(timeout_ops=300) for device in emulators]
+                stats = await bulk_file_transfer(
+                    devices,
+                    BulkTransferSpec("put", src, "image.bin"),
+                    max_concurrency=device_count,
+                )
+            finally:
+                await asyncio.gather(*(device.stop() for device in emulators))
+
+            results.append(
+                {
+                    "platform": device_platform,
+                    "devices": device_count,
+                    "size": int(args.scaling_size * MB),
+                    "seconds": stats.duration,
+                    "transferred": stats.transferred,
+                    "failed": stats.failed,
+                    "devices_per_s": device_count / stats.duration if stats.duration else 0.0,
+                    "mb_per_s": stats.transferred * args.scaling_size / stats.duration
+                    if stats.duration
+                    else 0.0,
+                }
+            )
+            print(
+                f"scaling {device_platform} {device_count} devices: {stats.duration:.2f}s, "
+                f"{stats.failed} failed"
+            )
+    return results
+
+
+BENCHMARKS = {
+    "throughput": bench_throughput,
+    "preflight": bench_preflight,
+    "hashing": bench_hashing,
+    "scaling": bench_scaling,
+}
+
+
+def _version(package: str) -> Optional[str]:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _raise_open_files_limit() -> None:
+    # every emulated device needs a few sockets on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    """Print the change of the median values of two benchmark runs"""
+    keys = {
+        "throughput": ("platform", "operation", "size", "block_size"),
+        "preflight": ("platform", "size"),
+        "hashing": ("function", "size"),
+        "scaling": ("platform", "devices", "size"),
+    }
+    values = {
+        "throughput": lambda result: result["mb_per_s"]["median"],
+        "preflight": lambda result: result["seconds"]["median"],
+        "hashing": lambda result: result["peak_bytes"],
+        "scaling": lambda result: result["seconds"],
+    }
+    for benchmark, key_fields in keys.items():
+        old_results = {
+            tuple(result[key] for key in key_fields): result
+            for result in old["results"].get(benchmark, [])
+        }
+        for result in new["results"].get(benchmark, []):
+            key = tuple(result[key] for key in key_fields)
+            if key not in old_results:
+                continue
+            old_value, new_value = values[benchmark](old_results[key]), values[benchmark](result)
+            change = (new_value / old_value - 1) * 100 if old_value else 0.0
+            print(f"{benchmark} {key}: {old_value:.4g} -> {new_value:.4g} ({change:+.1f}%)")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "benchmarks", nargs="*", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})"
+    )
+    parser.add_argument("--output", default="benchmark.json", help="JSON result file")
+    parser.add_argument("--compare", help="JSON result file of an earlier run")
+    parser.add_argument("--platforms", nargs="+", choices=PLATFORMS, default=PLATFORMS)
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1, 16, 64], help="MB")
+    parser.add_argument(
+        "--block-sizes", nargs="+", type=int, default=[16384, 65536, 262144], help="bytes"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--preflight-calls", type=int, default=20)
+    parser.add_argument("--preflight-size", type=float, default=16, help="MB")
+    parser.add_argument(
+        "--device-counts", nargs="+", type=int, default=[1, 10, 50, 100, 250, 500]
+    )
+    parser.add_argument("--scaling-size", type=float, default=1, help="MB")
+    parser.add_argument("--latency", type=float, default=0.0, help="emulated RTT in seconds")
+    parser.add_argument("--bandwidth", type=float, help="emulated link in bytes/s")
+    parser.add_argument("--flash-speed", type=float, help="emulated flash in bytes/s")
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    return args
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    _raise_open_files_limit()
+
+    report: Dict[str, Any] = {
+        "metadata": {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "scrapli_transfer_utils": _version("scrapli-transfer-utils"),
+            "scrapli": _version("scrapli"),
+            "asyncssh": _version("asyncssh"),
+            "python": sys.version.split()[0],
+            "machine": platform.platform(),
+            "cpus": os.cpu_count(),
+            "arguments": {key: value for key, value in vars(args).items() if key != "compare"},
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="scrapli_bench_") as work_dir:
+        for name in args.benchmarks or BENCHMARKS:
+            report["results"][name] = await BENCHMARKS[name](args, work_dir)
+
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as compare_file:
+            compare(json.load(compare_file), report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
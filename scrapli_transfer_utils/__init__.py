@@ -1,7 +1,27 @@
 """scrapli_transfer_utils"""
-from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
+from importlib import import_module
+from typing import Any
 
-__all__ = (
-    "AsyncSrapliTransferUtils",
-)
+# imported on first use, so `import scrapli_transfer_utils` does not load asyncssh and all
+# platforms
+_EXPORTS = {
+    "AsyncBulkFileTransfer": "scrapli_transfer_utils.bulk",
+    "AsyncSrapliTransferUtils": "scrapli_transfer_utils.factory",
+    "BandwidthLimiter": "scrapli_transfer_utils.ratelimit",
+    "HashingService": "scrapli_transfer_utils.hashing",
+    "ProgressStream": "scrapli_transfer_utils.progress",
+    "bulk_file_transfer": "scrapli_transfer_utils.bulk",
+    "register_platform": "scrapli_transfer_utils.registry",
+    "SyncTransferUtils": "scrapli_transfer_utils.sync",
+    "TokenBucket": "scrapli_transfer_utils.ratelimit",
+}
 
+__all__ = tuple(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
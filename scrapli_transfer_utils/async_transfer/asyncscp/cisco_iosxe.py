@@ -1,56 +1,178 @@
 """scrapli_scp.asyncssh.cisco"""
-import asyncio
 import re
-from time import time
-from typing import Any, List, Optional, Union, Literal, Callable
+from functools import partial
+from typing import Any, Callable, Dict, Literal, Optional, Sequence, Tuple, Union
 
 import asyncssh
-from asyncssh import connect, scp
 
+from scrapli_transfer_utils.async_transfer.asyncscp.engine import scp_get, scp_put
 from scrapli_transfer_utils.async_transfer.base import AsyncTransferFeature
-from scrapli_transfer_utils.dataclasses import (
-    FileCheckResult,
-    SCPConnectionParameterType,
-)
+from scrapli_transfer_utils.dataclasses import FileCheckResult, TransferTuning
+from scrapli_transfer_utils.hashing import StreamingDigest
+from scrapli_transfer_utils.local import LocalSink, LocalSource
 from scrapli_transfer_utils.logging import logger
+from scrapli_transfer_utils.ratelimit import Throttle
 
 
 class AsyncSCPIOSXE(AsyncTransferFeature):
+    # `verify /sha512` exists since IOS-XE 16.x, MD5 is cheaper on the device CPU
+    hash_algorithms = ("md5", "sha512")
+    # the SCP channel closing before the copy completed (e.g. a reset SSH session)
+    retryable_errors = AsyncTransferFeature.retryable_errors + (asyncssh.SFTPConnectionLost,)
+
     def __init__(self, *args: Any, **kwargs: Any):
-        self._scp_to_clean: List[str] = []
         super().__init__(*args, **kwargs)
 
+    def _hash_command(self, device_fs: Optional[str], file_name: str) -> str:
+        return f"verify /{self.hash_algorithm} {device_fs}{file_name}"
+
     async def check_device_file(
         self, device_fs: Optional[str], file_name: str
     ) -> FileCheckResult:
-        logger.debug(f"Checking {device_fs}{file_name} MD5 hash..")
+        if self.device_hash_cache is not None:
+            return await self._check_device_file_cached(device_fs, file_name)
+
+        logger.debug(f"Checking {device_fs}{file_name} {self.hash_algorithm} hash..")
         outputs = await self.conn.send_commands(
             [
-                f"verify /md5 {device_fs}{file_name}",
+                self._hash_command(device_fs, file_name),
                 f"dir {device_fs}{file_name}",
                 rf"dir {device_fs} | i free\)$",
             ],
             timeout_ops=300,
         )
-        m = re.search(r"^verify.*=\s*(?P<hash>\w{32})", outputs[0].result, re.M)
+        file_hash = self._parse_hash(outputs[0].result, file_name)
+        file_size, _ = self._parse_dir(outputs[1].result, file_name)
+        free_space = self._parse_free(outputs[2].result)
+        return FileCheckResult(hash=file_hash, size=file_size, free=free_space)
+
+    async def _check_device_file_cached(
+        self, device_fs: Optional[str], file_name: str
+    ) -> FileCheckResult:
+        """
+        Same as `check_device_file`, but only runs `verify` if the hash is not cached or the
+        size/timestamp of the file changed since it was cached
+        """
+        outputs = await self.conn.send_commands(
+            [
+                f"dir {device_fs}{file_name}",
+                rf"dir {device_fs} | i free\)$",
+            ]
+        )
+        file_size, timestamp = self._parse_dir(outputs[0].result, file_name)
+        free_space = self._parse_free(outputs[1].result)
+        if not file_size and not timestamp:
+            # file does not exist, nothing to hash
+            return FileCheckResult(hash="", size=0, free=free_space)
+
+        file_hash = self.device_hash_cache.get(
+            self.conn.host, device_fs, file_name, file_size, timestamp, self.hash_algorithm
+        )
+        if file_hash:
+            logger.debug(f"'{file_name}' hash found in cache")
+            return FileCheckResult(hash=file_hash, size=file_size, free=free_space)
+
+        logger.debug(f"Checking {device_fs}{file_name} {self.hash_algorithm} hash..")
+        output = await self.conn.send_command(
+            self._hash_command(device_fs, file_name), timeout_ops=300
+        )
+        file_hash = self._parse_hash(output.result, file_name)
+        self.device_hash_cache.set(
+            self.conn.host,
+            device_fs,
+            file_name,
+            file_size,
+            timestamp,
+            file_hash,
+            self.hash_algorithm,
+        )
+        return FileCheckResult(hash=file_hash, size=file_size, free=free_space)
+
+    async def check_device_files(
+        self, device_fs: Optional[str], file_names: Sequence[str]
+    ) -> Dict[str, FileCheckResult]:
+        """
+        Same as `check_device_file` for many files: sizes and free space are taken from one `dir`
+        of the filesystem, only `verify` runs per file (if the hash is not cached)
+        """
+        if any("/" in file_name for file_name in file_names):
+            # files in subdirectories are not in the listing of the filesystem
+            return await super().check_device_files(device_fs, file_names)
+
+        output = await self.conn.send_command(f"dir {device_fs}")
+        free_space = self._parse_free(output.result)
+
+        results: Dict[str, FileCheckResult] = {}
+        for file_name in file_names:
+            file_size, timestamp = self._parse_dir(output.result, file_name)
+            if not file_size and not timestamp:
+                # file does not exist, nothing to hash
+                results[file_name] = FileCheckResult(hash="", size=0, free=free_space)
+                continue
+
+            file_hash = None
+            if self.device_hash_cache is not None:
+                file_hash = self.device_hash_cache.get(
+                    self.conn.host, device_fs, file_name, file_size, timestamp, self.hash_algorithm
+                )
+            if not file_hash:
+                logger.debug(f"Checking {device_fs}{file_name} {self.hash_algorithm} hash..")
+                hash_output = await self.conn.send_command(
+                    self._hash_command(device_fs, file_name), timeout_ops=300
+                )
+                file_hash = self._parse_hash(hash_output.result, file_name)
+                if self.device_hash_cache is not None:
+                    self.device_hash_cache.set(
+                        self.conn.host,
+                        device_fs,
+                        file_name,
+                        file_size,
+                        timestamp,
+                        file_hash,
+                        self.hash_algorithm,
+                    )
+            results[file_name] = FileCheckResult(hash=file_hash, size=file_size, free=free_space)
+        return results
+
+    @staticmethod
+    def _parse_hash(output: str, file_name: str) -> str:
+        # 32 (MD5) up to 128 (SHA-512) hex digits
+        m = re.search(r"^verify.*=\s*(?P<hash>[0-9a-fA-F]{32,128})", output, re.M)
         if m:
             file_hash = m.group("hash")
             logger.debug(f"'{file_name}' hash is '{file_hash}'")
-        else:
-            file_hash = ""
+            return file_hash
+        return ""
+
+    @staticmethod
+    def _parse_dir(output: str, file_name: str) -> Tuple[int, str]:
+        """
+        Parse size and timestamp of a file from `dir` output
+
+        Returns:
+            size in bytes and timestamp as printed by the device (empty if the device has none)
+        """
         m = re.search(
-            r"^\s*\d+\s*[rw-]+\s*(?P<size>\d+).*" + file_name, outputs[1].result, re.M
+            r"^\s*\d+\s*[rw-]+\s*(?P<size>\d+)\s*(?P<timestamp>.*?)\s+"
+            + re.escape(file_name)
+            + r"\s*$",
+            output,
+            re.M,
         )
+        if not m:
+            return 0, ""
+        timestamp = m.group("timestamp")
+        if not re.search(r"\d", timestamp):
+            # e.g. "<no date>"
+            timestamp = ""
+        return int(m.group("size")), timestamp
+
+    @staticmethod
+    def _parse_free(output: str) -> int:
+        m = re.search(r"\((?P<free>\d+) bytes free\)", output, re.M)
         if m:
-            file_size = int(m.group("size"))
-        else:
-            file_size = 0
-        m = re.search(r"\((?P<free>\d+) bytes free\)", outputs[2].result, re.M)
-        if m:
-            free_space = int(m.group("free"))
-        else:
-            free_space = 0
-        return FileCheckResult(hash=file_hash, size=file_size, free=free_space)
+            return int(m.group("free"))
+        return 0
 
     async def _ensure_transfer_capability(  # noqa: C901
         self, force: Optional[bool] = False
@@ -127,14 +249,18 @@ class AsyncSCPIOSXE(AsyncTransferFeature):
             return True
 
     async def _cleanup_after_transfer(self) -> None:
-        # we assume that _scp_to_clean was populated by a previously called _ensure_scp_capability
-        if not self._scp_to_clean:
+        # we assume that transfer_feature_to_clean was populated by a previously called
+        # _ensure_transfer_capability
+        if not self.transfer_feature_to_clean:
             return
-        await self.conn.send_configs(self._scp_to_clean)
+        await self.conn.send_configs(self.transfer_feature_to_clean)
+
+    async def _acquire_privilege(self) -> None:
+        await self.conn.acquire_priv(self.conn.default_desired_privilege_level)
 
     async def _get_device_fs(self) -> Optional[str]:
         #  Enable mode needed
-        await self.conn.acquire_priv(self.conn.default_desired_privilege_level)
+        await self._acquire_privilege()
         output = await self.conn.send_command("dir | i Directory of (.*)")
         m = re.match("Directory of (?P<fs>.*)", output.result, re.M)
         if m:
@@ -145,10 +271,11 @@ class AsyncSCPIOSXE(AsyncTransferFeature):
     async def _async_file_transfer(  # noqa: C901
         self,
         operation: Literal["get", "put"],
-        src: str,
-        dst: str,
+        src: Union[str, LocalSource],
+        dst: Union[str, LocalSink],
         progress_handler: Optional[Callable] = None,
-        prevent_timeout: Optional[float] = None,
+        tuning: Optional[TransferTuning] = None,
+        resume: bool = False,
     ) -> bool:
         """
         SCP a file from device to localhost
@@ -158,66 +285,33 @@ class AsyncSCPIOSXE(AsyncTransferFeature):
             src: Source file name
             dst: Destination file name
             progress_handler: scp callback function to be able to follow the copy progress
-            prevent_timeout: interval in seconds when we send an empty command to keep SSH channel
-                             up, 0 to turn it off,
-                             default is same as `timeout_ops`
+            tuning: block size and SSH window/packet size of the SCP channel
+            resume: not supported by SCP, the file is always copied completely
 
         Returns:
-            bool: True on success
-        """
-        result = False
+            bool: True on success, False if the device reported an SCP error
 
-        start_time = 0.0
-        if prevent_timeout is None:
-            prevent_timeout = self.conn.timeout_ops
-
-        async def _prevent_timeout():
-            """Send enter to idle SSH channel to prevent timing out while transferring file"""
-            logger.debug("Sending keepalive to device")
-            self.conn.transport.write(self.keepalive_pattern)
-
-        def timed_progress_handler(srcpath, dstpath, copied, total):
-            """Progress handler wrapper which prevents timeouts while file transfer"""
-            nonlocal start_time
-
-            now = time()
-            if 0 < prevent_timeout <= (now - start_time):
-                logger.debug("Preventing timeout")
-                asyncio.ensure_future(_prevent_timeout())
-                start_time = now
-
-            # call original handler if specified
-            if progress_handler:
-                progress_handler(srcpath, dstpath, copied, total)
-
-        # noinspection PyProtectedMember
-        scp_options = SCPConnectionParameterType(
-            username=self.conn.auth_username,
-            password=self.conn.auth_password,
-            port=self.conn.port,
-            host=self.conn.host,
-            options=self.conn.transport.session._options,  # noqa: W0212
-        )
+        Raises:
+            SFTPConnectionLost: if the SCP channel closed before the copy completed
+        """
         result = False
         try:
-            async with connect(**scp_options) as scp_conn:
-                start_time = time()
-                if operation == "get":
-                    await scp(
-                        (scp_conn, src),
-                        dst,
-                        progress_handler=timed_progress_handler,
-                        block_size=65536,
-                    )
-                elif operation == "put":
-                    await scp(
-                        src,
-                        (scp_conn, dst),
-                        progress_handler=timed_progress_handler,
-                        block_size=65536,
-                    )
-                else:
-                    raise ValueError(f"Invalid operation: {operation}")
+            self.transferred_bytes = await self._run_on_ssh_connection(
+                lambda scp_conn: self._scp(
+                    scp_conn,
+                    operation,
+                    src,
+                    dst,
+                    progress_handler,
+                    tuning,
+                    self.transfer_digest,
+                    self.transfer_throttle,
+                ),
+                tuning,
+            )
+        except asyncssh.SFTPConnectionLost as e:
+            logger.warning(f"SCP connection lost: {e}")
+            raise e
         except asyncssh.SFTPError as e:
             result = False
             logger.warning(f"SCP error: {e}")
@@ -229,3 +323,49 @@ class AsyncSCPIOSXE(AsyncTransferFeature):
             result = True
 
         return result
+
+    @staticmethod
+    async def _scp(
+        scp_conn: asyncssh.SSHClientConnection,
+        operation: Literal["get", "put"],
+        src: Union[str, LocalSource],
+        dst: Union[str, LocalSink],
+        progress_handler: Optional[Callable],
+        tuning: Optional[TransferTuning] = None,
+        digest: Optional[StreamingDigest] = None,
+        throttle: Optional[Throttle] = None,
+    ) -> int:
+        """
+        Copy a file with SCP over an SSH connection
+
+        Args:
+            scp_conn: SSH connection to the device, a new channel is opened for SCP
+            operation: 'get' or 'put' files from or to the device
+            src: Source file name
+            dst: Destination file name
+            progress_handler: scp callback function
+            tuning: block size and SSH window/packet size of the SCP channel
+            digest: fed with the data received by 'get'
+            throttle: bandwidth limit of the copy
+
+        Returns:
+            int: number of bytes copied
+        """
+        tuning = tuning or TransferTuning()
+        if operation == "get":
+            scp_copy = partial(scp_get, digest=digest)
+        elif operation == "put":
+            scp_copy = scp_put
+        else:
+            raise ValueError(f"Invalid operation: {operation}")
+
+        return await scp_copy(
+            scp_conn,
+            src,
+            dst,
+            block_size=tuning.block_size,
+            window=tuning.window,
+            max_pktsize=tuning.max_pktsize,
+            progress_handler=progress_handler,
+            throttle=throttle,
+        )
@@ -0,0 +1,191 @@
+"""scrapli_transfer_utils.async_transfer.asyncscp.engine"""
+import os
+import re
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import asyncssh
+from asyncssh import SSHClientConnection, SSHReader, SSHWriter
+
+from scrapli_transfer_utils.hashing import StreamingDigest
+from scrapli_transfer_utils.local import LocalSink, LocalSource, open_sink, open_source
+from scrapli_transfer_utils.logging import logger
+from scrapli_transfer_utils.ratelimit import Throttle
+
+DEFAULT_SCP_BLOCK_SIZE = 65536
+
+SCPProgressHandler = Optional[Callable[[str, str, int, int], None]]
+
+
+def _scp_error(reason: str) -> asyncssh.SFTPError:
+    if "No such file" in reason or "not found" in reason.lower():
+        return asyncssh.SFTPNoSuchFile(reason)
+    if "Permission denied" in reason:
+        return asyncssh.SFTPPermissionDenied(reason)
+    if "No space" in reason or "Not enough space" in reason:
+        return asyncssh.SFTPNoSpaceOnFilesystem(reason)
+    return asyncssh.SFTPFailure(reason)
+
+
+async def _await_response(reader: SSHReader) -> None:
+    """Wait for an SCP OK and raise the error sent by the device instead"""
+    result = await reader.read(1)
+    if result == b"\0":
+        return
+    if not result:
+        raise asyncssh.SFTPConnectionLost("Connection lost")
+    reason = await reader.readline()
+    if result not in b"\x01\x02":
+        reason = result + reason
+    raise _scp_error(reason.decode("utf-8", "replace").strip())
+
+
+async def _open_scp_channel(
+    conn: SSHClientConnection,
+    command: str,
+    window: Optional[int],
+    max_pktsize: Optional[int],
+) -> Tuple[SSHWriter, SSHReader]:
+    channel_kwargs: Dict[str, Any] = {}
+    if window:
+        channel_kwargs["window"] = window
+    if max_pktsize:
+        channel_kwargs["max_pktsize"] = max_pktsize
+    logger.debug(f"Starting remote '{command}' ({channel_kwargs})")
+    writer, reader, _ = await conn.open_session(command, encoding=None, **channel_kwargs)
+    return writer, reader
+
+
+async def _close_scp_channel(writer: SSHWriter) -> None:
+    writer.close()
+    await writer.wait_closed()
+
+
+async def scp_put(
+    conn: SSHClientConnection,
+    src: Union[str, LocalSource],
+    dst: str,
+    block_size: int = DEFAULT_SCP_BLOCK_SIZE,
+    window: Optional[int] = None,
+    max_pktsize: Optional[int] = None,
+    progress_handler: SCPProgressHandler = None,
+    throttle: Optional[Throttle] = None,
+) -> int:
+    """
+    Upload a local file (or in-memory data) with the SCP protocol (`scp -t`)
+
+    Args:
+        conn: SSH connection to the device, a new channel is opened on it
+        src: local file name or LocalSource
+        dst: remote file name
+        block_size: number of bytes read from the local file and written to the channel at once
+        window: SSH receive window of the channel, `None` to use the connection default
+        max_pktsize: maximum SSH packet size of the channel, `None` to use the connection default
+        progress_handler: called with (src, dst, bytes sent, total) after every block
+        throttle: awaited with the size of every block before it is sent (bandwidth limit)
+
+    Returns:
+        int: number of bytes sent
+
+    Raises:
+        SFTPError: if the device reports an error
+    """
+    sent = 0
+    async with open_source(src) as source:
+        total = source.size
+        writer, reader = await _open_scp_channel(conn, f"scp -t {dst}", window, max_pktsize)
+        try:
+            await _await_response(reader)
+            writer.write(f"C0644 {total} {os.path.basename(dst)}\n".encode("utf-8"))
+            await _await_response(reader)
+
+            while sent < total:
+                data = await source.read_at(sent, min(block_size, total - sent))
+                if not data:
+                    raise asyncssh.SFTPFailure(f"Unexpected EOF reading '{src}'")
+                if throttle is not None:
+                    await throttle(len(data))
+                writer.write(data)
+                await writer.drain()
+                sent += len(data)
+                if progress_handler:
+                    progress_handler(str(src), dst, sent, total)
+
+            writer.write(b"\0")
+            await _await_response(reader)
+        finally:
+            await _close_scp_channel(writer)
+
+    if progress_handler and total == 0:
+        progress_handler(str(src), dst, 0, 0)
+    return sent
+
+
+async def scp_get(
+    conn: SSHClientConnection,
+    src: str,
+    dst: Union[str, LocalSink],
+    block_size: int = DEFAULT_SCP_BLOCK_SIZE,
+    window: Optional[int] = None,
+    max_pktsize: Optional[int] = None,
+    progress_handler: SCPProgressHandler = None,
+    digest: Optional[StreamingDigest] = None,
+    throttle: Optional[Throttle] = None,
+) -> int:
+    """
+    Download a remote file with the SCP protocol (`scp -f`)
+
+    Args:
+        conn: SSH connection to the device, a new channel is opened on it
+        src: remote file name
+        dst: local file name or LocalSink
+        block_size: maximum number of bytes read from the channel at once
+        window: SSH receive window of the channel, `None` to use the connection default
+        max_pktsize: maximum SSH packet size of the channel, `None` to use the connection default
+        progress_handler: called with (src, dst, bytes received, total) after every block
+        digest: fed with the received data
+        throttle: awaited with the size of every received block (bandwidth limit), the SSH
+                  window stops the device while we wait
+
+    Returns:
+        int: number of bytes received
+
+    Raises:
+        SFTPError: if the device reports an error
+    """
+    received = 0
+    writer, reader = await _open_scp_channel(conn, f"scp -f {src}", window, max_pktsize)
+    try:
+        writer.write(b"\0")
+        request = await reader.readline()
+        if not request:
+            raise asyncssh.SFTPConnectionLost("Connection lost")
+        if request[:1] in b"\x01\x02":
+            raise _scp_error(request[1:].decode("utf-8", "replace").strip())
+        m = re.match(rb"C[0-7]{4} (?P<size>\d+) ", request)
+        if not m:
+            raise asyncssh.SFTPBadMessage(f"Unexpected SCP request: {request!r}")
+        total = int(m.group("size"))
+
+        writer.write(b"\0")
+        async with open_sink(dst) as sink:
+            while received < total:
+                data = await reader.read(min(block_size, total - received))
+                if not data:
+                    raise asyncssh.SFTPConnectionLost("Connection lost")
+                await sink.write_at(received, data)
+                if digest is not None:
+                    digest.update_at(received, data)
+                if throttle is not None:
+                    await throttle(len(data))
+                received += len(data)
+                if progress_handler:
+                    progress_handler(src, str(dst), received, total)
+
+        await _await_response(reader)
+        writer.write(b"\0")
+    finally:
+        await _close_scp_channel(writer)
+
+    if progress_handler and total == 0:
+        progress_handler(src, str(dst), 0, 0)
+    return received
@@ -0,0 +1,368 @@
+"""scrapli_transfer_utils.async_transfer.asyncsftp.engine"""
+import asyncio
+import os
+from contextlib import AsyncExitStack
+from time import monotonic
+from typing import Callable, Dict, List, Literal, Optional, Set, Union
+
+import asyncssh
+from asyncssh import SFTPClient, SFTPClientFile
+
+from scrapli_transfer_utils.dataclasses import TransferTuning
+from scrapli_transfer_utils.exceptions import (
+    ScrapliTransferError,
+    TransferConnectionError,
+    TransferFileNotFoundError,
+    TransferNoSpaceError,
+    TransferPermissionError,
+)
+from scrapli_transfer_utils.hashing import StreamingDigest
+from scrapli_transfer_utils.local import LocalSink, LocalSource, open_sink, open_source
+from scrapli_transfer_utils.logging import logger
+from scrapli_transfer_utils.ratelimit import Throttle
+
+SFTPProgressHandler = Optional[Callable[[str, str, int, int], None]]
+
+# bytes compared at the start and at the end of a partial file before resuming it
+DEFAULT_RESUME_VERIFY_SIZE = TransferTuning.resume_verify_size
+# bytes of a partial file compared with the source at once when all of it is compared
+RESUME_COMPARE_BLOCK_SIZE = 1024 * 1024
+
+
+def transfer_error(
+    exc: Exception, operation: Literal["get", "put"], src: str, dst: str
+) -> ScrapliTransferError:
+    """
+    Convert an SFTP or local I/O error to a structured transfer error
+
+    Args:
+        exc: original exception
+        operation: 'get' or 'put'
+        src: source file name
+        dst: destination file name
+
+    Returns:
+        ScrapliTransferError (or subclass)
+    """
+    if isinstance(exc, asyncssh.SFTPError):
+        reason, code = exc.reason, exc.code
+    elif isinstance(exc, OSError):
+        reason, code = exc.strerror or str(exc), exc.errno
+    else:
+        reason, code = str(exc), None
+
+    if isinstance(exc, (asyncssh.SFTPNoSuchFile, FileNotFoundError)):
+        error_class = TransferFileNotFoundError
+    elif isinstance(exc, (asyncssh.SFTPPermissionDenied, PermissionError)):
+        error_class = TransferPermissionError
+    elif isinstance(exc, asyncssh.SFTPNoSpaceOnFilesystem):
+        error_class = TransferNoSpaceError
+    elif isinstance(exc, (asyncssh.SFTPConnectionLost, asyncssh.DisconnectError, ConnectionError)):
+        error_class = TransferConnectionError
+    else:
+        error_class = ScrapliTransferError
+    return error_class(operation, src, dst, reason, code)
+
+
+class AutoTuner:
+    """
+    Adjust the SFTP pipeline while the first blocks are transferred
+
+    As long as the replies of a full pipeline arrive about as fast as the quickest round trip
+    seen, the link is not filled yet: first the number of requests in flight is doubled, then
+    the block size. Tuning stops once replies queue up (the link is full), the limits are
+    reached or after `max_rounds` adjustments.
+    """
+
+    def __init__(self, tuning: TransferTuning, max_block_size: int, max_rounds: int = 8):
+        """
+        Args:
+            tuning: initial settings and limits
+            max_block_size: largest block size the SFTP server accepts
+            max_rounds: maximum number of adjustments
+        """
+        self.block_size = tuning.block_size
+        self.max_requests = tuning.max_requests
+        self._max_requests_limit = tuning.max_auto_requests
+        self._max_block_size = min(tuning.max_auto_block_size, max_block_size)
+        self._rounds_left = max_rounds if tuning.auto_tune else 0
+        self._min_rtt = float("inf")
+        self._latencies: List[float] = []
+
+    def request_done(self, latency: float) -> None:
+        """
+        Account a finished request
+
+        Args:
+            latency: seconds between sending the request and receiving the reply
+
+        Returns:
+            None
+        """
+        if not self._rounds_left:
+            return
+        self._min_rtt = min(self._min_rtt, latency)
+        self._latencies.append(latency)
+        if len(self._latencies) < self.max_requests:
+            return
+
+        average = sum(self._latencies) / len(self._latencies)
+        self._latencies = []
+        self._rounds_left -= 1
+        if average > 2 * self._min_rtt:
+            # replies are queueing up, the pipeline fills the link
+            self._rounds_left = 0
+        elif self.max_requests < self._max_requests_limit:
+            self.max_requests = min(self.max_requests * 2, self._max_requests_limit)
+        elif self.block_size < self._max_block_size:
+            self.block_size = min(self.block_size * 2, self._max_block_size)
+        else:
+            self._rounds_left = 0
+
+        logger.debug(
+            f"SFTP auto tune: rtt {self._min_rtt * 1000:.1f}ms, average {average * 1000:.1f}ms, "
+            f"max_requests {self.max_requests}, block_size {self.block_size}"
+        )
+
+
+async def _wait_first(pending: Set[asyncio.Task]) -> Set[asyncio.Task]:
+    """Wait for at least one request to finish and raise its error, if any"""
+    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    for task in done:
+        task.result()
+    return pending
+
+
+async def _cancel(pending: Set[asyncio.Task]) -> None:
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _read_remote(remote_file: SFTPClientFile, offset: int, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = await remote_file.read(size - len(data), offset + len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+async def sftp_resume_offset(
+    sftp: SFTPClient,
+    operation: Literal["get", "put"],
+    src: str,
+    dst: str,
+    verify_size: Optional[int] = DEFAULT_RESUME_VERIFY_SIZE,
+) -> int:
+    """
+    Find the offset an interrupted transfer can continue from
+
+    The destination file is taken as a partial copy of the source if it is shorter than the
+    source and matches the source at the same offsets. Only the first and last `verify_size`
+    bytes of the prefix are compared (the remote side is read back for that): a partial file
+    differing in the middle is resumed and fails the hash verification after the transfer.
+    `verify_size=None` compares the whole prefix instead.
+
+    Args:
+        sftp: SFTP client session
+        operation: 'get' or 'put'
+        src: source file name (remote for 'get', local for 'put')
+        dst: destination file name (local for 'get', remote for 'put')
+        verify_size: compare only this many bytes at the start and at the end of the prefix,
+                     `None` to compare the whole prefix
+
+    Returns:
+        int: offset to continue from, `0` if the transfer needs to start over
+    """
+    try:
+        if operation == "get":
+            src_size = (await sftp.stat(src)).size or 0
+            dst_size = os.path.getsize(dst)
+        else:
+            src_size = os.path.getsize(src)
+            dst_size = (await sftp.stat(dst)).size or 0
+    except (asyncssh.SFTPNoSuchFile, FileNotFoundError):
+        return 0
+
+    if not 0 < dst_size < src_size:
+        return 0
+
+    if verify_size is None:
+        windows = [
+            (offset, min(RESUME_COMPARE_BLOCK_SIZE, dst_size - offset))
+            for offset in range(0, dst_size, RESUME_COMPARE_BLOCK_SIZE)
+        ]
+    else:
+        windows = [
+            (offset, min(verify_size, dst_size - offset))
+            for offset in sorted({0, max(dst_size - verify_size, 0)})
+        ]
+
+    local_name, remote_name = (dst, src) if operation == "get" else (src, dst)
+    async with AsyncExitStack() as stack:
+        remote_file = await stack.enter_async_context(sftp.open(remote_name, "rb", encoding=None))
+        local_file = stack.enter_context(open(local_name, "rb"))
+        for offset, size in windows:
+            local_file.seek(offset)
+            if local_file.read(size) != await _read_remote(remote_file, offset, size):
+                logger.warning(
+                    f"Partial '{dst}' does not match '{src}' at offset {offset}, starting over"
+                )
+                return 0
+
+    logger.info(f"Resuming {operation} of '{src}' as '{dst}' at {dst_size}/{src_size} bytes")
+    return dst_size
+
+
+async def sftp_put(
+    sftp: SFTPClient,
+    src: Union[str, LocalSource],
+    dst: str,
+    tuning: Optional[TransferTuning] = None,
+    progress_handler: SFTPProgressHandler = None,
+    offset: int = 0,
+    throttle: Optional[Throttle] = None,
+) -> int:
+    """
+    Upload a local file (or in-memory data) with several SFTP write requests in flight
+
+    Args:
+        sftp: SFTP client session
+        src: local file name or LocalSource
+        dst: remote file name
+        tuning: block size, requests in flight and auto tuning
+        progress_handler: called with (src, dst, bytes written, total) after every acknowledged
+                          block
+        offset: continue an interrupted upload from this offset (see `sftp_resume_offset`),
+                the remote file is not truncated then
+        throttle: awaited with the size of every block before it is sent (bandwidth limit)
+
+    Returns:
+        int: number of bytes written (including the resumed prefix)
+    """
+    tuning = tuning or TransferTuning()
+    tuner = AutoTuner(tuning, sftp.limits.max_write_len)
+    written = offset
+    pending: Set[asyncio.Task] = set()
+
+    async def _write(remote_file: SFTPClientFile, data: bytes, offset: int) -> None:
+        nonlocal written
+        start_time = monotonic()
+        await remote_file.write(data, offset)
+        tuner.request_done(monotonic() - start_time)
+        written += len(data)
+        if progress_handler:
+            progress_handler(str(src), dst, written, total)
+
+    async with open_source(src) as source:
+        total = source.size
+        async with sftp.open(
+            dst, "r+b" if offset else "wb", encoding=None, block_size=tuning.max_auto_block_size
+        ) as remote_file:
+            try:
+                while True:
+                    data = await source.read_at(offset, tuner.block_size)
+                    if not data:
+                        break
+                    while len(pending) >= tuner.max_requests:
+                        pending = await _wait_first(pending)
+                    if throttle is not None:
+                        await throttle(len(data))
+                    pending.add(asyncio.create_task(_write(remote_file, data, offset)))
+                    offset += len(data)
+                while pending:
+                    pending = await _wait_first(pending)
+            finally:
+                await _cancel(pending)
+
+    if progress_handler and total == 0:
+        progress_handler(str(src), dst, 0, 0)
+    return written
+
+
+async def sftp_get(
+    sftp: SFTPClient,
+    src: str,
+    dst: Union[str, LocalSink],
+    tuning: Optional[TransferTuning] = None,
+    progress_handler: SFTPProgressHandler = None,
+    offset: int = 0,
+    digest: Optional[StreamingDigest] = None,
+    throttle: Optional[Throttle] = None,
+) -> int:
+    """
+    Download a remote file with several SFTP read requests in flight
+
+    If the download fails, the local file is cut back to the part received without gaps, so it
+    can be resumed later.
+
+    Args:
+        sftp: SFTP client session
+        src: remote file name
+        dst: local file name or LocalSink
+        tuning: block size, requests in flight and auto tuning
+        progress_handler: called with (src, dst, bytes read, total) after every received block
+        offset: continue an interrupted download from this offset (see `sftp_resume_offset`),
+                the local file is not truncated then
+        digest: fed with the received data (it does not cover a resumed prefix)
+        throttle: awaited with the size of every block before it is requested (bandwidth limit)
+
+    Returns:
+        int: number of bytes read (including the resumed prefix)
+    """
+    tuning = tuning or TransferTuning()
+    tuner = AutoTuner(tuning, sftp.limits.max_read_len)
+    received = offset
+    # end of the data received without gaps, blocks may complete out of order
+    contiguous = offset
+    completed: Dict[int, int] = {}
+    pending: Set[asyncio.Task] = set()
+
+    async with sftp.open(
+        src, "rb", encoding=None, block_size=tuning.max_auto_block_size
+    ) as remote_file:
+        total = (await remote_file.stat()).size or 0
+
+        async def _read(offset: int, size: int) -> None:
+            nonlocal received, contiguous
+            while size:
+                start_time = monotonic()
+                data = await remote_file.read(size, offset)
+                tuner.request_done(monotonic() - start_time)
+                if not data:
+                    # file got shorter while we were reading it
+                    return
+                await sink.write_at(offset, data)
+                if digest is not None:
+                    digest.update_at(offset, data)
+                completed[offset] = offset + len(data)
+                while contiguous in completed:
+                    contiguous = completed.pop(contiguous)
+                received += len(data)
+                offset += len(data)
+                size -= len(data)
+                if progress_handler:
+                    progress_handler(src, str(dst), received, total)
+
+        async with open_sink(dst, offset) as sink:
+            try:
+                while offset < total:
+                    while len(pending) >= tuner.max_requests:
+                        pending = await _wait_first(pending)
+                    size = min(tuner.block_size, total - offset)
+                    if throttle is not None:
+                        await throttle(size)
+                    pending.add(asyncio.create_task(_read(offset, size)))
+                    offset += size
+                while pending:
+                    pending = await _wait_first(pending)
+            except BaseException:
+                await _cancel(pending)
+                await sink.truncate(contiguous)
+                raise
+
+    if progress_handler and total == 0:
+        progress_handler(src, str(dst), 0, 0)
+    return received
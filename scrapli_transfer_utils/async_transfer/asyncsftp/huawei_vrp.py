@@ -1,31 +1,52 @@
-import asyncio
 import re
 
-from typing import Any, List, Optional, Union, Literal
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
+import asyncssh
+from asyncssh import SFTPClient, SSHClientConnection
+
+from scrapli_transfer_utils.async_transfer.asyncsftp.engine import (
+    SFTPProgressHandler,
+    sftp_get,
+    sftp_put,
+    sftp_resume_offset,
+    transfer_error,
+)
 from scrapli_transfer_utils.async_transfer.base import AsyncTransferFeature
-from scrapli_transfer_utils.dataclasses import FileCheckResult
+from scrapli_transfer_utils.dataclasses import FileCheckResult, TransferTuning
+from scrapli_transfer_utils.local import LocalSink, LocalSource
 from scrapli_transfer_utils.logging import logger
 
+T = TypeVar("T")
+
 
 class AsyncSFTPHuaweiVrp(AsyncTransferFeature):
+    supports_resume = True
+    # only `display system file-md5` is available
+    hash_algorithms = ("md5",)
+
     def __init__(self, *args: Any, **kwargs: Any):
         super().__init__(*args, **kwargs)
 
     async def check_device_file(
         self, device_fs: Optional[str], file_name: str
     ) -> FileCheckResult:
-        logger.debug(f"Checking {device_fs}{file_name} MD5 hash..")
+        if self.device_hash_cache is not None:
+            return await self._check_device_file_cached(device_fs, file_name)
 
-        md5_sum_regex = re.compile(r"MD5:\n(?P<md5_sum>.*)", re.M)
-        # double {{ }} to escape f string.
-        byte_size_regex = re.compile(
-            rf"^\s+\d+\s+[\-\w]{{0,5}}\s+(?P<byte_size>.[\d,]+?(?=\s)).+?(?={file_name})",
-            re.M,
-        )
-        free_space_regex = re.compile(
-            r"total available\s.(?P<free_space>.+?(?=\s+))", re.M
-        )
+        logger.debug(f"Checking {device_fs}{file_name} MD5 hash..")
 
         outputs = await self.conn.send_commands(
             [
@@ -33,25 +54,149 @@ class AsyncSFTPHuaweiVrp(AsyncTransferFeature):
                 f"dir /all",
             ]
         )
-        file_hash = ""
-        find_md5_sum = re.search(md5_sum_regex, outputs[0].result)
+        file_hash = self._parse_hash(outputs[0].result, file_name)
+        file_size, _ = self._parse_dir(outputs.data[1].result, file_name)
+        free_space = self._parse_free(outputs.data[1].result)
+
+        return FileCheckResult(hash=file_hash, size=file_size, free=free_space)
+
+    async def _check_device_file_cached(
+        self, device_fs: Optional[str], file_name: str
+    ) -> FileCheckResult:
+        """
+        Same as `check_device_file`, but only runs `display system file-md5` if the hash is not
+        cached or the size/timestamp of the file changed since it was cached
+        """
+        output = await self.conn.send_command("dir /all")
+        file_size, timestamp = self._parse_dir(output.result, file_name)
+        free_space = self._parse_free(output.result)
+        if not file_size and not timestamp:
+            # file does not exist, nothing to hash
+            return FileCheckResult(hash="", size=0, free=free_space)
+
+        file_hash = self.device_hash_cache.get(
+            self.conn.host, device_fs, file_name, file_size, timestamp, self.hash_algorithm
+        )
+        if file_hash:
+            logger.debug(f"'{file_name}' hash found in cache")
+            return FileCheckResult(hash=file_hash, size=file_size, free=free_space)
+
+        logger.debug(f"Checking {device_fs}{file_name} MD5 hash..")
+        output = await self.conn.send_command(
+            f"display system file-md5 {device_fs}{file_name}"
+        )
+        file_hash = self._parse_hash(output.result, file_name)
+        self.device_hash_cache.set(
+            self.conn.host,
+            device_fs,
+            file_name,
+            file_size,
+            timestamp,
+            file_hash,
+            self.hash_algorithm,
+        )
+        return FileCheckResult(hash=file_hash, size=file_size, free=free_space)
+
+    async def check_device_files(
+        self, device_fs: Optional[str], file_names: Sequence[str]
+    ) -> Dict[str, FileCheckResult]:
+        """
+        Same as `check_device_file` for many files: sizes and free space are taken from one
+        `dir /all`, only `display system file-md5` runs per file (if the hash is not cached)
+        """
+        if any("/" in file_name for file_name in file_names):
+            # files in subdirectories are not in the listing of the filesystem
+            return await super().check_device_files(device_fs, file_names)
+
+        output = await self.conn.send_command("dir /all")
+        free_space = self._parse_free(output.result)
+
+        results: Dict[str, FileCheckResult] = {}
+        for file_name in file_names:
+            file_size, timestamp = self._parse_dir(output.result, file_name)
+            if not file_size and not timestamp:
+                # file does not exist, nothing to hash
+                results[file_name] = FileCheckResult(hash="", size=0, free=free_space)
+                continue
+
+            file_hash = None
+            if self.device_hash_cache is not None:
+                file_hash = self.device_hash_cache.get(
+                    self.conn.host, device_fs, file_name, file_size, timestamp, self.hash_algorithm
+                )
+            if not file_hash:
+                logger.debug(f"Checking {device_fs}{file_name} MD5 hash..")
+                hash_output = await self.conn.send_command(
+                    f"display system file-md5 {device_fs}{file_name}"
+                )
+                file_hash = self._parse_hash(hash_output.result, file_name)
+                if self.device_hash_cache is not None:
+                    self.device_hash_cache.set(
+                        self.conn.host,
+                        device_fs,
+                        file_name,
+                        file_size,
+                        timestamp,
+                        file_hash,
+                        self.hash_algorithm,
+                    )
+            results[file_name] = FileCheckResult(hash=file_hash, size=file_size, free=free_space)
+        return results
+
+    @staticmethod
+    def _parse_hash(output: str, file_name: str) -> str:
+        md5_sum_regex = re.compile(r"MD5:\n(?P<md5_sum>.*)", re.M)
+        find_md5_sum = re.search(md5_sum_regex, output)
         if find_md5_sum:
             file_hash = find_md5_sum.group("md5_sum")
             logger.debug(f"'{file_name}' hash is '{file_hash}'")
+            return file_hash
+        return ""
+
+    @staticmethod
+    def _parse_dir(output: str, file_name: str) -> Tuple[int, str]:
+        """
+        Parse size and timestamp of a file from `dir /all` output
+
+        Returns:
+            size in bytes and timestamp as printed by the device
+        """
+        # double {{ }} to escape f string.
+        byte_size_regex = re.compile(
+            rf"^\s+\d+\s+[\-\w]{{0,5}}\s+(?P<byte_size>.[\d,]+?(?=\s)).+?\s"
+            rf"{re.escape(file_name)}\s*$",
+            re.M,
+        )
+        timestamp_regex = re.compile(
+            rf"^\s+\d+\s+[\-\w]{{0,5}}\s+[\d,]+\s+(?P<timestamp>\w{{3}} \d{{2}} \d{{4}} "
+            rf"[\d:]{{8}})\s+{re.escape(file_name)}\s*$",
+            re.M,
+        )
 
         file_size = 0
-        find_file_size = re.search(byte_size_regex, outputs.data[1].result)
+        find_file_size = re.search(byte_size_regex, output)
         if find_file_size:
-            file_size_kb = find_file_size.group("byte_size").replace(",", "")
-            file_size = int(file_size_kb) * 1000
+            # the size column is in bytes, unlike the KB of the free space
+            file_size = int(find_file_size.group("byte_size").replace(",", ""))
+
+        timestamp = ""
+        find_timestamp = re.search(timestamp_regex, output)
+        if find_timestamp:
+            timestamp = find_timestamp.group("timestamp")
 
+        return file_size, timestamp
+
+    @staticmethod
+    def _parse_free(output: str) -> int:
+        free_space_regex = re.compile(
+            r"total available\s.(?P<free_space>.+?(?=\s+))", re.M
+        )
         free_space = 0
-        find_free_space = re.search(free_space_regex, outputs.data[1].result)
+        find_free_space = re.search(free_space_regex, output)
         if find_free_space:
             free_space_kb = find_free_space.group("free_space").replace(",", "")
             free_space = int(free_space_kb) * 1000
-
-        return FileCheckResult(hash=file_hash, size=file_size, free=free_space)
+        return free_space
 
     async def _ensure_transfer_capability(  # noqa: C901
         self, force: Optional[bool] = False
@@ -101,40 +246,124 @@ class AsyncSFTPHuaweiVrp(AsyncTransferFeature):
 
         return None
 
-    async def _async_file_transfer(  # noqa: C901
+    async def _run_sftp(
+        self,
+        func: Callable[[SFTPClient], Awaitable[T]],
+        operation: Literal["get", "put"],
+        src: Union[str, LocalSource],
+        dst: Union[str, LocalSink],
+        tuning: Optional[TransferTuning] = None,
+    ) -> T:
+        """
+        Run a coroutine function with an SFTP client session on the device
+
+        Args:
+            func: called with the SFTP client
+            operation: 'get' or 'put', for the error raised on failure
+            src: Source file name, for the error raised on failure
+            dst: Destination file name, for the error raised on failure
+            tuning: window and packet size of a newly opened SSH connection
+
+        Returns:
+            the result of `func`
+
+        Raises:
+            ScrapliTransferError: (or a subclass like TransferFileNotFoundError) if SFTP failed
+        """
+
+        async def _sftp(sftp_conn: SSHClientConnection) -> T:
+            if self._session_stack is not None:
+                # keep one SFTP client for all transfers of the session
+                sftp = await self._session_context(
+                    ("sftp", id(sftp_conn)), sftp_conn.start_sftp_client
+                )
+                return await func(sftp)
+            async with sftp_conn.start_sftp_client() as sftp:
+                return await func(sftp)
+
+        try:
+            return await self._run_on_ssh_connection(_sftp, tuning)
+        except (asyncssh.SFTPError, asyncssh.DisconnectError, OSError) as e:
+            error = transfer_error(e, operation, src, dst)
+            logger.warning(f"SFTP error: {error}")
+            raise error from e
+
+    async def _resume_offset(
         self,
         operation: Literal["get", "put"],
         src: str,
         dst: str,
+        tuning: Optional[TransferTuning] = None,
+    ) -> int:
+        verify_size = (tuning or TransferTuning()).resume_verify_size
+        return await self._run_sftp(
+            lambda sftp: sftp_resume_offset(sftp, operation, src, dst, verify_size),
+            operation,
+            src,
+            dst,
+            tuning,
+        )
+
+    async def _async_file_transfer(  # noqa: C901
+        self,
+        operation: Literal["get", "put"],
+        src: Union[str, LocalSource],
+        dst: Union[str, LocalSink],
+        progress_handler: SFTPProgressHandler = None,
+        tuning: Optional[TransferTuning] = None,
+        resume: bool = False,
     ) -> bool:
+        """
+        SFTP a file from/to the device with the asyncssh SFTP client
 
+        Args:
+            operation: 'get' or 'put' files from or to the device
+            src: Source file name
+            dst: Destination file name
+            progress_handler: callback with (src, dst, bytes copied, total bytes) to be able to
+                              follow the copy progress
+            tuning: block size, requests in flight and auto tuning of the SFTP pipeline. Window
+                    and packet size only apply if a new SSH connection is opened
+            resume: continue a partial destination file if it matches the source
 
+        Returns:
+            bool: True on success
 
-        try:
-            result = False
-            cmd = (
-                f'sshpass -p "{self.conn.auth_password}" sftp {self.conn.auth_username}@{self.conn.host} <<EOF \n'
-                f"    {operation} {src} {dst} \n"
-                f"EOF"
-            )
-
-            proc = await asyncio.create_subprocess_shell(
-                cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await proc.communicate()
-
-            if (
-                "No such file or directory" in stderr.decode()
-                or "not found" in stderr.decode()
-            ):
-                raise FileNotFoundError(
-                    f"file {src} was not found in {operation} operation"
+        Raises:
+            ScrapliTransferError: (or a subclass like TransferFileNotFoundError) if the transfer
+                                  failed
+        """
+        if operation not in ("get", "put"):
+            raise ValueError(f"Invalid operation: {operation}")
+
+        async def _copy(sftp: SFTPClient) -> int:
+            offset = self.resume_offset if resume else 0
+            if operation == "get":
+                copied = await sftp_get(
+                    sftp,
+                    src,
+                    dst,
+                    tuning,
+                    progress_handler,
+                    offset,
+                    self.transfer_digest,
+                    throttle=self.transfer_throttle,
                 )
+            else:
+                copied = await sftp_put(
+                    sftp,
+                    src,
+                    dst,
+                    tuning,
+                    progress_handler,
+                    offset,
+                    throttle=self.transfer_throttle,
+                )
+            # the resumed part was already there
+            return copied - offset
 
-        except Exception as e:
-            logger.warning(f"Other error: {e}")
-            raise e
-        else:
-            result = True
+        copied = await self._run_sftp(_copy, operation, src, dst, tuning)
 
-        return result
+        logger.debug(f"{operation} '{src}' as '{dst}': {copied} bytes copied")
+        self.transferred_bytes = copied
+        return True
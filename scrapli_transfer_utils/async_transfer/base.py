@@ -1,15 +1,138 @@
-import hashlib
+import asyncio
 import os
 import shutil
 from abc import abstractmethod, ABC
+from contextlib import AsyncExitStack, asynccontextmanager
 from pathlib import PurePath
-from typing import Optional, Union, Literal, Callable
+from time import monotonic
+from weakref import WeakKeyDictionary
+from typing import (
+    Any,
+    AsyncContextManager,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
-import aiofiles
+import asyncssh
+from asyncssh import SSHClientConnection, connect
 from scrapli.driver import AsyncNetworkDriver
+from scrapli.exceptions import ScrapliTimeout
 
-from scrapli_transfer_utils.dataclasses import FileCheckResult, FileTransferResult
+from scrapli_transfer_utils.cache import (
+    DEFAULT_LOCAL_HASH_CACHE,
+    DeviceHashCache,
+    DeviceStateCache,
+    LocalHashCache,
+)
+from scrapli_transfer_utils.dataclasses import (
+    FileCheckResult,
+    FileTransferResult,
+    SCPConnectionParameterType,
+    SFTPConnectionParameterType,
+    RetryPolicy,
+    TransferTimings,
+    TransferTuning,
+)
+from scrapli_transfer_utils.hashing import (
+    DEFAULT_HASH_ALGORITHM,
+    DEFAULT_HASH_CHUNK_SIZE,
+    DEFAULT_HASHING_SERVICE,
+    HashingService,
+    StreamingDigest,
+)
+from scrapli_transfer_utils.local import LocalSink, LocalSource
 from scrapli_transfer_utils.logging import logger
+from scrapli_transfer_utils.progress import ProgressHandler, ProgressReporter, ProgressStream
+from scrapli_transfer_utils.ratelimit import (
+    BandwidthLimiter,
+    Throttle,
+    TokenBucket,
+    as_bucket,
+    make_throttle,
+)
+
+T = TypeVar("T")
+
+# filesystem and transfer capability per scrapli connection, dropped with the connection
+_CONNECTION_STATE: "WeakKeyDictionary[AsyncNetworkDriver, DeviceStateCache]" = (
+    WeakKeyDictionary()
+)
+
+
+async def _hash_local_path(file_name: str, file_stat: os.stat_result) -> str:
+    file_hashes = await DEFAULT_HASHING_SERVICE.hash_file(file_name, (DEFAULT_HASH_ALGORITHM,))
+    return file_hashes[DEFAULT_HASH_ALGORITHM]
+
+
+async def check_local_path(
+    device_fs: Optional[str],
+    file_name: str,
+    hash_local_file: Callable[[str, os.stat_result], Awaitable[str]] = _hash_local_path,
+) -> FileCheckResult:
+    """
+    Check local file and storage space
+
+    This is `AsyncTransferFeature.check_local_file` called on the class (it used to be a
+    staticmethod): the file is hashed with MD5 on `DEFAULT_HASHING_SERVICE`, without a cache.
+
+    Args:
+        device_fs: If specified, this path will be checked for free space. Else path will be
+                   taken from `file_name`
+        file_name: local file to examine. This should be the full path of local file
+        hash_local_file: coroutine function returning the hash of the file, called with its name
+                         and `os.stat` result
+
+    Returns:
+        FileCheckResult
+    """
+    try:
+        file_stat = os.stat(file_name)
+        file_size = file_stat.st_size
+        file_hash = await hash_local_file(file_name, file_stat)
+        logger.debug(f"'{file_name}' hash is '{file_hash}'")
+    except FileNotFoundError:
+        file_size = 0
+        file_hash = ""
+
+    try:
+        path = device_fs or os.path.dirname(file_name)
+        # check free space of directory of the file or the local dir
+        free_space = shutil.disk_usage(path or ".").free
+    except FileNotFoundError:
+        free_space = 0
+
+    return FileCheckResult(hash=file_hash, size=file_size, free=free_space)
+
+
+class _StaticCompatibleMethod:
+    """
+    Instance method which still works when called on the class, like the staticmethod it
+    replaced: the class attribute is `static`
+    """
+
+    def __init__(self, static: Callable[..., Any]):
+        self.static = static
+        self.method: Optional[Callable[..., Any]] = None
+
+    def __call__(self, method: Callable[..., Any]) -> "_StaticCompatibleMethod":
+        self.method = method
+        return self
+
+    def __get__(self, obj: Any, objtype: Optional[type] = None) -> Callable[..., Any]:
+        if obj is None:
+            return self.static
+        return self.method.__get__(obj, objtype)
 
 
 class AsyncTransferFeature(ABC):
@@ -20,11 +143,99 @@ class AsyncTransferFeature(ABC):
     just return a value described in the abstract methods.
     """
 
-    def __init__(self, connection: AsyncNetworkDriver):
+    # platform can continue an interrupted transfer (see `file_transfer(resume=True)`)
+    supports_resume: bool = False
+    # hash algorithms the device can calculate (`hashlib` names), fastest on the device first
+    hash_algorithms: Tuple[str, ...] = ("md5",)
+    # transient errors worth another attempt with a `RetryPolicy` (resets, refused connections,
+    # timeouts of the CLI or the transfer)
+    retryable_errors: Tuple[Type[BaseException], ...] = (
+        ConnectionError,
+        TimeoutError,
+        asyncssh.ConnectionLost,
+        ScrapliTimeout,
+    )
+
+    def __init__(
+        self,
+        connection: AsyncNetworkDriver,
+        hash_chunk_size: int = DEFAULT_HASH_CHUNK_SIZE,
+        local_hash_cache: Optional[LocalHashCache] = DEFAULT_LOCAL_HASH_CACHE,
+        device_hash_cache: Optional[DeviceHashCache] = None,
+        reuse_ssh_session: bool = True,
+        device_state_cache: Optional[DeviceStateCache] = None,
+        keepalive_interval: Optional[float] = None,
+        hash_algorithm: Optional[str] = None,
+        local_hash_algorithms: Sequence[str] = (),
+        hashing_service: HashingService = DEFAULT_HASHING_SERVICE,
+        bandwidth_limiter: Optional[BandwidthLimiter] = None,
+        bandwidth_group: Optional[str] = None,
+    ):
+        """
+        Args:
+            connection: opened async scrapli connection
+            hash_chunk_size: number of bytes read at once while hashing local files
+            local_hash_cache: cache of local file hashes, shared by all instances by default.
+                              `None` disables caching
+            device_hash_cache: cache of device file hashes. If set, a `dir` of the file is used
+                               to validate a cached hash instead of hashing the file on the
+                               device again
+            reuse_ssh_session: open the file transfer channel on the SSH connection scrapli
+                               already holds. A new SSH connection is only opened if the device
+                               refuses a second channel
+            device_state_cache: cache of filesystem and transfer capability per host (e.g. with a
+                                TTL), used in addition to the cache kept per connection
+            keepalive_interval: seconds between keepalives sent to the idle CLI channel while a
+                                file is transferred, `0` to turn it off, default is the
+                                `timeout_ops` of the connection
+            hash_algorithm: algorithm used to compare local and device files, one of
+                            `hash_algorithms` of the platform. Default is the fastest one
+            local_hash_algorithms: further algorithms calculated in the same pass over a local
+                                   file and kept in `local_hash_cache` (e.g. for other platforms
+                                   of a bulk transfer)
+            hashing_service: thread pool hashing the local files, shared by all instances by
+                             default
+            bandwidth_limiter: global and per group bandwidth limits shared with other transfers
+            bandwidth_group: group of this device in `bandwidth_limiter` (e.g. its site), `None`
+                             for the global limit only
+        """
+        if hash_algorithm is None:
+            hash_algorithm = self.hash_algorithms[0]
+        if hash_algorithm not in self.hash_algorithms:
+            raise ValueError(
+                f"{type(self).__name__} does not support hash algorithm '{hash_algorithm}', "
+                f"supported: {', '.join(self.hash_algorithms)}"
+            )
         # \x0C is CTRL-L which usually refresh the prompt and harmless to send as keepalive
         self.keepalive_pattern = "\x0C".encode("UTF-8")
         self.conn = connection
         self.transfer_feature_to_clean = []
+        self.hash_chunk_size = hash_chunk_size
+        self.local_hash_cache = local_hash_cache
+        self.device_hash_cache = device_hash_cache
+        self.reuse_ssh_session = reuse_ssh_session
+        self.device_state_cache = device_state_cache
+        self.keepalive_interval = keepalive_interval
+        self.hash_algorithm = hash_algorithm
+        self.local_hash_algorithms = local_hash_algorithms
+        self.hashing_service = hashing_service
+        self.bandwidth_limiter = bandwidth_limiter
+        self.bandwidth_group = bandwidth_group
+        # bytes copied by the last `_async_file_transfer`, set by the platform implementation
+        self.transferred_bytes = 0
+        # hashes of the local file written by a running 'get', fed by the platform implementation
+        # with the received data (`None` if not wanted)
+        self.transfer_digest: Optional[StreamingDigest] = None
+        # bandwidth limit of a running transfer, awaited by the platform implementation with the
+        # size of every block (`None` for no limit)
+        self.transfer_throttle: Optional[Throttle] = None
+        # offset of the destination file a running transfer with `resume` continues from,
+        # verified by `_resume_offset`
+        self.resume_offset = 0
+        # state of an active `transfer_session`
+        self._session_stack: Optional[AsyncExitStack] = None
+        self._session_contexts: Dict[Hashable, Any] = {}
+        self._session_capability: Optional[bool] = None
 
     @abstractmethod
     async def check_device_file(
@@ -43,6 +254,27 @@ class AsyncTransferFeature(ABC):
         """
         ...
 
+    async def check_device_files(
+        self, device_fs: Optional[str], file_names: Sequence[str]
+    ) -> Dict[str, FileCheckResult]:
+        """
+        Check many remote files and storage space
+
+        Platforms override this to list the filesystem only once and run just the hash command
+        per file. This default checks the files one by one.
+
+        Args:
+            device_fs: filesystem on device (e.g. disk0:/)
+            file_names: files to examine
+
+        Returns:
+            FileCheckResult per file name
+        """
+        return {
+            file_name: await self.check_device_file(device_fs, file_name)
+            for file_name in file_names
+        }
+
     @abstractmethod
     async def _ensure_transfer_capability(  # noqa: C901
         self, force: Optional[bool] = False
@@ -84,58 +316,480 @@ class AsyncTransferFeature(ABC):
         """
         ...
 
-    @staticmethod
+    async def _acquire_privilege(self) -> None:
+        """
+        Bring the CLI to the privilege level the platform commands need. Platforms doing this in
+        `_get_device_fs` implement it, so it also happens when the drive is found in the cache
+
+        Returns:
+            None
+        """
+
+    def _state_caches(self) -> List[DeviceStateCache]:
+        caches = [_CONNECTION_STATE.setdefault(self.conn, DeviceStateCache())]
+        if self.device_state_cache is not None:
+            caches.append(self.device_state_cache)
+        return caches
+
+    def _get_state(self, key: str) -> Any:
+        for cache in self._state_caches():
+            value = cache.get(self.conn.host, key)
+            if value is not None:
+                return value
+        return None
+
+    def _set_state(self, key: str, value: Any) -> None:
+        for cache in self._state_caches():
+            cache.set(self.conn.host, key, value)
+
+    def _invalidate_state(self, key: str) -> None:
+        for cache in self._state_caches():
+            cache.invalidate(self.conn.host, key)
+
+    async def _device_fs(self) -> Optional[str]:
+        """
+        `_get_device_fs`, remembered per connection (and per host with `device_state_cache`)
+
+        Returns:
+            Drive as a string or `None` if not detected
+        """
+        device_fs = self._get_state("device_fs")
+        if device_fs is None:
+            device_fs = await self._get_device_fs()
+            self._set_state("device_fs", device_fs)
+        else:
+            logger.debug(f"Device filesystem '{device_fs}' found in cache")
+            await self._acquire_privilege()
+        return device_fs
+
+    async def _transfer_capability(self, force: Optional[bool] = False) -> Union[bool, None]:
+        """
+        `_ensure_transfer_capability`, remembered per connection (and per host with
+        `device_state_cache`) as long as the device was capable without changing its config
+
+        Args:
+            force: see `_ensure_transfer_capability`
+
+        Returns:
+            see `_ensure_transfer_capability`
+        """
+        if self._get_state("transfer_capable"):
+            logger.debug("Transfer capability found in cache")
+            self.transfer_feature_to_clean = []
+            return None
+
+        transfer_capability = await self._ensure_transfer_capability(force=force)
+        if transfer_capability is not False and not self.transfer_feature_to_clean:
+            self._set_state("transfer_capable", True)
+        else:
+            # we changed (or failed to change) the config, query again next time
+            self._invalidate_state("transfer_capable")
+        return transfer_capability
+
+    async def _cleanup(self) -> None:
+        """`_cleanup_after_transfer`, forgetting the transfer capability it reverts"""
+        self._invalidate_state("transfer_capable")
+        await self._cleanup_after_transfer()
+
+    @_StaticCompatibleMethod(check_local_path)
     async def check_local_file(
-        device_fs: Optional[str], file_name: str
+        self, device_fs: Optional[str], file_name: Union[str, LocalSource, LocalSink]
     ) -> FileCheckResult:
         """
         Check local file and storage space
 
+        The file is hashed with `hash_algorithm` in chunks of `hash_chunk_size` on
+        `hashing_service`, so memory usage stays flat and the event loop is not blocked while
+        hashing big images. Called on the class (`AsyncTransferFeature.check_local_file(fs, name)`)
+        it is `check_local_path`.
+
         Args:
             device_fs: If specified, this path will be checked for free space. Else path will be
                        taken from `file_name`
-            file_name: local file to examine. This should be the full path of local file
+            file_name: local file to examine. This should be the full path of local file, or the
+                       in-memory source/destination of a transfer
 
         Returns:
             FileCheckResult
         """
+        if isinstance(file_name, LocalSource):
+            return await file_name.check(self.hash_algorithm, self.hash_chunk_size)
+        if isinstance(file_name, LocalSink):
+            return await file_name.check(self.hash_algorithm)
+        return await check_local_path(device_fs, file_name, self._hash_local_file)
+
+    async def check_local_files(
+        self, device_fs: Optional[str], file_names: Sequence[str]
+    ) -> Dict[str, FileCheckResult]:
+        """
+        Check many local files and storage space
+
+        The files are hashed in parallel on the threads of `hashing_service`.
+
+        Args:
+            device_fs: If specified, this path will be checked for free space. Else path will be
+                       taken from each file name
+            file_names: local files to examine
+
+        Returns:
+            FileCheckResult per file name
+        """
+        file_names = list(dict.fromkeys(file_names))
+        results = await asyncio.gather(
+            *(self.check_local_file(device_fs, file_name) for file_name in file_names)
+        )
+        return dict(zip(file_names, results))
+
+    async def _hash_local_file(self, file_name: str, file_stat: os.stat_result) -> str:
+        """
+        Hash a local file with `hash_algorithm`, using `local_hash_cache` if available
+
+        Args:
+            file_name: local file to hash
+            file_stat: `os.stat` result of the file
+
+        Returns:
+            str: hash of the file
+        """
+        if self.local_hash_cache is None:
+            file_hashes = await self.hashing_service.hash_file(
+                file_name, (self.hash_algorithm,), self.hash_chunk_size
+            )
+            return file_hashes[self.hash_algorithm]
+
+        file_hash = self.local_hash_cache.get(file_name, file_stat, self.hash_algorithm)
+        if file_hash:
+            logger.debug(f"'{file_name}' hash found in cache")
+            return file_hash
+
+        file_hashes = await self.hashing_service.hash_file(
+            file_name, self._local_algorithms(), self.hash_chunk_size
+        )
+        # only remember the hashes if the file did not change while we were reading it
+        if LocalHashCache.file_key(os.stat(file_name)) == LocalHashCache.file_key(file_stat):
+            for algorithm, algorithm_hash in file_hashes.items():
+                self.local_hash_cache.set(file_name, file_stat, algorithm_hash, algorithm)
+        return file_hashes[self.hash_algorithm]
+
+    def _local_algorithms(self) -> Tuple[str, ...]:
+        """`hash_algorithm` and `local_hash_algorithms`, each once"""
+        return tuple(dict.fromkeys((self.hash_algorithm, *self.local_hash_algorithms)))
+
+    def _check_streamed_file(
+        self, file_name: str, digest: StreamingDigest
+    ) -> Optional[FileCheckResult]:
+        """
+        Check a local file written by a 'get' with the hashes calculated while it was received
+
+        The hashes are also put into `local_hash_cache`.
+
+        Args:
+            file_name: local file
+            digest: hashes of the received data
+
+        Returns:
+            FileCheckResult, `None` if the hashes don't cover the whole file (e.g. it was resumed)
+        """
         try:
-            async with aiofiles.open(file_name, "rb") as f:
-                file_hash = hashlib.md5(await f.read()).hexdigest()
-                logger.debug(f"'{file_name}' hash is '{file_hash}'")
-            file_size = os.path.getsize(file_name)
+            file_stat = os.stat(file_name)
         except FileNotFoundError:
-            file_size = 0
-            file_hash = ""
+            return None
+        if not digest.complete or digest.size != file_stat.st_size:
+            return None
+
+        file_hashes = digest.hexdigests()
+        if self.local_hash_cache is not None:
+            for algorithm, algorithm_hash in file_hashes.items():
+                self.local_hash_cache.set(file_name, file_stat, algorithm_hash, algorithm)
+        return FileCheckResult(
+            hash=file_hashes[self.hash_algorithm],
+            size=file_stat.st_size,
+            free=shutil.disk_usage(os.path.dirname(file_name) or ".").free,
+        )
+
+    def _connection_parameters(
+        self,
+    ) -> Union[SCPConnectionParameterType, SFTPConnectionParameterType]:
+        """
+        Parameters to open a new SSH connection for file transfer, taken from the scrapli
+        connection (including its SSH options)
 
+        Returns:
+            SCPConnectionParameterType
+        """
+        # noinspection PyProtectedMember
+        return SCPConnectionParameterType(
+            username=self.conn.auth_username,
+            password=self.conn.auth_password,
+            port=self.conn.port,
+            host=self.conn.host,
+            options=self.conn.transport.session._options,  # noqa: W0212
+        )
+
+    @asynccontextmanager
+    async def transfer_session(
+        self, force_config: Optional[bool] = False, cleanup: bool = True
+    ) -> AsyncIterator["AsyncTransferFeature"]:
+        """
+        Transfer many files with one capability check, one SSH connection and one cleanup
+
+        Inside the session `file_transfer` does not check/configure the transfer capability and
+        does not clean up, connections opened for the transfers are kept open until the session
+        ends:
+
+        .. code-block:: python
+
+            async with transfer.transfer_session(force_config=True) as session:
+                for file_name in ["image.bin", "image.pkg"]:
+                    await session.file_transfer("put", file_name)
+
+        Args:
+            force_config: see `file_transfer`
+            cleanup: restore the configuration at the end of the session if it was altered
+
+        Yields:
+            this feature
+        """
+        if self._session_stack is not None:
+            raise RuntimeError("A transfer session is already active")
+
+        self._session_capability = await self._transfer_capability(force=force_config)
+        if self._session_capability is False:
+            logger.error("Transfer feature is not enabled on device!")
         try:
-            path = device_fs or os.path.dirname(file_name)
-            # check free space of directory of the file or the local dir
-            free_space = shutil.disk_usage(path or ".").free
-        except FileNotFoundError:
-            free_space = 0
+            async with AsyncExitStack() as stack:
+                self._session_stack = stack
+                yield self
+        finally:
+            self._session_stack = None
+            self._session_contexts = {}
+            self._session_capability = None
+            if cleanup and self.transfer_feature_to_clean:
+                await self._cleanup()
 
-        return FileCheckResult(hash=file_hash, size=file_size, free=free_space)
+    async def _session_context(
+        self, key: Hashable, context_factory: Callable[[], AsyncContextManager[T]]
+    ) -> T:
+        """
+        Enter an async context once per transfer session and keep it until the session ends
 
-    @abstractmethod
-    async def _async_file_transfer(  # noqa: C901
+        Args:
+            key: identifies the context within the session
+            context_factory: creates the context if it was not entered yet
+
+        Returns:
+            the value of the entered context
+        """
+        if key not in self._session_contexts:
+            self._session_contexts[key] = await self._session_stack.enter_async_context(
+                context_factory()
+            )
+        return self._session_contexts[key]
+
+    @asynccontextmanager
+    async def _keepalive(self) -> AsyncIterator[None]:
+        """
+        Keep the idle CLI channel up while a file is transferred
+
+        One task sends `keepalive_pattern` every `keepalive_interval` seconds and is cancelled
+        when the transfer ends, the transfer itself is not slowed down by it.
+
+        Yields:
+            None
+        """
+        interval = self.keepalive_interval
+        if interval is None:
+            interval = self.conn.timeout_ops
+        if not interval or interval <= 0:
+            yield
+            return
+
+        async def _send_keepalives() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                logger.debug("Sending keepalive to device")
+                try:
+                    self.conn.transport.write(self.keepalive_pattern)
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.warning(f"Keepalive failed: {e}")
+                    return
+
+        keepalive_task = asyncio.create_task(_send_keepalives())
+        try:
+            yield
+        finally:
+            keepalive_task.cancel()
+            await asyncio.gather(keepalive_task, return_exceptions=True)
+
+    async def _run_on_ssh_connection(
+        self,
+        transfer: Callable[[SSHClientConnection], Awaitable[T]],
+        tuning: Optional[TransferTuning] = None,
+    ) -> T:
+        """
+        Run a transfer on an SSH connection
+
+        If `reuse_ssh_session` is set, the SSH connection of scrapli is used. A new SSH
+        connection is only opened if the device refuses to open another channel on it. Within a
+        `transfer_session` that new connection is kept for the next transfers.
+
+        Args:
+            transfer: coroutine function opening its channel(s) on the given connection
+            tuning: window and packet size are applied to a newly opened SSH connection
+
+        Returns:
+            the result of `transfer`
+        """
+        if "ssh" in self._session_contexts:
+            return await transfer(self._session_contexts["ssh"])
+
+        if self.reuse_ssh_session:
+            try:
+                return await transfer(self.conn.transport.session)
+            except asyncssh.ChannelOpenError as e:
+                logger.info(
+                    f"Device refused transfer channel on existing SSH session ({e}), "
+                    "opening a new SSH connection"
+                )
+
+        connect_kwargs: Dict[str, Any] = {}
+        if tuning and tuning.window:
+            connect_kwargs["window"] = tuning.window
+        if tuning and tuning.max_pktsize:
+            connect_kwargs["max_pktsize"] = tuning.max_pktsize
+        if self._session_stack is not None:
+            transfer_conn = await self._session_context(
+                "ssh", lambda: connect(**self._connection_parameters(), **connect_kwargs)
+            )
+            return await transfer(transfer_conn)
+
+        async with connect(**self._connection_parameters(), **connect_kwargs) as transfer_conn:
+            return await transfer(transfer_conn)
+
+    def is_retryable_error(self, exc: BaseException, retry: RetryPolicy) -> bool:
+        """
+        Decide if a failed phase is worth another attempt
+
+        Args:
+            exc: exception raised by the phase
+            retry: retry policy of the transfer
+
+        Returns:
+            bool: True if the error is transient
+        """
+        return isinstance(exc, self.retryable_errors + tuple(retry.retry_on))
+
+    async def _retry_phase(
+        self,
+        phase: str,
+        retry: Optional[RetryPolicy],
+        transfer_result: FileTransferResult,
+        attempt: Callable[[int], Awaitable[T]],
+        can_retry: Optional[Callable[[], bool]] = None,
+    ) -> T:
+        """
+        Run one phase of `file_transfer`, again after a retryable error
+
+        Args:
+            phase: name of the phase for the log
+            retry: retry policy, `None` to run the phase once
+            transfer_result: its `retries` counts the attempts after the first
+            attempt: coroutine function running the phase, called with the number of the retry
+                     (0 for the first attempt)
+            can_retry: called after a failed attempt, `False` if the attempt left something it
+                       can't undo and the error is raised
+
+        Returns:
+            the result of `attempt`
+        """
+        retry_number = 0
+        while True:
+            try:
+                return await attempt(retry_number)
+            except Exception as e:
+                if (
+                    retry is None
+                    or retry_number + 1 >= retry.max_attempts
+                    or not self.is_retryable_error(e, retry)
+                    or (can_retry is not None and not can_retry())
+                ):
+                    raise
+                retry_number += 1
+                transfer_result.retries += 1
+                delay = retry.delay(retry_number)
+                logger.warning(
+                    f"{phase} failed ({type(e).__name__}: {e}), retry {retry_number}/"
+                    f"{retry.max_attempts - 1} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def _resume_offset(
         self,
         operation: Literal["get", "put"],
         src: str,
         dst: str,
+        tuning: Optional[TransferTuning] = None,
+    ) -> int:
+        """
+        Find the offset a partial destination file can be continued from. Platforms with
+        `supports_resume` compare the partial file with the source
+
+        Args:
+            operation: 'get' or 'put' files from or to the device
+            src: Source file name
+            dst: Destination file name
+            tuning: data transfer tuning (`resume_verify_size`), `None` for the defaults
+
+        Returns:
+            int: offset to continue from, `0` if the destination is not a prefix of the source
+        """
+        return 0
+
+    @abstractmethod
+    async def _async_file_transfer(  # noqa: C901
+        self,
+        operation: Literal["get", "put"],
+        src: Union[str, LocalSource],
+        dst: Union[str, LocalSink],
+        progress_handler: ProgressHandler = None,
+        tuning: Optional[TransferTuning] = None,
+        resume: bool = False,
     ) -> bool:
+        """
+        Copy the file to/from the device. Implementations set `transferred_bytes` to the number
+        of bytes actually copied.
+
+        Args:
+            operation: 'get' or 'put' files from or to the device
+            src: Source file name (LocalSource for in-memory data to put)
+            dst: Destination file name (LocalSink for in-memory data to get)
+            progress_handler: callback with (src, dst, bytes copied, total bytes) after every
+                              copied block, `None` if nobody follows the progress
+            tuning: data transfer tuning, `None` for the defaults
+            resume: continue the destination file from `resume_offset` (only with
+                    `supports_resume`)
+
+        Returns:
+            bool: True on success
+        """
         ...
 
     async def file_transfer(  # noqa: C901
         self,
         operation: Literal["get", "put"],
-        src: str,
-        dst: str = "",
+        src: Union[str, bytes, bytearray, memoryview, Any],
+        dst: Union[str, bytearray, Any] = "",
         verify: bool = True,
         device_fs: Optional[str] = None,
         overwrite: bool = False,
         force_config: bool = False,
         cleanup: bool = True,
+        tuning: Optional[TransferTuning] = None,
+        resume: bool = False,
+        progress_handler: ProgressHandler = None,
+        progress: Optional[ProgressStream] = None,
+        retry: Optional[RetryPolicy] = None,
+        bandwidth: Union[None, float, TokenBucket] = None,
     ) -> FileTransferResult:
         """SCP for network devices
 
@@ -152,8 +806,10 @@ class AsyncTransferFeature(ABC):
 
         Args:
             operation: put/get file to/from device
-            src: source file name
-            dst: destination file name (same as src if omitted)
+            src: source file name. With `put` also bytes, bytearray, memoryview or a readable
+                 (sync or async) file-like object, see `LocalSource`
+            dst: destination file name (same as src if omitted). With `get` also a bytearray or a
+                 writable (sync or async) file-like object, see `LocalSink`
             verify: `True` if verification is needed (checksum, file existence, disk space)
             device_fs: IOS device filesystem (autodetect if empty)
             overwrite: If set to `True`, destination will be overwritten in case hash verification
@@ -167,8 +823,23 @@ class AsyncTransferFeature(ABC):
                               If set to `False`, Transfer functionality will be checked but won't
                               configure the device.
                               If set to `None`, capability won't even checked.
+                              Ignored within a `transfer_session`
             cleanup: If set to True, call the cleanup procedure to restore configuration if it was
-                     altered
+                     altered. Ignored within a `transfer_session`
+            tuning: block size, SFTP requests in flight, SSH window/packet size and auto tuning
+                    of the data transfer. Defaults of `TransferTuning` if omitted
+            resume: If set to `True`, a destination file shorter than the source is taken as an
+                    interrupted transfer: it is continued from its end if its content matches the
+                    source, even if `overwrite` is `False`. Otherwise `overwrite` decides if it
+                    is transferred again. Only platforms with `supports_resume` can do this
+            progress_handler: callback with (src, dst, bytes copied, total bytes), called for
+                              every copied block
+            progress: stream the (throttled) progress events of this transfer are published to
+            retry: retry the checks, the copy and the verification after transient errors
+                   (connection reset/refused, timeouts). Only the failed phase runs again; a
+                   failed copy continues from the partial file where `supports_resume` allows
+            bandwidth: limit of this transfer in bytes per second, or a TokenBucket shared with
+                       other transfers. Applies in addition to `bandwidth_limiter`
 
         Returns:
             FileTransferResult
@@ -177,39 +848,117 @@ class AsyncTransferFeature(ABC):
         if operation not in ["get", "put"]:
             raise ValueError(f"Operation '{operation}' is not supported")
 
+        # in-memory data and file-like objects stream from/to the channel without a local file
+        if operation == "put" and not isinstance(src, (str, LocalSource)):
+            src = LocalSource(src)
+        if operation == "get" and not isinstance(dst, (str, LocalSink)):
+            dst = LocalSink(dst, self.hash_algorithm)
+
+        # set destination filename to source if missing
+        if isinstance(dst, str) and dst in {"", "."}:
+            if isinstance(src, LocalSource) and not src.name:
+                raise ValueError(f"Destination file name is required to put '{src}'")
+            # set destination to filename and strip all path
+            dst = PurePath(str(src)).name
+
+        reporter = ProgressReporter(
+            self.conn.host, operation, str(src), str(dst), stream=progress, handler=progress_handler
+        )
+        try:
+            transfer_result = await self._file_transfer(
+                operation,
+                src,
+                dst,
+                verify,
+                device_fs,
+                overwrite,
+                force_config,
+                cleanup,
+                tuning,
+                resume,
+                reporter,
+                retry,
+                bandwidth,
+            )
+        except BaseException:
+            reporter.phase("failed")
+            raise
+        reporter.phase("done", transfer_result)
+        return transfer_result
+
+    async def _file_transfer(  # noqa: C901
+        self,
+        operation: Literal["get", "put"],
+        src: Union[str, LocalSource],
+        dst: Union[str, LocalSink],
+        verify: bool,
+        device_fs: Optional[str],
+        overwrite: bool,
+        force_config: bool,
+        cleanup: bool,
+        tuning: Optional[TransferTuning],
+        resume: bool,
+        reporter: ProgressReporter,
+        retry: Optional[RetryPolicy],
+        bandwidth: Union[None, float, TokenBucket],
+    ) -> FileTransferResult:
+        """Checks, transfer, cleanup and verification of `file_transfer`"""
+        if resume and not self.supports_resume:
+            logger.warning(f"{type(self).__name__} can not resume transfers, ignoring 'resume'")
+            resume = False
+        if resume and not isinstance(src if operation == "put" else dst, str):
+            logger.warning("Only local files can be resumed, ignoring 'resume'")
+            resume = False
+
         transfer_result = FileTransferResult(False, False, False)
+        timings = transfer_result.timings
         src_file_data = FileCheckResult("", 0, 0)
         dst_file_data = FileCheckResult("", 0, 0)
 
+        keep_dst = False
+        dst_kept = False
+
         dst_check, src_check = (None, None)
         dst_device_fs: Optional[str] = None
         src_device_fs: Optional[str] = None
 
-        # set destination filename to source if missing
-        if dst in {"", "."}:
-            # set destination to filename and strip all path
-            dst = PurePath(src).name
-
         if operation == "get":
             src_check = self.check_device_file
-            src_device_fs = device_fs or await self._get_device_fs()
             dst_check = self.check_local_file
 
         if operation == "put":
             src_check = self.check_local_file
-            dst_device_fs = device_fs or await self._get_device_fs()
             dst_check = self.check_device_file
 
+        reporter.phase("check")
         if verify:
-            # gather info on source side
-            src_file_data = await src_check(src_device_fs, src)
+            # the local file is hashed while the device is queried
+            device_fs, src_file_data, dst_file_data = await self._retry_phase(
+                "check",
+                retry,
+                transfer_result,
+                lambda _: self._check_files(operation, src, dst, device_fs, timings),
+            )
+        else:
+            start_time = monotonic()
+            device_fs = device_fs or await self._retry_phase(
+                "check", retry, transfer_result, lambda _: self._device_fs()
+            )
+            timings.device_fs = monotonic() - start_time
+
+        if operation == "get":
+            src_device_fs = device_fs
+        else:
+            dst_device_fs = device_fs
+
+        if verify:
+            # check source side
             logger.debug(f"Source file '{src}': {src_file_data}")
             if not src_file_data.hash:
                 logger.warning(f"Source file '{src}' does NOT exists!")
                 return transfer_result
 
-            # gather info on destination file
-            dst_file_data = await dst_check(dst_device_fs, dst)
+            # check destination file
             logger.debug(f"Destination file '{dst}': {dst_file_data}")
             if dst_file_data.hash:
                 transfer_result.exists = True
@@ -221,8 +970,13 @@ class AsyncTransferFeature(ABC):
                     if not overwrite:
                         return transfer_result
 
+            # a shorter destination may be what is left of an interrupted transfer, it is only
+            # continued if its content matches the source (compared by the transfer attempt)
+            partial = resume and dst_file_data.size < src_file_data.size
+            keep_dst = bool(dst_file_data.hash) and not overwrite
+
             # if hash does not match and we want to overwrite
-            if dst_file_data.hash and not overwrite:
+            if keep_dst and not partial:
                 logger.warning(f"'{dst}' file will NOT be overwritten!")
                 return transfer_result
 
@@ -234,40 +988,204 @@ class AsyncTransferFeature(ABC):
                 )
                 return transfer_result
 
-        # check if we are capable of transferring files
-        transfer_capability = await self._ensure_transfer_capability(force=force_config)
+        # check if we are capable of transferring files (done once for a transfer session)
+        reporter.phase("capability")
+        if self._session_stack is not None:
+            transfer_capability = self._session_capability
+        else:
+            start_time = monotonic()
+            transfer_capability = await self._transfer_capability(force=force_config)
+            timings.capability = monotonic() - start_time
         if transfer_capability is False:
             logger.error("Transfer feature is not enabled on device!")
             return transfer_result
 
+        digest: Optional[StreamingDigest] = None
+        # the narrowest limit first, a block waits in one bucket at a time
+        throttle = make_throttle(
+            [
+                as_bucket(bandwidth),
+                *(
+                    self.bandwidth_limiter.buckets(self.bandwidth_group)
+                    if self.bandwidth_limiter is not None
+                    else []
+                ),
+            ]
+        )
+
+        async def _transfer_attempt(retry_number: int) -> bool:
+            nonlocal digest, dst_kept
+            # a failed download keeps the part received without gaps, continue from there
+            continue_get = (
+                retry_number > 0
+                and self.supports_resume
+                and operation == "get"
+                and isinstance(dst, str)
+            )
+            if retry_number:
+                reporter.phase("transfer")
+            # the downloaded file is hashed on the way, it is not read again to verify it
+            digest = (
+                StreamingDigest(self._local_algorithms())
+                if operation == "get"
+                and isinstance(dst, str)
+                and (verify or self.local_hash_cache is not None)
+                else None
+            )
+            self.transfer_digest = digest
+            self.transfer_throttle = throttle
+            self.transferred_bytes = 0
+            try:
+                async with self._keepalive():
+                    if continue_get:
+                        # written by the failed attempt, no need to compare it with the source
+                        self.resume_offset = os.path.getsize(dst) if os.path.exists(dst) else 0
+                    elif resume:
+                        self.resume_offset = await self._resume_offset(operation, src, dst, tuning)
+                    else:
+                        self.resume_offset = 0
+                    # the first attempt did not touch the destination yet
+                    if keep_dst and not retry_number and not self.resume_offset:
+                        logger.warning(
+                            f"'{dst}' is not a partial copy of '{src}', it will NOT be "
+                            "overwritten!"
+                        )
+                        dst_kept = True
+                        return False
+                    return await self._async_file_transfer(
+                        operation,
+                        src,
+                        dst,
+                        progress_handler=reporter if reporter.enabled else None,
+                        tuning=tuning,
+                        resume=self.resume_offset > 0,
+                    )
+            finally:
+                self.transfer_digest = None
+                self.transfer_throttle = None
+                self.resume_offset = 0
+                transfer_result.bytes_transferred += self.transferred_bytes
+
+        reporter.phase("transfer")
+        start_time = monotonic()
         try:
             logger.info(f"{operation} '{src}' as '{dst}'")
-            _transferred = await self._async_file_transfer(
-                operation,
-                src,
-                dst,
+            transfer_result.transferred = await self._retry_phase(
+                "transfer",
+                retry,
+                transfer_result,
+                _transfer_attempt,
+                # data written to a stream which can't seek can't be taken back
+                lambda: not isinstance(dst, LocalSink) or dst.restartable,
             )
-            transfer_result.transferred = _transferred
             transfer_result.exists = True
         except Exception as e:
             raise e
+        finally:
+            timings.transfer = monotonic() - start_time
+            if timings.transfer > 0:
+                transfer_result.throughput = transfer_result.bytes_transferred / timings.transfer
+            # destination was (partially) rewritten, never trust the old hash
+            if operation == "get" and self.local_hash_cache is not None and isinstance(dst, str):
+                self.local_hash_cache.invalidate(dst)
+            if operation == "put" and self.device_hash_cache is not None:
+                self.device_hash_cache.invalidate(self.conn.host, dst_device_fs, dst)
 
-        if cleanup and self.transfer_feature_to_clean:
-            await self._cleanup_after_transfer()
+        streamed_file_data = None
+        if digest is not None:
+            streamed_file_data = self._check_streamed_file(dst, digest)
 
-        if verify:
-            await self._verify_transfer(
-                dst, dst_check, dst_device_fs, src_file_data, transfer_result
+        # a transfer session cleans up when it ends
+        if cleanup and self.transfer_feature_to_clean and self._session_stack is None:
+            reporter.phase("cleanup")
+            start_time = monotonic()
+            await self._cleanup()
+            timings.cleanup = monotonic() - start_time
+
+        # the destination did not change, it was already found to differ from the source
+        if verify and not dst_kept:
+            reporter.phase("verify")
+            start_time = monotonic()
+            await self._retry_phase(
+                "verify",
+                retry,
+                transfer_result,
+                lambda _: self._verify_transfer(
+                    dst,
+                    dst_check,
+                    dst_device_fs,
+                    src_file_data,
+                    transfer_result,
+                    streamed_file_data,
+                ),
             )
+            timings.verify = monotonic() - start_time
+
+        logger.debug(f"'{dst}' {transfer_result}")
 
         return transfer_result
 
+    async def _check_files(
+        self,
+        operation: Literal["get", "put"],
+        src: Union[str, LocalSource],
+        dst: Union[str, LocalSink],
+        device_fs: Optional[str],
+        timings: TransferTimings,
+    ) -> Tuple[Optional[str], FileCheckResult, FileCheckResult]:
+        """
+        Detect the device filesystem and check the source and destination files
+
+        The local file is hashed in the background while the device is queried, the device
+        commands are still sent one after another.
+
+        Args:
+            operation: 'get' or 'put'
+            src: source file name
+            dst: destination file name
+            device_fs: device filesystem, autodetected if empty
+            timings: filled with the duration of the filesystem detection and the checks
+
+        Returns:
+            (device filesystem, source FileCheckResult, destination FileCheckResult)
+        """
+        local_file, device_file = (src, dst) if operation == "put" else (dst, src)
+        local_phase, device_phase = (
+            ("src_check", "dst_check") if operation == "put" else ("dst_check", "src_check")
+        )
+
+        async def _timed_local_check() -> FileCheckResult:
+            start_time = monotonic()
+            local_file_data = await self.check_local_file(None, local_file)
+            setattr(timings, local_phase, monotonic() - start_time)
+            return local_file_data
+
+        local_check = asyncio.create_task(_timed_local_check())
+        try:
+            start_time = monotonic()
+            device_fs = device_fs or await self._device_fs()
+            timings.device_fs = monotonic() - start_time
+
+            start_time = monotonic()
+            device_file_data = await self.check_device_file(device_fs, device_file)
+            setattr(timings, device_phase, monotonic() - start_time)
+
+            local_file_data = await local_check
+        finally:
+            # device check failed, don't leave the local check behind
+            local_check.cancel()
+
+        if operation == "put":
+            return device_fs, local_file_data, device_file_data
+        return device_fs, device_file_data, local_file_data
+
     @staticmethod
     async def _verify_transfer(
-        dst, dst_check, dst_device_fs, src_file_data, transfer_result
+        dst, dst_check, dst_device_fs, src_file_data, transfer_result, dst_file_data=None
     ):
-        # check destination file after copy
-        dst_file_data = await dst_check(dst_device_fs, dst)
+        # check destination file after copy (unless it was hashed while it was written)
+        if dst_file_data is None:
+            dst_file_data = await dst_check(dst_device_fs, dst)
         # check if file was created
         if dst_file_data.hash:
             transfer_result.exists = True
@@ -0,0 +1,171 @@
+"""scrapli_transfer_utils.bulk"""
+import asyncio
+from contextlib import AsyncExitStack
+from dataclasses import fields
+from time import monotonic
+from typing import Any, AsyncIterator, Dict, Optional, Sequence
+
+from scrapli import AsyncScrapli
+
+from scrapli_transfer_utils.dataclasses import (
+    BulkTransferResult,
+    BulkTransferSpec,
+    BulkTransferStats,
+)
+from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
+from scrapli_transfer_utils.logging import logger
+
+
+class AsyncBulkFileTransfer:
+    """
+    Transfer one file to/from many devices with bounded concurrency
+
+    Every device definition is a dict of `AsyncScrapli` arguments (including `platform`, and
+    `transport` should be `asyncssh`). The optional `site_key` entry (default: `site`) is removed
+    before connecting and is used to limit the number of concurrent transfers per site.
+
+    Results are streamed back as soon as a device finishes:
+
+    .. code-block:: python
+
+        bulk = AsyncBulkFileTransfer(devices, BulkTransferSpec("put", src="image.bin"))
+        async for bulk_result in bulk.run():
+            print(bulk_result.host, bulk_result.result)
+        print(bulk.stats)
+    """
+
+    def __init__(
+        self,
+        devices: Sequence[Dict[str, Any]],
+        spec: BulkTransferSpec,
+        max_concurrency: int = 50,
+        max_site_concurrency: Optional[int] = None,
+        site_key: str = "site",
+        **feature_kwargs: Any,
+    ):
+        """
+        Args:
+            devices: device definitions (`AsyncScrapli` arguments plus optional site)
+            spec: transfer executed on every device
+            max_concurrency: maximum number of devices handled at the same time
+            max_site_concurrency: maximum number of devices of one site handled at the same time,
+                                  `None` for no per site limit
+            site_key: key in the device definition holding the site name
+            feature_kwargs: passed to the transfer feature of every device
+                            (e.g. `device_hash_cache`)
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"Invalid max_concurrency: {max_concurrency}")
+        if max_site_concurrency is not None and max_site_concurrency < 1:
+            raise ValueError(f"Invalid max_site_concurrency: {max_site_concurrency}")
+
+        self.devices = devices
+        self.spec = spec
+        self.max_concurrency = max_concurrency
+        self.max_site_concurrency = max_site_concurrency
+        self.site_key = site_key
+        self.feature_kwargs = feature_kwargs
+        self.stats = BulkTransferStats(total=len(devices))
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._site_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_site_semaphore(self, site: Optional[str]) -> Optional[asyncio.Semaphore]:
+        if site is None or self.max_site_concurrency is None:
+            return None
+        if site not in self._site_semaphores:
+            self._site_semaphores[site] = asyncio.Semaphore(self.max_site_concurrency)
+        return self._site_semaphores[site]
+
+    async def _transfer_device(self, device: Dict[str, Any]) -> BulkTransferResult:
+        conn_kwargs = dict(device)
+        site = conn_kwargs.pop(self.site_key, None)
+        host = conn_kwargs.get("host", "")
+        spec_kwargs = {field.name: getattr(self.spec, field.name) for field in fields(self.spec)}
+        feature_kwargs = dict(self.feature_kwargs)
+        if feature_kwargs.get("bandwidth_limiter") is not None and site is not None:
+            # the devices of a site share the bandwidth limit of the site
+            feature_kwargs.setdefault("bandwidth_group", site)
+
+        async with AsyncExitStack() as stack:
+            # wait for a site slot first, so we don't block a global slot while waiting
+            site_semaphore = self._get_site_semaphore(site)
+            if site_semaphore is not None:
+                await stack.enter_async_context(site_semaphore)
+            await stack.enter_async_context(self._semaphore)
+
+            start_time = monotonic()
+            try:
+                async with AsyncScrapli(**conn_kwargs) as conn:
+                    feature = AsyncSrapliTransferUtils(conn, **feature_kwargs)
+                    result = await feature.file_transfer(**spec_kwargs)
+            except Exception as e:
+                logger.warning(f"Bulk transfer to '{host}' failed: {e}")
+                return BulkTransferResult(
+                    host=host,
+                    site=site,
+                    result=None,
+                    exception=e,
+                    duration=monotonic() - start_time,
+                )
+
+            return BulkTransferResult(
+                host=host, site=site, result=result, duration=monotonic() - start_time
+            )
+
+    async def run(self) -> AsyncIterator[BulkTransferResult]:
+        """
+        Run the transfer on all devices
+
+        Yields:
+            BulkTransferResult for every device, in order of completion
+        """
+        self.stats = BulkTransferStats(total=len(self.devices))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._site_semaphores = {}
+
+        start_time = monotonic()
+        tasks = [asyncio.create_task(self._transfer_device(device)) for device in self.devices]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                bulk_result = await next_done
+                self.stats.add(bulk_result)
+                self.stats.duration = monotonic() - start_time
+                yield bulk_result
+        finally:
+            # consumer stopped early or got cancelled
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        logger.info(f"Bulk transfer finished: {self.stats}")
+
+
+async def bulk_file_transfer(
+    devices: Sequence[Dict[str, Any]],
+    spec: BulkTransferSpec,
+    max_concurrency: int = 50,
+    max_site_concurrency: Optional[int] = None,
+    site_key: str = "site",
+    **feature_kwargs: Any,
+) -> BulkTransferStats:
+    """
+    Run `AsyncBulkFileTransfer` to completion
+
+    Args:
+        devices: device definitions (`AsyncScrapli` arguments plus optional site)
+        spec: transfer executed on every device
+        max_concurrency: maximum number of devices handled at the same time
+        max_site_concurrency: maximum number of devices of one site handled at the same time
+        site_key: key in the device definition holding the site name
+        feature_kwargs: passed to the transfer feature of every device
+
+    Returns:
+        BulkTransferStats
+    """
+    bulk = AsyncBulkFileTransfer(
+        devices, spec, max_concurrency, max_site_concurrency, site_key, **feature_kwargs
+    )
+    async for _ in bulk.run():
+        pass
+    return bulk.stats
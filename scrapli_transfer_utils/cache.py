@@ -0,0 +1,435 @@
+"""scrapli_transfer_utils.cache"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
+
+from scrapli_transfer_utils.hashing import DEFAULT_HASH_ALGORITHM
+from scrapli_transfer_utils.logging import logger
+
+# (st_dev, st_ino, st_size, st_mtime_ns) identifies one version of a local file
+LocalFileKey = Tuple[int, int, int, int]
+
+
+class LocalHashCache:
+    """
+    Cache of local file hashes
+
+    Entries are stored per absolute path together with the device, inode, size and modification
+    time (ns) of the file at hashing time, with one hash per algorithm. A lookup with a different
+    stat result means the file was changed or replaced, so the entry is dropped and the file
+    needs to be hashed again.
+
+    Recently used entries are kept in memory (LRU). If `path` is given, entries are also written
+    to that JSON file, so they survive a restart of the process. Updates are collected for
+    `save_delay` seconds and written by a timer thread, so callers on an event loop never wait
+    for the file; `flush` (also called at exit) writes pending updates at once. The file is
+    replaced atomically; when several processes share one file the last writer wins.
+    """
+
+    def __init__(self, maxsize: int = 1024, path: Optional[str] = None, save_delay: float = 1.0):
+        """
+        Args:
+            maxsize: maximum number of files to remember
+            path: optional JSON file to persist the cache to
+            save_delay: seconds updates are collected before they are written to `path`
+        """
+        self.maxsize = maxsize
+        self.path = path
+        self.save_delay = save_delay
+        self._entries: "OrderedDict[str, Tuple[LocalFileKey, Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # serializes the writes, so an older snapshot never replaces a newer one
+        self._save_lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        self._dirty = False
+        if path:
+            self._load()
+
+    @staticmethod
+    def file_key(file_stat: os.stat_result) -> LocalFileKey:
+        return (
+            file_stat.st_dev,
+            file_stat.st_ino,
+            file_stat.st_size,
+            file_stat.st_mtime_ns,
+        )
+
+    def get(
+        self,
+        file_name: str,
+        file_stat: os.stat_result,
+        algorithm: str = DEFAULT_HASH_ALGORITHM,
+    ) -> Optional[str]:
+        """
+        Get the cached hash of a file
+
+        Args:
+            file_name: local file name
+            file_stat: current `os.stat` result of the file
+            algorithm: hash algorithm
+
+        Returns:
+            hash of the file or `None` if it is not cached (anymore)
+        """
+        path = os.path.abspath(file_name)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            if entry[0] != self.file_key(file_stat):
+                logger.debug(f"'{file_name}' changed since it was hashed, dropping cache entry")
+                del self._entries[path]
+                self._save()
+                return None
+            self._entries.move_to_end(path)
+            return entry[1].get(algorithm)
+
+    def set(
+        self,
+        file_name: str,
+        file_stat: os.stat_result,
+        file_hash: str,
+        algorithm: str = DEFAULT_HASH_ALGORITHM,
+    ) -> None:
+        """
+        Store the hash of a file
+
+        Args:
+            file_name: local file name
+            file_stat: `os.stat` result of the file taken before it was hashed
+            file_hash: hash of the file
+            algorithm: hash algorithm
+
+        Returns:
+            None
+        """
+        path = os.path.abspath(file_name)
+        file_key = self.file_key(file_stat)
+        with self._lock:
+            entry = self._entries.get(path)
+            # keep the hashes of other algorithms of the same file version
+            file_hashes = dict(entry[1]) if entry is not None and entry[0] == file_key else {}
+            file_hashes[algorithm] = file_hash
+            self._entries[path] = (file_key, file_hashes)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, file_name: str) -> None:
+        """
+        Drop the cached hash of a file
+
+        Args:
+            file_name: local file name
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self._entries.pop(os.path.abspath(file_name), None) is not None:
+                self._save()
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def flush(self) -> None:
+        """Write pending updates to `path` now"""
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                    atexit.unregister(self.flush)
+                if not self._dirty:
+                    return
+                self._dirty = False
+                stored = {
+                    path: [*key, file_hashes] for path, (key, file_hashes) in self._entries.items()
+                }
+            self._write(stored)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored: Dict[str, List] = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable hash cache '{self.path}': {e}")
+            return
+
+        if not isinstance(stored, dict):
+            logger.warning(f"Ignoring unreadable hash cache '{self.path}': not a JSON object")
+            return
+        for path, entry in list(stored.items())[-self.maxsize :]:
+            try:
+                st_dev, st_ino, st_size, st_mtime_ns, file_hashes = entry
+                file_key = (int(st_dev), int(st_ino), int(st_size), int(st_mtime_ns))
+                if isinstance(file_hashes, str):
+                    # written before hashes were stored per algorithm
+                    file_hashes = {DEFAULT_HASH_ALGORITHM: file_hashes}
+                if not isinstance(file_hashes, dict):
+                    raise ValueError(f"hashes must be an object, not {file_hashes!r}")
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable hash cache entry '{path}': {e}")
+                continue
+            self._entries[path] = (file_key, file_hashes)
+
+    def _save(self) -> None:
+        """Schedule writing the entries to `path`, called with `_lock` held"""
+        if not self.path:
+            return
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+            # a daemon timer does not run at exit, write the pending updates then
+            atexit.register(self.flush)
+
+    def _write(self, stored: Dict[str, List]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".hash_cache")
+        except OSError as e:
+            logger.warning(f"Unable to write hash cache '{self.path}': {e}")
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(stored, f)
+            os.replace(tmp_name, self.path)
+        except OSError as e:
+            logger.warning(f"Unable to write hash cache '{self.path}': {e}")
+            os.unlink(tmp_name)
+
+
+# shared by all transfer features in this process unless they get their own cache
+DEFAULT_LOCAL_HASH_CACHE = LocalHashCache()
+
+
+class DeviceHashCache:
+    """
+    Cache of file hashes on devices
+
+    Hashing a big image on a device (e.g. `verify /md5`) can take minutes. Entries are stored per
+    (host, filesystem, file name) together with the size and timestamp reported by `dir`, so a
+    cheap `dir` is enough to confirm that a cached hash is still valid. Hashes of several
+    algorithms can be stored for the same file. Files without a timestamp
+    (e.g. `system:/running-config`) are never cached.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """
+        Args:
+            maxsize: maximum number of device files to remember
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[int, str, Dict[str, str]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        host: str,
+        device_fs: Optional[str],
+        file_name: str,
+        size: int,
+        timestamp: str,
+        algorithm: str = DEFAULT_HASH_ALGORITHM,
+    ) -> Optional[str]:
+        """
+        Get the cached hash of a device file
+
+        Args:
+            host: device host
+            device_fs: filesystem on device (e.g. flash:/)
+            file_name: file on device
+            size: current size of the file as reported by the device
+            timestamp: current timestamp of the file as reported by the device
+            algorithm: hash algorithm
+
+        Returns:
+            hash of the file or `None` if it is not cached or the file changed
+        """
+        key = (host, device_fs or "", file_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[:2] != (size, timestamp):
+                logger.debug(f"'{device_fs}{file_name}' changed on {host}, dropping cache entry")
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2].get(algorithm)
+
+    def set(
+        self,
+        host: str,
+        device_fs: Optional[str],
+        file_name: str,
+        size: int,
+        timestamp: str,
+        file_hash: str,
+        algorithm: str = DEFAULT_HASH_ALGORITHM,
+    ) -> None:
+        """
+        Store the hash of a device file
+
+        Args:
+            host: device host
+            device_fs: filesystem on device (e.g. flash:/)
+            file_name: file on device
+            size: size of the file as reported by the device
+            timestamp: timestamp of the file as reported by the device
+            file_hash: hash of the file
+            algorithm: hash algorithm
+
+        Returns:
+            None
+        """
+        if not timestamp or not file_hash:
+            return
+        key = (host, device_fs or "", file_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            # keep the hashes of other algorithms of the same file version
+            file_hashes = (
+                dict(entry[2]) if entry is not None and entry[:2] == (size, timestamp) else {}
+            )
+            file_hashes[algorithm] = file_hash
+            self._entries[key] = (size, timestamp, file_hashes)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, host: str, device_fs: Optional[str], file_name: str) -> None:
+        """
+        Drop the cached hash of a device file
+
+        Args:
+            host: device host
+            device_fs: filesystem on device (e.g. flash:/)
+            file_name: file on device
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.pop((host, device_fs or "", file_name), None)
+
+    def clear(self, host: Optional[str] = None) -> None:
+        """
+        Drop all entries, or all entries of one host
+
+        Args:
+            host: only drop the entries of this host
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if host is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == host]:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DeviceStateCache:
+    """
+    Cache of device state that is slow to query, like the filesystem (`dir`) or whether the
+    device is capable of file transfer (`sh run all | i ...`)
+
+    Entries are stored per (host, key) and expire after `ttl` seconds. `None` values are never
+    stored, so `get` returning `None` always means "query the device".
+    """
+
+    def __init__(self, ttl: Optional[float] = None, maxsize: int = 4096):
+        """
+        Args:
+            ttl: seconds an entry stays valid, `None` to keep entries until invalidated
+            maxsize: maximum number of entries to remember
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, host: str, key: str) -> Any:
+        """
+        Get a cached value
+
+        Args:
+            host: device host
+            key: name of the value (e.g. `device_fs`)
+
+        Returns:
+            cached value or `None` if it is not cached or expired
+        """
+        with self._lock:
+            entry = self._entries.get((host, key))
+            if entry is None:
+                return None
+            if self.ttl is not None and monotonic() - entry[0] > self.ttl:
+                del self._entries[(host, key)]
+                return None
+            self._entries.move_to_end((host, key))
+            return entry[1]
+
+    def set(self, host: str, key: str, value: Any) -> None:
+        """
+        Store a value
+
+        Args:
+            host: device host
+            key: name of the value (e.g. `device_fs`)
+            value: value to store, `None` is ignored
+
+        Returns:
+            None
+        """
+        if value is None:
+            return
+        with self._lock:
+            self._entries[(host, key)] = (monotonic(), value)
+            self._entries.move_to_end((host, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, host: str, key: Optional[str] = None) -> None:
+        """
+        Drop a cached value, or all values of a host
+
+        Args:
+            host: device host
+            key: name of the value, `None` for all values of the host
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if key is not None:
+                self._entries.pop((host, key), None)
+                return
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == host]:
+                del self._entries[entry_key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
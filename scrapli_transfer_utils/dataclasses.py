@@ -1,7 +1,11 @@
-from dataclasses import dataclass
-from typing import TypedDict
+import random
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Literal, Optional, Tuple, Type, TypedDict
 
-from asyncssh import SSHClientConnectionOptions
+if TYPE_CHECKING:
+    from asyncssh import SSHClientConnectionOptions
+
+    from scrapli_transfer_utils.progress import ProgressStream
 
 
 @dataclass()
@@ -19,17 +23,83 @@ class FileCheckResult:
     free: int
 
 
+@dataclass()
+class TransferTimings:
+    """
+    Seconds spent in the phases of `file_transfer` (0.0 if the phase did not run)
+
+    device_fs - filesystem detection
+    src_check - source file check (hashing)
+    dst_check - destination file check (hashing)
+    capability - transfer capability check/configuration
+    transfer - file copy, including opening the SSH channel/connection
+    cleanup - configuration restore
+    verify - destination check after the copy
+
+    The local file is checked while the device is queried, so src_check and dst_check (and
+    device_fs) overlap.
+    """
+
+    device_fs: float = 0.0
+    src_check: float = 0.0
+    dst_check: float = 0.0
+    capability: float = 0.0
+    transfer: float = 0.0
+    cleanup: float = 0.0
+    verify: float = 0.0
+
+
 @dataclass()
 class FileTransferResult:
     """
     exists - True if destination existed or created
     transferred - True if file was transferred
     verified - True if files are identical (hashes match)
+    timings - seconds spent per phase
+    bytes_transferred - bytes copied (without the part of a resumed file already present), summed
+                        over all attempts
+    throughput - bytes_transferred per second of the transfer phase
+    retries - phases run again after a retryable error (see RetryPolicy)
     """
 
     exists: bool
     transferred: bool
     verified: bool
+    timings: TransferTimings = field(default_factory=TransferTimings)
+    bytes_transferred: int = 0
+    throughput: float = 0.0
+    retries: int = 0
+
+
+TransferPhase = Literal["check", "capability", "transfer", "cleanup", "verify", "done", "failed"]
+
+
+@dataclass()
+class TransferProgress:
+    """
+    host - device host
+    operation - 'get' or 'put'
+    src - source file name
+    dst - destination file name
+    phase - 'check', 'capability', 'transfer', 'cleanup', 'verify', then 'done' (or 'failed'
+            if `file_transfer` raised an exception)
+    done - bytes copied so far
+    total - size of the file (0 until the transfer reports it)
+    rate - bytes per second copied in the transfer phase
+    elapsed - seconds since `file_transfer` was called
+    result - FileTransferResult, only set with the 'done' event
+    """
+
+    host: str
+    operation: Literal["get", "put"]
+    src: str
+    dst: str
+    phase: TransferPhase
+    done: int = 0
+    total: int = 0
+    rate: float = 0.0
+    elapsed: float = 0.0
+    result: Optional[FileTransferResult] = None
 
 
 @dataclass()
@@ -47,7 +117,7 @@ class SCPConnectionParameterType(TypedDict):
     password: str
     host: str
     port: int
-    options: SSHClientConnectionOptions
+    options: "SSHClientConnectionOptions"
 
 
 @dataclass()
@@ -60,3 +130,159 @@ class SFTPConnectionParameterType(TypedDict):
     port: SSH port
     options: current SSH connection options
     """
+
+    username: str
+    password: str
+    host: str
+    port: int
+    options: "SSHClientConnectionOptions"
+
+
+@dataclass()
+class TransferTuning:
+    """
+    Tuning of the SCP/SFTP data transfer
+
+    block_size - bytes per SCP block or per SFTP read/write request
+    max_requests - SFTP requests in flight before waiting for a reply (SCP is a stream and
+                   does not use it)
+    window - SSH receive window of the transfer channel in bytes, `None` for the asyncssh
+             default. Only applies to channels we open with our own settings (SCP, or SFTP on a
+             new SSH connection)
+    max_pktsize - maximum SSH packet size of the transfer channel in bytes, `None` for the
+                  asyncssh default. Same scope as `window`
+    auto_tune - SFTP only: measure the request round trip time during the first blocks and
+                raise max_requests/block_size while replies arrive as fast as an idle round trip
+    max_auto_requests - upper limit for max_requests when auto tuning
+    max_auto_block_size - upper limit for block_size when auto tuning (the SFTP server limit
+                          is never exceeded)
+    resume_verify_size - bytes compared at the start and at the end of a partial file before
+                         it is resumed, `None` to compare all of it (reads it back completely)
+    """
+
+    block_size: int = 65536
+    max_requests: int = 16
+    window: Optional[int] = None
+    max_pktsize: Optional[int] = None
+    auto_tune: bool = False
+    max_auto_requests: int = 128
+    max_auto_block_size: int = 262144
+    resume_verify_size: Optional[int] = 65536
+
+
+@dataclass()
+class RetryPolicy:
+    """
+    Retries of the phases of `file_transfer` failing with a transient error
+
+    Only the failed phase runs again: the file checks, the copy or the verification. The
+    capability check and the cleanup change the device configuration and are never retried.
+    A failed copy continues from the partial destination on platforms with `supports_resume`.
+
+    max_attempts - attempts per phase, including the first one
+    base_delay - seconds before the first retry
+    max_delay - upper limit of the delay between two attempts
+    multiplier - growth of the delay per retry
+    jitter - random part of the delay (0-1), e.g. 0.5 waits between 50% and 100% of the delay,
+             so transfers failing together don't retry together
+    retry_on - exception classes retried in addition to the `retryable_errors` of the platform
+               (e.g. `asyncssh.PermissionDenied` if the AAA server times out now and then)
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+    jitter: float = 0.5
+    retry_on: Tuple[Type[BaseException], ...] = ()
+
+    def delay(self, retry: int) -> float:
+        """Seconds to wait before retry number `retry` (starting at 1)"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (retry - 1))
+        return delay * (1 - self.jitter * random.random())
+
+
+@dataclass()
+class BulkTransferSpec:
+    """
+    Arguments of `file_transfer` used for every device of a bulk transfer.
+    See `AsyncTransferFeature.file_transfer` for the meaning of the fields.
+    """
+
+    operation: Literal["get", "put"]
+    src: str
+    dst: str = ""
+    verify: bool = True
+    device_fs: Optional[str] = None
+    overwrite: bool = False
+    force_config: bool = False
+    cleanup: bool = True
+    tuning: Optional[TransferTuning] = None
+    resume: bool = False
+    retry: Optional[RetryPolicy] = None
+    # bytes per second of every device, pass a `bandwidth_limiter` for shared limits
+    bandwidth: Optional[float] = None
+    # shared by all devices, the events carry the host
+    progress: Optional["ProgressStream"] = None
+
+
+@dataclass()
+class BulkTransferResult:
+    """
+    host - device host
+    site - site of the device (None if not set)
+    result - FileTransferResult (None if the transfer raised an exception)
+    exception - exception raised while connecting or transferring (None on success)
+    duration - seconds spent on the device, including connecting
+    """
+
+    host: str
+    site: Optional[str]
+    result: Optional[FileTransferResult]
+    exception: Optional[BaseException] = None
+    duration: float = 0.0
+
+
+@dataclass()
+class BulkTransferStats:
+    """
+    Aggregated results of a bulk transfer
+
+    total - number of devices
+    completed - devices finished so far (with or without error)
+    exists - devices where the destination exists
+    transferred - devices where the file was transferred
+    verified - devices where the destination hash matches the source
+    failed - devices which raised an exception
+    bytes_transferred - bytes copied to/from all devices
+    retries - phases run again after a retryable error, on all devices
+    duration - seconds since the bulk transfer started
+    """
+
+    total: int = 0
+    completed: int = 0
+    exists: int = 0
+    transferred: int = 0
+    verified: int = 0
+    failed: int = 0
+    bytes_transferred: int = 0
+    retries: int = 0
+    duration: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second of all devices together over the duration of the bulk transfer"""
+        return self.bytes_transferred / self.duration if self.duration > 0 else 0.0
+
+    def add(self, bulk_result: BulkTransferResult) -> None:
+        """Account one finished device"""
+        self.completed += 1
+        if bulk_result.exception is not None or bulk_result.result is None:
+            self.failed += 1
+            return
+        self.exists += bulk_result.result.exists
+        self.transferred += bulk_result.result.transferred
+        self.verified += bulk_result.result.verified
+        self.bytes_transferred += bulk_result.result.bytes_transferred
+        self.retries += bulk_result.result.retries
+
@@ -1,5 +1,49 @@
 """scrapli_scp.exceptions"""
+from typing import Optional
 
 
 class ScrapliSCPException(Exception):
     pass
+
+
+class ScrapliTransferError(ScrapliSCPException):
+    """
+    A file transfer failed
+
+    operation - 'get' or 'put'
+    src - source file name
+    dst - destination file name
+    reason - error reported by the remote side or the local system
+    code - protocol specific error code (e.g. SFTP status code), None if unknown
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        src: str,
+        dst: str,
+        reason: str,
+        code: Optional[int] = None,
+    ):
+        self.operation = operation
+        self.src = src
+        self.dst = dst
+        self.reason = reason
+        self.code = code
+        super().__init__(f"{operation} '{src}' as '{dst}' failed: {reason}")
+
+
+class TransferFileNotFoundError(ScrapliTransferError, FileNotFoundError):
+    pass
+
+
+class TransferPermissionError(ScrapliTransferError, PermissionError):
+    pass
+
+
+class TransferNoSpaceError(ScrapliTransferError):
+    pass
+
+
+class TransferConnectionError(ScrapliTransferError, ConnectionError):
+    pass
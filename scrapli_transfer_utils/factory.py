@@ -1,34 +1,43 @@
 """scrapli_scp.factory"""
+import warnings
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
+
 from scrapli.driver.network import AsyncNetworkDriver, NetworkDriver
-from scrapli.driver.core import (
-    AsyncIOSXEDriver,
-)
-from scrapli_community.huawei.vrp.async_driver import AsyncHuaweiVRPDriver
-
-from scrapli_transfer_utils.async_transfer.asyncscp.cisco_iosxe import AsyncSCPIOSXE
-from scrapli_transfer_utils.async_transfer.asyncsftp.huawei_vrp import (
-    AsyncSFTPHuaweiVrp,
-)
-from scrapli_transfer_utils.async_transfer.base import AsyncTransferFeature
+
 from scrapli_transfer_utils.exceptions import ScrapliSCPException
+from scrapli_transfer_utils.registry import DEFAULT_REGISTRY
 
-ASYNC_CORE_PLATFORM_MAP = {
-    AsyncIOSXEDriver: AsyncSCPIOSXE,
-    AsyncHuaweiVRPDriver: AsyncSFTPHuaweiVrp,
-}
+if TYPE_CHECKING:
+    from scrapli_transfer_utils.async_transfer.base import AsyncTransferFeature
 
 
-def AsyncSrapliTransferUtils(conn: AsyncNetworkDriver) -> "AsyncTransferFeature":
+def AsyncSrapliTransferUtils(
+    conn: AsyncNetworkDriver, **kwargs: Any
+) -> "AsyncTransferFeature":
     if isinstance(conn, NetworkDriver):
         raise ScrapliSCPException(
             "provided scrapli connection is sync but using 'AsyncScrapliCfg' -- you must use an "
             "async connection with 'AsyncScrapliCfg'!"
         )
-    platform_class = ASYNC_CORE_PLATFORM_MAP.get(type(conn))
+    platform_class = DEFAULT_REGISTRY.get(type(conn))
     if not platform_class:
         raise ScrapliSCPException(
             f"scrapli connection object type '{type(conn)}' not a supported scrapli-scp type"
         )
-    final_platform: "AsyncTransferFeature" = platform_class(conn)
+    final_platform: "AsyncTransferFeature" = platform_class(conn, **kwargs)
 
     return final_platform
+
+
+def __getattr__(name: str) -> Any:
+    # the platform map was replaced by the lazy `DEFAULT_REGISTRY`, kept as a read-only view
+    if name == "ASYNC_CORE_PLATFORM_MAP":
+        warnings.warn(
+            "ASYNC_CORE_PLATFORM_MAP is deprecated, use "
+            "scrapli_transfer_utils.registry.DEFAULT_REGISTRY or register_platform",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return MappingProxyType(DEFAULT_REGISTRY.platforms())
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -0,0 +1,304 @@
+"""scrapli_transfer_utils.hashing"""
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, FrozenSet, Hashable, List, Optional, Sequence, Tuple
+
+# 1 MiB keeps the number of read syscalls low while memory usage stays flat
+DEFAULT_HASH_CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_HASH_ALGORITHM = "md5"
+
+
+def hash_file_digests(
+    file_name: str,
+    algorithms: Sequence[str] = (DEFAULT_HASH_ALGORITHM,),
+    chunk_size: int = DEFAULT_HASH_CHUNK_SIZE,
+) -> Dict[str, str]:
+    """
+    Calculate several hashes of a local file in one pass
+
+    The file is read into a single reusable buffer, so memory usage does not depend on the size
+    of the file, and every chunk is fed to all algorithms before the next one is read. This
+    call blocks, use `async_hash_file_digests` from async code.
+
+    Args:
+        file_name: local file to hash
+        algorithms: `hashlib` algorithm names (e.g. `md5`, `sha256`, `sha512`)
+        chunk_size: number of bytes to read from the file at once
+
+    Returns:
+        hex digest of the file per algorithm
+
+    Raises:
+        FileNotFoundError: if the file does not exist
+        ValueError: if chunk_size is not a positive number or an algorithm is not supported
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"Invalid chunk size: {chunk_size}")
+
+    file_hashes = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(file_name, "rb", buffering=0) as f:
+        while True:
+            read_bytes = f.readinto(buffer)
+            if not read_bytes:
+                break
+            for file_hash in file_hashes.values():
+                file_hash.update(view[:read_bytes])
+
+    return {algorithm: file_hash.hexdigest() for algorithm, file_hash in file_hashes.items()}
+
+
+def hash_file(
+    file_name: str,
+    chunk_size: int = DEFAULT_HASH_CHUNK_SIZE,
+    algorithm: str = DEFAULT_HASH_ALGORITHM,
+) -> str:
+    """
+    Calculate the hash (MD5 by default) of a local file in chunks
+
+    This call blocks, use `async_hash_file` from async code.
+
+    Args:
+        file_name: local file to hash
+        chunk_size: number of bytes to read from the file at once
+        algorithm: `hashlib` algorithm name
+
+    Returns:
+        str: hex digest of the file
+
+    Raises:
+        FileNotFoundError: if the file does not exist
+        ValueError: if chunk_size is not a positive number or the algorithm is not supported
+    """
+    return hash_file_digests(file_name, (algorithm,), chunk_size)[algorithm]
+
+
+async def async_hash_file_digests(
+    file_name: str,
+    algorithms: Sequence[str] = (DEFAULT_HASH_ALGORITHM,),
+    chunk_size: int = DEFAULT_HASH_CHUNK_SIZE,
+) -> Dict[str, str]:
+    """
+    Calculate several hashes of a local file in one pass in a worker thread
+
+    Args:
+        file_name: local file to hash
+        algorithms: `hashlib` algorithm names
+        chunk_size: number of bytes to read from the file at once
+
+    Returns:
+        hex digest of the file per algorithm
+    """
+    return await asyncio.to_thread(hash_file_digests, file_name, algorithms, chunk_size)
+
+
+async def async_hash_file(
+    file_name: str,
+    chunk_size: int = DEFAULT_HASH_CHUNK_SIZE,
+    algorithm: str = DEFAULT_HASH_ALGORITHM,
+) -> str:
+    """
+    Calculate the hash (MD5 by default) of a local file in a worker thread
+
+    hashlib releases the GIL while hashing, so the event loop keeps serving other transfers.
+
+    Args:
+        file_name: local file to hash
+        chunk_size: number of bytes to read from the file at once
+        algorithm: `hashlib` algorithm name
+
+    Returns:
+        str: hex digest of the file
+    """
+    return await asyncio.to_thread(hash_file, file_name, chunk_size, algorithm)
+
+
+class StreamingDigest:
+    """
+    Hashes of data passing through a transfer, calculated without reading it again
+
+    Blocks are fed with their offset and may arrive out of order (SFTP reads complete in any
+    order): a block is kept until the blocks in front of it arrived, so the hashes always cover
+    the data from offset 0 without gaps. Blocks are hashed in the calling thread.
+    """
+
+    def __init__(self, algorithms: Sequence[str] = (DEFAULT_HASH_ALGORITHM,)):
+        """
+        Args:
+            algorithms: `hashlib` algorithm names
+        """
+        self._hashes = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+        # bytes hashed so far, all of them in order from offset 0
+        self.size = 0
+        self._pending: Dict[int, bytes] = {}
+        self._overlap = False
+
+    def update_at(self, offset: int, data: bytes) -> None:
+        """
+        Feed a block
+
+        Args:
+            offset: position of the block in the file
+            data: content of the block
+
+        Returns:
+            None
+        """
+        if offset != self.size:
+            if offset < self.size:
+                # data was sent twice, the hashes can't be trusted anymore
+                self._overlap = True
+            else:
+                self._pending[offset] = data
+            return
+
+        while True:
+            for file_hash in self._hashes.values():
+                file_hash.update(data)
+            self.size += len(data)
+            data = self._pending.pop(self.size, None)
+            if data is None:
+                return
+
+    @property
+    def complete(self) -> bool:
+        """True if the hashes cover all data fed so far (no gaps, nothing before offset 0)"""
+        return not self._pending and not self._overlap
+
+    def hexdigests(self) -> Dict[str, str]:
+        """Hex digest per algorithm of the first `size` bytes"""
+        return {algorithm: file_hash.hexdigest() for algorithm, file_hash in self._hashes.items()}
+
+
+class HashingService:
+    """
+    Hashes local files on a thread pool
+
+    hashlib releases the GIL while hashing, so up to `max_workers` files are hashed in parallel.
+    Requests for a file which is already being hashed (same path, size and modification time,
+    same or fewer algorithms) wait for that computation instead of reading the file again.
+    The service can be shared by several event loops (e.g. tests or `SyncTransferUtils`).
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Args:
+            max_workers: number of files hashed at the same time, default is the number of CPUs
+        """
+        if max_workers is not None and max_workers < 1:
+            raise ValueError(f"Invalid max_workers: {max_workers}")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # running computations per file version, with the algorithms they calculate
+        self._running: Dict[Hashable, List[Tuple[FrozenSet[str], "Future[Dict[str, str]]"]]] = {}
+        self._lock = threading.Lock()
+
+    def _submit(
+        self, file_name: str, algorithms: Sequence[str], chunk_size: int
+    ) -> "Future[Dict[str, str]]":
+        file_stat = os.stat(file_name)
+        key = (
+            os.path.abspath(file_name),
+            file_stat.st_dev,
+            file_stat.st_ino,
+            file_stat.st_size,
+            file_stat.st_mtime_ns,
+        )
+        wanted = frozenset(algorithms)
+        with self._lock:
+            for running_algorithms, future in self._running.get(key, []):
+                if wanted <= running_algorithms:
+                    return future
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="scrapli-hash"
+                )
+            future = self._executor.submit(hash_file_digests, file_name, algorithms, chunk_size)
+            self._running.setdefault(key, []).append((wanted, future))
+
+        def _done(done_future: "Future[Dict[str, str]]") -> None:
+            with self._lock:
+                running = self._running.get(key, [])
+                running[:] = [entry for entry in running if entry[1] is not done_future]
+                if not running:
+                    self._running.pop(key, None)
+
+        future.add_done_callback(_done)
+        return future
+
+    async def hash_file(
+        self,
+        file_name: str,
+        algorithms: Sequence[str] = (DEFAULT_HASH_ALGORITHM,),
+        chunk_size: int = DEFAULT_HASH_CHUNK_SIZE,
+    ) -> Dict[str, str]:
+        """
+        Calculate several hashes of a local file in one pass on the pool
+
+        Args:
+            file_name: local file to hash
+            algorithms: `hashlib` algorithm names
+            chunk_size: number of bytes to read from the file at once
+
+        Returns:
+            hex digest of the file per algorithm
+
+        Raises:
+            FileNotFoundError: if the file does not exist
+            ValueError: if chunk_size is not a positive number or an algorithm is not supported
+        """
+        future = self._submit(file_name, algorithms, chunk_size)
+        # a cancelled caller must not cancel the computation other callers wait for
+        file_hashes = await asyncio.shield(asyncio.wrap_future(future))
+        return {algorithm: file_hashes[algorithm] for algorithm in algorithms}
+
+    async def hash_files(
+        self,
+        file_names: Sequence[str],
+        algorithms: Sequence[str] = (DEFAULT_HASH_ALGORITHM,),
+        chunk_size: int = DEFAULT_HASH_CHUNK_SIZE,
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Hash many local files in parallel
+
+        Args:
+            file_names: local files to hash
+            algorithms: `hashlib` algorithm names
+            chunk_size: number of bytes to read from the file at once
+
+        Returns:
+            hex digest per algorithm per file name
+
+        Raises:
+            FileNotFoundError: if one of the files does not exist
+        """
+        file_names = list(dict.fromkeys(file_names))
+        results = await asyncio.gather(
+            *(self.hash_file(file_name, algorithms, chunk_size) for file_name in file_names)
+        )
+        return dict(zip(file_names, results))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the worker threads, they are started again by the next request
+
+        Args:
+            wait: wait for the running computations to finish
+
+        Returns:
+            None
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+# shared by all transfer features in this process unless they get their own service
+DEFAULT_HASHING_SERVICE = HashingService()
@@ -0,0 +1,331 @@
+"""scrapli_transfer_utils.local"""
+import asyncio
+import hashlib
+import inspect
+import os
+import sys
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Union
+
+from scrapli_transfer_utils.dataclasses import FileCheckResult
+from scrapli_transfer_utils.hashing import DEFAULT_HASH_ALGORITHM, DEFAULT_HASH_CHUNK_SIZE
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+async def _maybe_await(value: Any) -> Any:
+    """Result of a sync or async (e.g. aiofiles) file method"""
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+def _object_name(obj: Any) -> Optional[str]:
+    name = getattr(obj, "name", None)
+    return name if isinstance(name, str) else None
+
+
+class LocalSource:
+    """
+    Data to `put` which is not a local file name
+
+    Bytes-like objects are sent straight from memory. File-like objects (with a `read` method,
+    sync or async like aiofiles) are read block by block from their current position; objects
+    which can not seek are read into memory first, as SCP needs the size before the data and the
+    hash is compared before the transfer.
+    """
+
+    def __init__(self, data: Union[BytesLike, Any]):
+        """
+        Args:
+            data: bytes, bytearray, memoryview or readable file-like object
+        """
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            self._buffer: Optional[memoryview] = memoryview(data).cast("B")
+            self._stream = None
+        elif hasattr(data, "read"):
+            self._buffer = None
+            self._stream = data
+        else:
+            raise TypeError(f"Unsupported transfer source: {type(data).__name__}")
+        self.name = _object_name(data)
+        self.size = self._buffer.nbytes if self._buffer is not None else 0
+        self._kind = type(data).__name__
+        self._prepared = self._buffer is not None
+        # position of the stream where the data starts and where the next read continues
+        self._start = 0
+        self._position: Optional[int] = None
+
+    def __str__(self) -> str:
+        return self.name or f"<{self._kind}>"
+
+    async def prepare(self) -> None:
+        """Find the size of a stream (or read it into memory if it can't seek)"""
+        if self._prepared:
+            return
+        self._prepared = True
+        stream = self._stream
+        seekable = getattr(stream, "seekable", None)
+        if seekable is not None and await _maybe_await(seekable()):
+            self._start = await _maybe_await(stream.tell())
+            self.size = await _maybe_await(stream.seek(0, os.SEEK_END)) - self._start
+            return
+
+        chunks = []
+        while True:
+            chunk = await _maybe_await(stream.read(DEFAULT_HASH_CHUNK_SIZE))
+            if not chunk:
+                break
+            chunks.append(chunk)
+        self._buffer = memoryview(b"".join(chunks))
+        self.size = self._buffer.nbytes
+        self._stream = None
+
+    async def read_at(self, offset: int, size: int) -> bytes:
+        """
+        Read a block of the data
+
+        Args:
+            offset: position relative to the start of the data
+            size: maximum number of bytes to read
+
+        Returns:
+            bytes: the block, shorter at the end of the data
+        """
+        if self._buffer is not None:
+            return self._buffer[offset : offset + size].tobytes()
+        if self._position != offset:
+            await _maybe_await(self._stream.seek(self._start + offset))
+        data = await _maybe_await(self._stream.read(size))
+        self._position = offset + len(data)
+        return data
+
+    async def check(
+        self, algorithm: str = DEFAULT_HASH_ALGORITHM, chunk_size: int = DEFAULT_HASH_CHUNK_SIZE
+    ) -> FileCheckResult:
+        """
+        Hash and size of the data (free space is not applicable)
+
+        Args:
+            algorithm: `hashlib` algorithm name
+            chunk_size: number of bytes read from a stream at once
+
+        Returns:
+            FileCheckResult
+        """
+        await self.prepare()
+        if self._buffer is not None:
+            # hashlib releases the GIL, big buffers don't block the event loop
+            file_hash = await asyncio.to_thread(
+                lambda: hashlib.new(algorithm, self._buffer).hexdigest()
+            )
+        else:
+            digest = hashlib.new(algorithm)
+            offset = 0
+            while offset < self.size:
+                data = await self.read_at(offset, min(chunk_size, self.size - offset))
+                if not data:
+                    break
+                digest.update(data)
+                offset += len(data)
+            file_hash = digest.hexdigest()
+        return FileCheckResult(hash=file_hash, size=self.size, free=0)
+
+
+class LocalSink:
+    """
+    Destination of a `get` which is not a local file name
+
+    A bytearray is used like a file: its content is compared with the source before the transfer
+    and replaced by the copy. File-like objects (with a `write` method, sync or async like
+    aiofiles) are written in order from their current position and are not closed; the hash of
+    the written data is calculated on the way, so the copy is verified without reading it back.
+    A copy which failed after writing to a stream can only be started again if the stream can
+    seek back to where the copy started.
+    """
+
+    def __init__(self, target: Union[bytearray, Any], algorithm: str = DEFAULT_HASH_ALGORITHM):
+        """
+        Args:
+            target: bytearray or writable file-like object
+            algorithm: `hashlib` algorithm of the hash calculated while writing to a stream
+        """
+        if isinstance(target, bytearray):
+            self._buffer: Optional[bytearray] = target
+            self._stream = None
+        elif hasattr(target, "write"):
+            self._buffer = None
+            self._stream = target
+        else:
+            raise TypeError(f"Unsupported transfer destination: {type(target).__name__}")
+        self.name = _object_name(target)
+        self.algorithm = algorithm
+        self._kind = type(target).__name__
+        # blocks which arrived before the ones in front of them, by offset
+        self._pending: Dict[int, bytes] = {}
+        self._position = 0
+        self._digest: Optional[Any] = None
+        self._hash = ""
+        self._lock = asyncio.Lock()
+        # position of the stream where the first copy started, `None` if it can't seek
+        self._start: Optional[int] = None
+        self._opened = False
+
+    def __str__(self) -> str:
+        return self.name or f"<{self._kind}>"
+
+    @property
+    def restartable(self) -> bool:
+        """True if a failed copy can be started again (nothing was written it can't take back)"""
+        return (
+            self._buffer is not None
+            or self._start is not None
+            or not self._opened
+            or self._position == 0
+        )
+
+    async def open(self) -> None:
+        """Start a new copy, a stream is rewound to where the first copy started"""
+        if self._buffer is not None:
+            del self._buffer[:]
+            return
+        stream = self._stream
+        if not self._opened:
+            self._opened = True
+            seekable = getattr(stream, "seekable", None)
+            if seekable is not None and await _maybe_await(seekable()):
+                self._start = await _maybe_await(stream.tell())
+        elif self._start is not None:
+            await _maybe_await(stream.seek(self._start))
+            truncate = getattr(stream, "truncate", None)
+            if truncate is not None:
+                await _maybe_await(truncate())
+        self._pending = {}
+        self._position = 0
+        self._digest = hashlib.new(self.algorithm)
+        self._hash = ""
+
+    async def write_at(self, offset: int, data: bytes) -> None:
+        """
+        Write a block, blocks may arrive out of order
+
+        Args:
+            offset: position of the block in the file
+            data: content of the block
+
+        Returns:
+            None
+        """
+        if self._buffer is not None:
+            if len(self._buffer) < offset:
+                self._buffer.extend(bytes(offset - len(self._buffer)))
+            self._buffer[offset : offset + len(data)] = data
+            return
+
+        self._pending[offset] = data
+        async with self._lock:
+            while self._position in self._pending:
+                data = self._pending.pop(self._position)
+                await _maybe_await(self._stream.write(data))
+                self._digest.update(data)
+                self._position += len(data)
+
+    async def truncate(self, size: int) -> None:
+        """Cut a bytearray back to the data received without gaps (a stream keeps its data)"""
+        if self._buffer is not None:
+            del self._buffer[size:]
+
+    async def close(self) -> None:
+        """Finish the copy, the target itself stays open"""
+        if self._stream is None:
+            return
+        flush = getattr(self._stream, "flush", None)
+        if flush is not None:
+            await _maybe_await(flush())
+        if self._digest is not None and not self._pending:
+            self._hash = self._digest.hexdigest()
+
+    async def check(self, algorithm: str = DEFAULT_HASH_ALGORITHM) -> FileCheckResult:
+        """
+        Hash and size of the data (free space is unlimited)
+
+        A stream has no hash before it was written completely.
+
+        Args:
+            algorithm: `hashlib` algorithm name
+
+        Returns:
+            FileCheckResult
+        """
+        if self._buffer is not None:
+            buffer = self._buffer
+            file_hash = (
+                await asyncio.to_thread(lambda: hashlib.new(algorithm, buffer).hexdigest())
+                if buffer
+                else ""
+            )
+            return FileCheckResult(hash=file_hash, size=len(buffer), free=sys.maxsize)
+        file_hash = self._hash if algorithm == self.algorithm else ""
+        return FileCheckResult(hash=file_hash, size=self._position, free=sys.maxsize)
+
+
+class _FileSink:
+    """Local file written at random offsets"""
+
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    async def write_at(self, offset: int, data: bytes) -> None:
+        os.pwrite(self.fd, data, offset)
+
+    async def truncate(self, size: int) -> None:
+        os.ftruncate(self.fd, size)
+
+
+@asynccontextmanager
+async def open_source(src: Union[str, LocalSource]) -> AsyncIterator[LocalSource]:
+    """
+    Open the source of a `put`
+
+    Args:
+        src: local file name or LocalSource
+
+    Yields:
+        LocalSource
+    """
+    if not isinstance(src, str):
+        await src.prepare()
+        yield src
+        return
+    with open(src, "rb") as local_file:
+        source = LocalSource(local_file)
+        await source.prepare()
+        yield source
+
+
+@asynccontextmanager
+async def open_sink(
+    dst: Union[str, LocalSink], offset: int = 0
+) -> AsyncIterator[Union[LocalSink, _FileSink]]:
+    """
+    Open the destination of a `get`
+
+    Args:
+        dst: local file name or LocalSink
+        offset: keep a local file up to this offset (to resume a transfer)
+
+    Yields:
+        object with async `write_at(offset, data)` and `truncate(size)`
+    """
+    if not isinstance(dst, str):
+        await dst.open()
+        try:
+            yield dst
+        finally:
+            await dst.close()
+        return
+    fd = os.open(dst, os.O_WRONLY | os.O_CREAT | (0 if offset else os.O_TRUNC), 0o644)
+    try:
+        yield _FileSink(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,183 @@
+"""scrapli_transfer_utils.progress"""
+import asyncio
+from time import monotonic
+from typing import Callable, Dict, Hashable, Literal, Optional, Tuple
+
+from scrapli_transfer_utils.dataclasses import (
+    FileTransferResult,
+    TransferPhase,
+    TransferProgress,
+)
+
+ProgressHandler = Optional[Callable[[str, str, int, int], None]]
+
+
+class ProgressStream:
+    """
+    Progress of one or many transfers as an async iterator
+
+    Pass the stream to `file_transfer(progress=...)` (or `BulkTransferSpec(progress=...)`) and
+    iterate over it while the transfers run:
+
+    .. code-block:: python
+
+        progress = ProgressStream(max_rate=2)
+
+        async def run():
+            try:
+                return await transfer.file_transfer("put", "image.bin", progress=progress)
+            finally:
+                progress.close()
+
+        task = asyncio.create_task(run())
+        async for event in progress:
+            print(event.phase, event.done, event.total, event.rate)
+        result = await task
+
+    Every transfer publishes at most `max_rate` events per second during the transfer phase, plus
+    one event per phase change. If the consumer falls behind, only the latest event of every
+    transfer is kept, so memory does not grow with the number of copied blocks.
+    """
+
+    def __init__(self, max_rate: Optional[float] = 2.0):
+        """
+        Args:
+            max_rate: maximum number of transfer phase events per second and transfer, `None` or
+                      `0` to publish every block
+        """
+        self.interval = 1 / max_rate if max_rate else 0.0
+        # latest unconsumed event per transfer, oldest first
+        self._pending: Dict[Hashable, TransferProgress] = {}
+        self._wakeup = asyncio.Event()
+        self._closed = False
+
+    def publish(self, event: TransferProgress, key: Optional[Hashable] = None) -> None:
+        """
+        Queue an event, replacing an unconsumed event of the same transfer
+
+        Args:
+            event: progress event
+            key: identifies the transfer, default is (host, src, dst) of the event
+
+        Returns:
+            None
+        """
+        if key is None:
+            key = (event.host, event.src, event.dst)
+        self._pending.pop(key, None)
+        self._pending[key] = event
+        self._wakeup.set()
+
+    def close(self) -> None:
+        """End the iteration once the queued events are consumed"""
+        self._closed = True
+        self._wakeup.set()
+
+    def __aiter__(self) -> "ProgressStream":
+        return self
+
+    async def __anext__(self) -> TransferProgress:
+        while not self._pending:
+            if self._closed:
+                raise StopAsyncIteration
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        return self._pending.pop(next(iter(self._pending)))
+
+
+class ProgressReporter:
+    """
+    Progress of one `file_transfer` call
+
+    Used as the `progress_handler` of the platform transfer: the optional callback gets every
+    block, the stream only gets an event when its interval has passed or the copy completed.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        operation: Literal["get", "put"],
+        src: str,
+        dst: str,
+        stream: Optional[ProgressStream] = None,
+        handler: ProgressHandler = None,
+    ):
+        """
+        Args:
+            host: device host
+            operation: 'get' or 'put'
+            src: source file name
+            dst: destination file name
+            stream: stream to publish the events to
+            handler: callback with (src, dst, bytes copied, total bytes)
+        """
+        self.host = host
+        self.operation = operation
+        self.src = src
+        self.dst = dst
+        self.stream = stream
+        self.handler = handler
+        self.phase_name: TransferPhase = "check"
+        self.done = 0
+        self.total = 0
+        self.rate = 0.0
+        self._start_time = monotonic()
+        self._last_publish = 0.0
+        # first block of the transfer phase, the rate is measured from there
+        self._rate_start: Optional[Tuple[float, int]] = None
+
+    @property
+    def enabled(self) -> bool:
+        """True if anyone is interested in the progress of the copy"""
+        return self.stream is not None or self.handler is not None
+
+    def phase(self, phase: TransferPhase, result: Optional[FileTransferResult] = None) -> None:
+        """
+        Enter the next phase and publish it
+
+        Args:
+            phase: new phase
+            result: final result with the 'done' phase
+
+        Returns:
+            None
+        """
+        self.phase_name = phase
+        if result is not None and result.throughput:
+            self.rate = result.throughput
+        self._publish(result)
+
+    def __call__(self, src: str, dst: str, done: int, total: int) -> None:
+        if self.handler is not None:
+            self.handler(src, dst, done, total)
+        if self.stream is None:
+            return
+
+        now = monotonic()
+        if self._rate_start is None:
+            self._rate_start = (now, done)
+        elif now > self._rate_start[0]:
+            self.rate = (done - self._rate_start[1]) / (now - self._rate_start[0])
+        self.done, self.total = done, total
+        if now - self._last_publish >= self.stream.interval or done >= total:
+            self._publish()
+
+    def _publish(self, result: Optional[FileTransferResult] = None) -> None:
+        if self.stream is None:
+            return
+        self._last_publish = monotonic()
+        self.stream.publish(
+            TransferProgress(
+                host=self.host,
+                operation=self.operation,
+                src=self.src,
+                dst=self.dst,
+                phase=self.phase_name,
+                done=self.done,
+                total=self.total,
+                rate=self.rate,
+                elapsed=self._last_publish - self._start_time,
+                result=result,
+            ),
+            key=self,
+        )
@@ -0,0 +1,181 @@
+"""scrapli_transfer_utils.ratelimit"""
+import asyncio
+from time import monotonic
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Union
+
+# called with the size of every block before it is sent (or after it was received)
+Throttle = Callable[[int], Awaitable[None]]
+
+
+class TokenBucket:
+    """
+    Token bucket limiting the bytes per second of the transfers reading through it
+
+    Up to `burst` bytes pass at once, then the transfers wait for the bucket to refill at `rate`
+    bytes per second. A block bigger than the bucket is let through and paid back by waiting
+    longer afterwards, so the average rate is kept whatever the block size. Waiting transfers
+    are served in order.
+
+    `rate` and `burst` can be changed while transfers run and take effect immediately (change
+    them from the event loop thread): `None` removes the limit, `0` pauses the transfers.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None):
+        """
+        Args:
+            rate: bytes per second, `None` for no limit
+            burst: bytes passing without waiting, default is one second at `rate`
+        """
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(self.burst)
+        self._last_update = monotonic()
+        self._lock = asyncio.Lock()
+        self._changed = asyncio.Event()
+
+    @property
+    def rate(self) -> Optional[float]:
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate: Optional[float]) -> None:
+        self._refill()
+        self._rate = rate
+        self._tokens = min(self._tokens, self.burst)
+        self._changed.set()
+
+    @property
+    def burst(self) -> int:
+        if self._burst is not None:
+            return self._burst
+        # at least one default SCP/SFTP block
+        return max(int(self._rate or 0), 65536)
+
+    @burst.setter
+    def burst(self, burst: Optional[int]) -> None:
+        self._refill()
+        self._burst = burst
+        self._tokens = min(self._tokens, self.burst)
+        self._changed.set()
+
+    def _refill(self) -> None:
+        now = monotonic()
+        if self._rate:
+            self._tokens = min(
+                float(self.burst), self._tokens + (now - self._last_update) * self._rate
+            )
+        self._last_update = now
+
+    async def acquire(self, amount: int) -> None:
+        """
+        Wait until `amount` bytes may pass
+
+        Args:
+            amount: number of bytes
+
+        Returns:
+            None
+        """
+        if self._rate is None and not self._lock.locked():
+            return
+        async with self._lock:
+            self._refill()
+            while self._rate == 0:
+                self._changed.clear()
+                await self._changed.wait()
+                self._refill()
+            self._tokens -= amount
+            while self._rate is not None and self._tokens < 0:
+                self._changed.clear()
+                timeout = -self._tokens / self._rate if self._rate else None
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._refill()
+            if self._rate is None:
+                # no debt is carried over into a later limit
+                self._tokens = max(self._tokens, 0.0)
+
+
+class BandwidthLimiter:
+    """
+    Global and per group limits shared by many transfers
+
+    Pass the limiter (and the group of the device, e.g. its site) to the transfer features.
+    Every byte passes the global bucket and the bucket of its group:
+
+    .. code-block:: python
+
+        limiter = BandwidthLimiter(rate=100e6, group_rate=10e6)
+        limiter.group("ams").rate = 2e6
+        transfer = AsyncSrapliTransferUtils(
+            conn, bandwidth_limiter=limiter, bandwidth_group="ams"
+        )
+    """
+
+    def __init__(self, rate: Optional[float] = None, group_rate: Optional[float] = None):
+        """
+        Args:
+            rate: global bytes per second, `None` for no limit
+            group_rate: bytes per second of a group which was not configured with `group`
+        """
+        self.global_bucket = TokenBucket(rate)
+        self.group_rate = group_rate
+        self._groups: Dict[str, TokenBucket] = {}
+
+    def group(self, name: str) -> TokenBucket:
+        """
+        Bucket of a group, created with `group_rate` on first use
+
+        Args:
+            name: group name
+
+        Returns:
+            TokenBucket: change its `rate` to limit the group
+        """
+        if name not in self._groups:
+            self._groups[name] = TokenBucket(self.group_rate)
+        return self._groups[name]
+
+    def buckets(self, group: Optional[str] = None) -> List[TokenBucket]:
+        """
+        Buckets a transfer of a group reads through, the narrowest first
+
+        Args:
+            group: group of the device, `None` for the global limit only
+
+        Returns:
+            list of TokenBucket
+        """
+        if group is None:
+            return [self.global_bucket]
+        return [self.group(group), self.global_bucket]
+
+
+def make_throttle(buckets: Sequence[Optional[TokenBucket]]) -> Optional[Throttle]:
+    """
+    Combine buckets into one throttle of a transfer
+
+    Args:
+        buckets: buckets every block has to pass, `None` entries are skipped
+
+    Returns:
+        coroutine function called with the block size, `None` if there are no buckets
+    """
+    active = [bucket for bucket in buckets if bucket is not None]
+    if not active:
+        return None
+
+    async def _throttle(amount: int) -> None:
+        for bucket in active:
+            await bucket.acquire(amount)
+
+    return _throttle
+
+
+def as_bucket(bandwidth: Union[None, float, TokenBucket]) -> Optional[TokenBucket]:
+    """Bucket of a per transfer limit given as bytes per second or as a TokenBucket"""
+    if bandwidth is None or isinstance(bandwidth, TokenBucket):
+        return bandwidth
+    return TokenBucket(bandwidth)
@@ -0,0 +1,185 @@
+"""scrapli_transfer_utils.registry"""
+import threading
+from importlib import import_module, metadata
+from typing import TYPE_CHECKING, Dict, Optional, Type, Union
+
+from scrapli_transfer_utils.exceptions import ScrapliSCPException
+from scrapli_transfer_utils.logging import logger
+
+if TYPE_CHECKING:
+    from scrapli_transfer_utils.async_transfer.base import AsyncTransferFeature
+
+# entry point group of third party platforms: name is the dotted path of the scrapli driver
+# class, value the transfer feature class (`package.module:Class`)
+ENTRY_POINT_GROUP = "scrapli_transfer_utils.platforms"
+
+ClassOrPath = Union[type, str]
+
+
+def class_path(cls: type) -> str:
+    """Dotted path of a class, e.g. `scrapli.driver.core.cisco_iosxe.async_driver.AsyncIOSXEDriver`"""
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def import_class(path: str) -> type:
+    """
+    Import a class by its dotted path
+
+    Args:
+        path: `package.module:Class` or `package.module.Class`
+
+    Returns:
+        the class
+
+    Raises:
+        ScrapliSCPException: if the class can not be imported
+    """
+    module_name, _, class_name = path.rpartition(":") if ":" in path else path.rpartition(".")
+    try:
+        return getattr(import_module(module_name), class_name)
+    except (ImportError, AttributeError, ValueError) as e:
+        raise ScrapliSCPException(f"Can not import transfer feature '{path}': {e}") from e
+
+
+class PlatformRegistry:
+    """
+    Transfer feature per scrapli driver class
+
+    Drivers and features are registered as classes or dotted paths, so neither is imported before
+    a connection of that driver shows up. A lookup walks the MRO of the connection class, so
+    subclassed drivers use the feature of their closest registered base class. Results are
+    cached per connection class.
+
+    Platforms of other packages are registered through the `scrapli_transfer_utils.platforms`
+    entry point group (loaded on the first lookup without a match):
+
+    .. code-block:: toml
+
+        [tool.poetry.plugins."scrapli_transfer_utils.platforms"]
+        "scrapli_community.nokia.srlinux.async_driver.AsyncNokiaSRLinuxDriver" = "my_package.srlinux:AsyncSFTPSRLinux"
+    """
+
+    def __init__(self, entry_point_group: Optional[str] = ENTRY_POINT_GROUP):
+        """
+        Args:
+            entry_point_group: entry point group to load platforms from, `None` to not use entry
+                               points
+        """
+        self.entry_point_group = entry_point_group
+        self._platforms: Dict[str, ClassOrPath] = {}
+        self._cache: Dict[type, Optional[Type["AsyncTransferFeature"]]] = {}
+        self._entry_points_loaded = entry_point_group is None
+        self._lock = threading.Lock()
+
+    def register(self, driver: ClassOrPath, feature: ClassOrPath) -> None:
+        """
+        Register (or replace) the transfer feature of a driver class
+
+        Args:
+            driver: scrapli driver class or its dotted path
+            feature: `AsyncTransferFeature` subclass or its dotted path
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._platforms[driver if isinstance(driver, str) else class_path(driver)] = feature
+            self._cache.clear()
+
+    def get(self, driver_class: type) -> Optional[Type["AsyncTransferFeature"]]:
+        """
+        Find the transfer feature of a driver class
+
+        Args:
+            driver_class: class of the scrapli connection
+
+        Returns:
+            the feature class, `None` if neither the class nor one of its bases is registered
+
+        Raises:
+            ScrapliSCPException: if the registered feature can not be imported
+        """
+        try:
+            return self._cache[driver_class]
+        except KeyError:
+            pass
+
+        feature = self._lookup(driver_class)
+        if feature is None and not self._entry_points_loaded:
+            self._load_entry_points()
+            feature = self._lookup(driver_class)
+
+        with self._lock:
+            self._cache[driver_class] = feature
+        return feature
+
+    def platforms(self) -> Dict[type, Type["AsyncTransferFeature"]]:
+        """
+        Import all registered drivers and their features
+
+        Drivers which can not be imported (e.g. their package is not installed) are left out.
+
+        Returns:
+            feature class per driver class
+        """
+        if not self._entry_points_loaded:
+            self._load_entry_points()
+        with self._lock:
+            driver_paths = list(self._platforms)
+
+        platforms: Dict[type, Type["AsyncTransferFeature"]] = {}
+        for driver_path in driver_paths:
+            try:
+                driver_class = import_class(driver_path)
+            except ScrapliSCPException as e:
+                logger.debug(f"Skipping transfer platform '{driver_path}': {e}")
+                continue
+            feature = self.get(driver_class)
+            if feature is not None:
+                platforms[driver_class] = feature
+        return platforms
+
+    def _lookup(self, driver_class: type) -> Optional[Type["AsyncTransferFeature"]]:
+        for cls in driver_class.__mro__:
+            feature = self._platforms.get(class_path(cls))
+            if feature is None:
+                continue
+            if isinstance(feature, str):
+                feature = import_class(feature)
+                with self._lock:
+                    self._platforms[class_path(cls)] = feature
+            return feature
+        return None
+
+    def _load_entry_points(self) -> None:
+        self._entry_points_loaded = True
+        for entry_point in metadata.entry_points(group=self.entry_point_group):
+            logger.debug(f"Transfer platform '{entry_point.name}' from '{entry_point.value}'")
+            with self._lock:
+                # explicitly registered platforms win
+                self._platforms.setdefault(entry_point.name, entry_point.value)
+
+
+DEFAULT_REGISTRY = PlatformRegistry()
+DEFAULT_REGISTRY.register(
+    "scrapli.driver.core.cisco_iosxe.async_driver.AsyncIOSXEDriver",
+    "scrapli_transfer_utils.async_transfer.asyncscp.cisco_iosxe:AsyncSCPIOSXE",
+)
+DEFAULT_REGISTRY.register(
+    "scrapli_community.huawei.vrp.async_driver.AsyncHuaweiVRPDriver",
+    "scrapli_transfer_utils.async_transfer.asyncsftp.huawei_vrp:AsyncSFTPHuaweiVrp",
+)
+
+
+def register_platform(driver: ClassOrPath, feature: ClassOrPath) -> None:
+    """
+    Register the transfer feature of a driver class in the default registry
+
+    Args:
+        driver: scrapli driver class or its dotted path
+        feature: `AsyncTransferFeature` subclass or its dotted path
+
+    Returns:
+        None
+    """
+    DEFAULT_REGISTRY.register(driver, feature)
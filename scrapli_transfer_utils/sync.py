@@ -0,0 +1,308 @@
+"""scrapli_transfer_utils.sync"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Dict, Hashable, Literal, Optional, Sequence, Set, TypeVar
+
+from scrapli import AsyncScrapli
+from scrapli.driver import AsyncNetworkDriver
+
+from scrapli_transfer_utils.async_transfer.base import AsyncTransferFeature
+from scrapli_transfer_utils.bulk import bulk_file_transfer
+from scrapli_transfer_utils.dataclasses import (
+    BulkTransferSpec,
+    BulkTransferStats,
+    FileTransferResult,
+)
+from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
+from scrapli_transfer_utils.logging import logger
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """
+    asyncio event loop running in a daemon thread
+
+    Coroutines are submitted from any other thread and return `concurrent.futures.Future`.
+    The thread is started on the first `submit`.
+    """
+
+    def __init__(self, name: str = "scrapli-transfer-loop"):
+        """
+        Args:
+            name: name of the thread
+        """
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the thread, if it is not running yet"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+            # the loop stopped, end what is still running on it before closing it
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        finally:
+            self._loop.close()
+
+    def submit(self, coro: Awaitable[T]) -> "Future[T]":
+        """
+        Run a coroutine on the loop
+
+        Args:
+            coro: coroutine to run
+
+        Returns:
+            Future of the result
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """
+        Run a coroutine on the loop and wait for its result
+
+        Args:
+            coro: coroutine to run
+
+        Returns:
+            result of the coroutine
+
+        Raises:
+            RuntimeError: if called from the loop thread itself (it would wait forever)
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BackgroundLoop.run() called from its own thread")
+        return self.submit(coro).result()
+
+    def stop(self) -> None:
+        """
+        Stop the loop, cancel the coroutines still running on it and wait for them and the
+        thread to end. The loop is closed afterwards
+        """
+        with self._lock:
+            if self._thread is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+            self._loop = None
+
+
+class _PooledConnection:
+    """Connection to one device, used by one transfer at a time"""
+
+    def __init__(self, device: Dict[str, Any]):
+        self.device = device
+        self.lock = asyncio.Lock()
+        self.conn: Optional[AsyncNetworkDriver] = None
+        self.feature: Optional[AsyncTransferFeature] = None
+
+    async def open(self, **feature_kwargs: Any) -> AsyncTransferFeature:
+        if self.feature is None:
+            conn = AsyncScrapli(**self.device)
+            await conn.open()
+            self.conn = conn
+            self.feature = AsyncSrapliTransferUtils(conn, **feature_kwargs)
+        return self.feature
+
+    async def close(self) -> None:
+        conn, self.conn, self.feature = self.conn, None, None
+        if conn is None:
+            return
+        try:
+            await conn.close()
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug(f"Closing connection to '{conn.host}' failed: {e}")
+
+
+def _device_key(device: Dict[str, Any]) -> Hashable:
+    return tuple(sorted((key, repr(value)) for key, value in device.items()))
+
+
+class SyncTransferUtils:
+    """
+    File transfers for synchronous code
+
+    Transfers run as coroutines on one event loop in a background thread and return
+    `concurrent.futures.Future`, so many devices are handled concurrently without an event loop
+    per device. Devices are dicts of `AsyncScrapli` arguments (with an asyncssh transport); one
+    connection per device is opened on first use and reused by later transfers until `close`:
+
+    .. code-block:: python
+
+        with SyncTransferUtils(max_concurrency=20) as transfer:
+            futures = [transfer.file_transfer(device, "put", "image.bin") for device in devices]
+            results = [future.result() for future in futures]
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 50,
+        background_loop: Optional[BackgroundLoop] = None,
+        **feature_kwargs: Any,
+    ):
+        """
+        Args:
+            max_concurrency: maximum number of `file_transfer` calls running at the same time
+            background_loop: loop to run the transfers on (e.g. shared with other code), a new
+                             one is started (and stopped on `close`) if omitted
+            feature_kwargs: passed to the transfer feature of every device
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"Invalid max_concurrency: {max_concurrency}")
+        self.max_concurrency = max_concurrency
+        self.feature_kwargs = feature_kwargs
+        self.background_loop = background_loop or BackgroundLoop()
+        self._own_loop = background_loop is None
+        self._connections: Dict[Hashable, _PooledConnection] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # submitted transfers, only touched from the background loop
+        self._tasks: Set["asyncio.Task[Any]"] = set()
+        self._closed = False
+
+    def _submit(self, coro: Awaitable[T]) -> "Future[T]":
+        if self._closed:
+            coro.close()
+            raise RuntimeError("SyncTransferUtils is closed")
+        return self.background_loop.submit(self._run(coro))
+
+    async def _run(self, coro: Awaitable[T]) -> T:
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            return await coro
+        finally:
+            self._tasks.discard(task)
+
+    def file_transfer(
+        self,
+        device: Dict[str, Any],
+        operation: Literal["get", "put"],
+        src: str,
+        dst: str = "",
+        **kwargs: Any,
+    ) -> "Future[FileTransferResult]":
+        """
+        Transfer a file to/from a device
+
+        Args:
+            device: `AsyncScrapli` arguments of the device
+            operation: put/get file to/from device
+            src: source file name
+            dst: destination file name (same as src if omitted)
+            kwargs: further arguments of `AsyncTransferFeature.file_transfer`
+
+        Returns:
+            Future of the FileTransferResult
+        """
+        return self._submit(self._file_transfer(device, operation, src, dst, **kwargs))
+
+    async def _file_transfer(
+        self,
+        device: Dict[str, Any],
+        operation: Literal["get", "put"],
+        src: str,
+        dst: str,
+        **kwargs: Any,
+    ) -> FileTransferResult:
+        pooled = self._connections.setdefault(_device_key(device), _PooledConnection(device))
+        # one transfer per connection, wait for it before taking a global slot
+        async with pooled.lock, self._semaphore:
+            feature = await pooled.open(**self.feature_kwargs)
+            try:
+                return await feature.file_transfer(operation, src, dst, **kwargs)
+            except Exception:
+                # connection state is unknown, connect again on the next transfer
+                await pooled.close()
+                raise
+
+    def bulk_file_transfer(
+        self,
+        devices: Sequence[Dict[str, Any]],
+        spec: BulkTransferSpec,
+        max_concurrency: Optional[int] = None,
+        max_site_concurrency: Optional[int] = None,
+        site_key: str = "site",
+    ) -> "Future[BulkTransferStats]":
+        """
+        Run `bulk_file_transfer` on the background loop
+
+        The bulk transfer opens (and closes) its own connections.
+
+        Args:
+            devices: device definitions (`AsyncScrapli` arguments plus optional site)
+            spec: transfer executed on every device
+            max_concurrency: maximum number of devices handled at the same time, default is the
+                             `max_concurrency` of this instance
+            max_site_concurrency: maximum number of devices of one site handled at the same time
+            site_key: key in the device definition holding the site name
+
+        Returns:
+            Future of the BulkTransferStats
+        """
+        return self._submit(
+            bulk_file_transfer(
+                devices,
+                spec,
+                max_concurrency or self.max_concurrency,
+                max_site_concurrency,
+                site_key,
+                **self.feature_kwargs,
+            )
+        )
+
+    async def _close_connections(self, cancel: bool) -> None:
+        # no transfer may still use a connection when it is closed
+        tasks = list(self._tasks)
+        if cancel:
+            for task in tasks:
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        connections, self._connections = list(self._connections.values()), {}
+        await asyncio.gather(*(pooled.close() for pooled in connections))
+
+    def close(self, wait_futures: bool = True, cancel_futures: bool = False) -> None:
+        """
+        Close the connections (and the background loop if it was started by this instance)
+
+        The connections are closed after the submitted transfers ended: they are either waited
+        for or cancelled.
+
+        Args:
+            wait_futures: wait for the submitted transfers to finish, `False` cancels them
+            cancel_futures: cancel the submitted transfers
+
+        Returns:
+            None
+        """
+        if self._closed:
+            return
+        self._closed = True
+        # runs after all submitted transfers were started on the loop
+        self.background_loop.run(
+            self._close_connections(cancel=cancel_futures or not wait_futures)
+        )
+        if self._own_loop:
+            self.background_loop.stop()
+
+    def __enter__(self) -> "SyncTransferUtils":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
@@ -1,3 +1,4 @@
+import asyncssh
 import pytest
 from scrapli.driver.core import AsyncIOSXEDriver
 from scrapli_community.huawei.vrp.huawei_vrp import (
@@ -42,3 +43,29 @@ def async_scp_iosxe_object():
 @pytest.fixture(scope="function")
 def async_sftp_huawei_vrp_object():
     return AsyncHuaweiVRPDriver(**MY_DEVICE_HUAWEI_VRP)
+
+
+class NoAuthServer(asyncssh.SSHServer):
+    def begin_auth(self, username):
+        return False
+
+
+@pytest.fixture()
+async def ssh_connection(tmp_path):
+    """SSH connection to a local asyncssh server serving SFTP and SCP from `tmp_path/device`"""
+    root = tmp_path / "device"
+    root.mkdir()
+    server = await asyncssh.listen(
+        "127.0.0.1",
+        0,
+        server_host_keys=[asyncssh.generate_private_key("ssh-ed25519")],
+        server_factory=NoAuthServer,
+        sftp_factory=lambda chan: asyncssh.SFTPServer(chan, chroot=str(root)),
+        allow_scp=True,
+    )
+    port = server.sockets[0].getsockname()[1]
+    async with asyncssh.connect(
+        "127.0.0.1", port, username="test", known_hosts=None
+    ) as conn:
+        yield conn, root
+    server.close()
@@ -0,0 +1,620 @@
+"""
+Emulated devices for the tests and benchmarks
+
+Not part of the installed package: run from the `tests` directory (pytest does that) or add it to
+`sys.path` like `benchmarks/bench.py`.
+"""
+import asyncio
+import os
+import re
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional, Set, Tuple, Type
+
+import asyncssh
+
+from scrapli_transfer_utils.hashing import async_hash_file
+from scrapli_transfer_utils.logging import logger
+
+EmulatedPlatform = Literal["cisco_iosxe", "huawei_vrp"]
+
+
+class _Link:
+    """
+    TCP proxy in front of the SSH server which emulates a WAN link
+
+    Every direction delays data by half of the round trip time and, if `bandwidth` is set,
+    serializes it at that rate. The proxy buffers at most `buffer_time` seconds worth of data
+    before it stops reading, so TCP/SSH flow control sees a bottleneck like on a real link.
+    """
+
+    def __init__(
+        self,
+        target_port: int,
+        latency: float = 0.0,
+        bandwidth: Optional[float] = None,
+        buffer_time: float = 0.05,
+    ):
+        self.target_port = target_port
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.buffer_time = buffer_time
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str) -> None:
+        self._server = await asyncio.start_server(self._handle, host, 0)
+
+    async def stop(self) -> None:
+        self._server.close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        host = writer.get_extra_info("sockname")[0]
+        try:
+            target_reader, target_writer = await asyncio.open_connection(host, self.target_port)
+        except OSError:
+            writer.close()
+            return
+        for src, dst in ((reader, target_writer), (target_reader, writer)):
+            task = asyncio.create_task(self._pump(src, dst))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _pump(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Tuple[float, bytes]]" = asyncio.Queue()
+
+        async def _deliver() -> None:
+            while True:
+                due, data = await queue.get()
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if not data:
+                    writer.close()
+                    return
+                writer.write(data)
+                await writer.drain()
+
+        deliver_task = asyncio.create_task(_deliver())
+        link_free = loop.time()
+        try:
+            while True:
+                data = await reader.read(65536)
+                now = loop.time()
+                link_free = max(link_free, now)
+                if self.bandwidth:
+                    link_free += len(data) / self.bandwidth
+                queue.put_nowait((link_free + self.latency / 2, data))
+                if not data:
+                    break
+                # the link buffer is full, stop reading like a congested router would
+                if link_free - now > self.buffer_time:
+                    await asyncio.sleep(link_free - now - self.buffer_time)
+            await deliver_task
+        except (ConnectionError, asyncio.CancelledError):
+            writer.close()
+            raise
+        finally:
+            deliver_task.cancel()
+
+
+class _FlashSFTPServer(asyncssh.SFTPServer):
+    """SFTP/SCP server on the emulated flash, writes and reads take as long as on the device"""
+
+    def __init__(self, chan: asyncssh.SSHServerChannel, emulator: "DeviceEmulator"):
+        self._emulator = emulator
+        super().__init__(chan, chroot=emulator.root)
+
+    def map_path(self, path: bytes) -> bytes:
+        # device paths like flash:/image.bin
+        path = re.sub(rb"^[\w\-]+:/?", b"/", path)
+        return super().map_path(path)
+
+    async def read(self, file_obj: object, offset: int, size: int) -> bytes:
+        await self._emulator.flash_delay(size, self._emulator.flash_read_speed)
+        return super().read(file_obj, offset, size)
+
+    async def write(self, file_obj: object, offset: int, data: bytes) -> int:
+        await self._emulator.flash_delay(len(data), self._emulator.flash_write_speed)
+        return super().write(file_obj, offset, data)
+
+
+class _EmulatedCLI(ABC):
+    """CLI of one shell session, platform classes implement the commands"""
+
+    def __init__(self, emulator: "DeviceEmulator"):
+        self.emulator = emulator
+        self.mode = "privilege_exec"
+        self.closed = False
+
+    @property
+    @abstractmethod
+    def prompt(self) -> str:
+        ...
+
+    async def execute(self, line: str) -> str:
+        """
+        Run one command line, including a `| include/exclude/begin` filter
+
+        Args:
+            line: command line as typed
+
+        Returns:
+            output without the echo of the command and without the prompt
+        """
+        command, _, pipe = line.partition(" | ")
+        output = await self.command(command.strip())
+        if pipe:
+            output = self.filter(output, pipe.strip())
+        return output
+
+    def filter(self, output: str, pipe: str) -> str:
+        action, _, pattern = pipe.partition(" ")
+        lines = output.splitlines()
+        if "include".startswith(action):
+            return "\n".join(line for line in lines if re.search(pattern, line))
+        if "exclude".startswith(action):
+            return "\n".join(line for line in lines if not re.search(pattern, line))
+        if "begin".startswith(action):
+            for idx, line in enumerate(lines):
+                if re.search(pattern, line):
+                    return "\n".join(lines[idx:])
+            return ""
+        return self.invalid_input()
+
+    @abstractmethod
+    async def command(self, command: str) -> str:
+        ...
+
+    @abstractmethod
+    def invalid_input(self) -> str:
+        ...
+
+    async def file_hash(self, path: str, algorithm: str = "md5") -> Optional[str]:
+        """Hash of a file on the emulated flash, `None` if the file does not exist"""
+        local_path = self.emulator.local_path(path)
+        if not os.path.isfile(local_path):
+            return None
+        await self.emulator.flash_delay(
+            os.path.getsize(local_path), self.emulator.flash_read_speed
+        )
+        return await async_hash_file(local_path, algorithm=algorithm)
+
+
+class _IOSXECLI(_EmulatedCLI):
+    @property
+    def prompt(self) -> str:
+        hostname = self.emulator.hostname
+        if self.mode == "configuration":
+            return f"{hostname}(config)#"
+        if self.mode == "exec":
+            return f"{hostname}>"
+        return f"{hostname}#"
+
+    def invalid_input(self) -> str:
+        return "% Invalid input detected at '^' marker."
+
+    async def command(self, command: str) -> str:  # noqa: C901
+        config = self.emulator.config
+        words = command.split()
+        if not words:
+            return ""
+
+        if self.mode == "configuration":
+            if command in ("end", "exit"):
+                self.mode = "privilege_exec"
+                return ""
+            if re.fullmatch(r"(no )?ip scp server enable", command):
+                config["ip scp server enable"] = not command.startswith("no ")
+                return ""
+            m = re.fullmatch(r"ip (?P<proto>ssh|tcp) window-size (?P<size>\d+)", command)
+            if m:
+                config[f"ip {m['proto']} window-size"] = int(m["size"])
+                return ""
+            return self.invalid_input()
+
+        if command == "enable":
+            self.mode = "privilege_exec"
+            return ""
+        if command == "disable":
+            self.mode = "exec"
+            return ""
+        if command in ("exit", "logout", "quit"):
+            self.closed = True
+            return ""
+        if words[0] == "terminal":
+            return ""
+        if self.mode == "exec":
+            return self.invalid_input()
+
+        if command in ("configure terminal", "conf t"):
+            self.mode = "configuration"
+            return "Enter configuration commands, one per line.  End with CNTL/Z."
+        if words[0] in ("sh", "show") and words[1:3] in (["run", "all"], ["running-config", "all"]):
+            return self.running_config()
+        if words[0] == "dir":
+            return self.dir(words[1] if len(words) > 1 else "flash:/")
+        if words[0] == "verify" and len(words) == 3 and words[1] in ("/md5", "/sha512"):
+            file_hash = await self.file_hash(words[2], words[1][1:])
+            if file_hash is None:
+                return f"%Error opening {words[2]} (No such file or directory)"
+            return f"{'.' * 20}Done!\nverify {words[1]} ({words[2]}) = {file_hash}"
+        return self.invalid_input()
+
+    def running_config(self) -> str:
+        config = self.emulator.config
+        lines = [f"hostname {self.emulator.hostname}"]
+        if config.get("ip scp server enable"):
+            lines.append("ip scp server enable")
+        lines.append(f"ip tcp window-size {config['ip tcp window-size']}")
+        lines.append(f"ip ssh window-size {config['ip ssh window-size']}")
+        return "\n".join(lines)
+
+    def dir(self, path: str) -> str:
+        device_fs, file_name = self.emulator.split_path(path)
+        files = self.emulator.list_files()
+        if file_name:
+            files = [entry for entry in files if entry[0] == file_name]
+            if not files:
+                return f"%Error opening {path} (No such file or directory)"
+
+        lines = [f"Directory of {device_fs}{file_name}", ""]
+        for idx, (name, size, mtime) in enumerate(files, 11):
+            timestamp = datetime.fromtimestamp(mtime)
+            lines.append(
+                f"{idx:>5}  -rw-{size:>17}  {timestamp:%b} {timestamp.day} "
+                f"{timestamp:%Y %H:%M:%S} +00:00  {name}"
+            )
+        total, free = self.emulator.flash_usage()
+        lines += ["", f"{total} bytes total ({free} bytes free)"]
+        return "\n".join(lines)
+
+
+class _HuaweiVRPCLI(_EmulatedCLI):
+    @property
+    def prompt(self) -> str:
+        if self.mode == "configuration":
+            return f"[~{self.emulator.hostname}]"
+        return f"<{self.emulator.hostname}>"
+
+    def invalid_input(self) -> str:
+        return "Error: Unrecognized command found at '^' position."
+
+    def filter(self, output: str, pipe: str) -> str:
+        # VRP ignores the blanks after the anchor (`include ^ sftp server enable`)
+        return super().filter(output, re.sub(r"\^\s+", "^", pipe))
+
+    async def command(self, command: str) -> str:  # noqa: C901
+        config = self.emulator.config
+        words = command.split()
+        if not words:
+            return ""
+
+        if self.mode == "configuration":
+            if command in ("quit", "return"):
+                self.mode = "privilege_exec"
+                return ""
+            if command in ("sftp server enable", "undo sftp server enable"):
+                config["sftp server enable"] = not command.startswith("undo ")
+                return ""
+            if command == "commit":
+                return ""
+            return self.invalid_input()
+
+        if command in ("quit", "exit"):
+            self.closed = True
+            return ""
+        if words[0] in ("screen-length", "screen-width"):
+            return (
+                "Info: The configuration takes effect on the current user terminal interface only."
+            )
+        if command == "system-view":
+            self.mode = "configuration"
+            return "Enter system view, return user view with return command."
+        if command == "display current-configuration":
+            return self.current_configuration()
+        if command == "dir /all" or command == "dir":
+            return self.dir()
+        if words[:3] == ["display", "system", "file-md5"] and len(words) == 4:
+            file_hash = await self.file_hash(words[3])
+            if file_hash is None:
+                return "Error: File can't be found."
+            return f"File Name:\n{words[3]}\nMD5:\n{file_hash}"
+        return self.invalid_input()
+
+    def current_configuration(self) -> str:
+        lines = ["#", f"sysname {self.emulator.hostname}", "#"]
+        if self.emulator.config.get("sftp server enable"):
+            lines += ["sftp server enable", "#"]
+        lines.append("return")
+        return "\n".join(lines)
+
+    def dir(self) -> str:
+        lines = [
+            "Directory of flash:/",
+            "",
+            "  Idx  Attr     Size(Byte)  Date        Time(LMT)  FileName",
+        ]
+        for idx, (name, size, mtime) in enumerate(self.emulator.list_files()):
+            timestamp = datetime.fromtimestamp(mtime)
+            lines.append(f"{idx:>5}  -rw-  {size:>13,}  {timestamp:%b %d %Y %H:%M:%S}   {name}")
+        total, free = self.emulator.flash_usage()
+        lines += ["", f"{total // 1024:,} KB total available ({free // 1024:,} KB free)"]
+        return "\n".join(lines)
+
+
+CLI_CLASSES: Dict[str, Type[_EmulatedCLI]] = {
+    "cisco_iosxe": _IOSXECLI,
+    "huawei_vrp": _HuaweiVRPCLI,
+}
+
+
+class DeviceEmulator:
+    """
+    Local SSH server emulating an IOS-XE or VRP device for tests and benchmarks
+
+    The emulator answers the CLI commands the transfer features send (`dir`, `verify /md5|sha512`,
+    `sh run all`, `display system file-md5`, configuration of SCP/SFTP, ...) and accepts real
+    SCP and SFTP transfers to a local directory which acts as the flash filesystem:
+
+    .. code-block:: python
+
+        async with DeviceEmulator("cisco_iosxe", latency=0.05, bandwidth=10_000_000) as device:
+            async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+                result = await AsyncSrapliTransferUtils(conn).file_transfer("put", "image.bin")
+
+    `latency` and `bandwidth` are applied to the TCP connection (CLI and transfers), so SSH
+    window and pipelining effects show up like on a real link. Flash speeds delay the file
+    reads/writes of transfers and the hashing of `verify` / `display system file-md5`.
+    """
+
+    def __init__(
+        self,
+        platform: EmulatedPlatform,
+        root: Optional[str] = None,
+        hostname: str = "emulator",
+        username: str = "emulator",
+        password: str = "emulator",
+        latency: float = 0.0,
+        bandwidth: Optional[float] = None,
+        flash_read_speed: Optional[float] = None,
+        flash_write_speed: Optional[float] = None,
+        flash_size: int = 8 * 1024**3,
+        command_delay: float = 0.0,
+        transfer_enabled: bool = True,
+    ):
+        """
+        Args:
+            platform: `cisco_iosxe` or `huawei_vrp`
+            root: directory used as flash, a temporary directory is created (and removed) if
+                  omitted
+            hostname: device hostname shown in the prompt
+            username: accepted username
+            password: accepted password
+            latency: round trip time of the link in seconds
+            bandwidth: link bandwidth in bytes per second, `None` for unlimited
+            flash_read_speed: flash read speed in bytes per second, `None` for unlimited
+            flash_write_speed: flash write speed in bytes per second, `None` for unlimited
+            flash_size: total size of the flash in bytes
+            command_delay: seconds the device needs to process a CLI command
+            transfer_enabled: SCP/SFTP server (and the IOS-XE window sizes) initially configured
+                              for transfers, SCP/SFTP sessions are accepted either way
+        """
+        if platform not in CLI_CLASSES:
+            raise ValueError(f"Platform '{platform}' is not supported")
+        self.platform = platform
+        self.root = root
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.flash_read_speed = flash_read_speed
+        self.flash_write_speed = flash_write_speed
+        self.flash_size = flash_size
+        self.command_delay = command_delay
+        # IOS-XE defaults are 4128/8192, enabled means configured as `_ensure_transfer_capability`
+        # wants it
+        window_size = 65536 if transfer_enabled else None
+        self.config: Dict[str, Any] = {
+            "ip scp server enable": transfer_enabled,
+            "ip tcp window-size": window_size or 4128,
+            "ip ssh window-size": window_size or 8192,
+            "sftp server enable": transfer_enabled,
+        }
+        self.host = "127.0.0.1"
+        self.commands: List[str] = []
+
+        self._own_root = False
+        self._server: Optional[asyncssh.SSHAcceptor] = None
+        self._link: Optional[_Link] = None
+        self._connections: Set[asyncssh.SSHServerConnection] = set()
+        # flash handles one read/write at a time
+        self._flash_lock = asyncio.Lock()
+
+    @property
+    def port(self) -> int:
+        """Port to connect to (the emulated link if latency or bandwidth is set)"""
+        if self._link is not None:
+            return self._link.port
+        return self._server.sockets[0].getsockname()[1]
+
+    def scrapli_kwargs(self, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Arguments for `AsyncScrapli` to connect to the emulator
+
+        Args:
+            kwargs: additional or overridden arguments
+
+        Returns:
+            dict of arguments
+        """
+        scrapli_kwargs = {
+            "host": self.host,
+            "port": self.port,
+            "auth_username": self.username,
+            "auth_password": self.password,
+            "auth_strict_key": False,
+            "transport": "asyncssh",
+            "platform": self.platform,
+        }
+        scrapli_kwargs.update(kwargs)
+        return scrapli_kwargs
+
+    async def start(self, host: str = "127.0.0.1") -> None:
+        """
+        Start listening
+
+        Args:
+            host: address to listen on
+
+        Returns:
+            None
+        """
+        if self.root is None:
+            self.root = tempfile.mkdtemp(prefix="scrapli_emulator_")
+            self._own_root = True
+        os.makedirs(self.root, exist_ok=True)
+        self.host = host
+
+        emulator = self
+
+        class _Server(asyncssh.SSHServer):
+            def connection_made(self, conn: asyncssh.SSHServerConnection) -> None:
+                self._conn = conn
+                emulator._connections.add(conn)
+
+            def connection_lost(self, exc: Optional[Exception]) -> None:
+                emulator._connections.discard(self._conn)
+
+            def begin_auth(self, username: str) -> bool:
+                return True
+
+            def password_auth_supported(self) -> bool:
+                return True
+
+            def validate_password(self, username: str, password: str) -> bool:
+                return username == emulator.username and password == emulator.password
+
+        self._server = await asyncssh.listen(
+            host,
+            0,
+            server_host_keys=[asyncssh.generate_private_key("ssh-ed25519")],
+            server_factory=_Server,
+            process_factory=self._run_shell,
+            sftp_factory=lambda chan: _FlashSFTPServer(chan, self),
+            allow_scp=True,
+            line_editor=False,
+        )
+        if self.latency or self.bandwidth:
+            self._link = _Link(
+                self._server.sockets[0].getsockname()[1], self.latency, self.bandwidth
+            )
+            await self._link.start(host)
+        logger.debug(f"{self.platform} emulator listening on {host}:{self.port}")
+
+    async def stop(self) -> None:
+        """Stop listening and remove the temporary flash directory"""
+        if self._link is not None:
+            await self._link.stop()
+            self._link = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for conn in list(self._connections):
+            conn.close()
+            await conn.wait_closed()
+        self._connections.clear()
+        if self._own_root:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self.root = None
+            self._own_root = False
+
+    async def __aenter__(self) -> "DeviceEmulator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.stop()
+
+    @staticmethod
+    def split_path(path: str) -> Tuple[str, str]:
+        """Split a device path into filesystem (default `flash:/`) and file name"""
+        m = re.match(r"^(?P<fs>[\w\-]+:/?)?(?P<name>.*)$", path)
+        device_fs = m["fs"] or "flash:/"
+        if not device_fs.endswith("/"):
+            device_fs += "/"
+        return device_fs, m["name"].lstrip("/")
+
+    def local_path(self, path: str) -> str:
+        """Local file of a device path"""
+        return os.path.join(self.root, self.split_path(path)[1])
+
+    def list_files(self) -> List[Tuple[str, int, float]]:
+        """(name, size, mtime) of the files on the emulated flash"""
+        files = []
+        for entry in sorted(os.scandir(self.root), key=lambda entry: entry.name):
+            if entry.is_file():
+                file_stat = entry.stat()
+                files.append((entry.name, file_stat.st_size, file_stat.st_mtime))
+        return files
+
+    def flash_usage(self) -> Tuple[int, int]:
+        """(total, free) bytes of the emulated flash"""
+        used = sum(size for _, size, _ in self.list_files())
+        return self.flash_size, max(self.flash_size - used, 0)
+
+    async def flash_delay(self, size: int, speed: Optional[float]) -> None:
+        """Wait as long as the flash needs to read/write `size` bytes"""
+        if not speed:
+            return
+        async with self._flash_lock:
+            await asyncio.sleep(size / speed)
+
+    async def _run_shell(self, process: asyncssh.SSHServerProcess) -> None:
+        cli = CLI_CLASSES[self.platform](self)
+        process.stdout.write(f"\n{cli.prompt}")
+        line = ""
+        try:
+            while not cli.closed:
+                try:
+                    data = await process.stdin.read(4096)
+                except asyncssh.TerminalSizeChanged:
+                    continue
+                if not data:
+                    break
+                for char in data:
+                    if char in "\r\n":
+                        process.stdout.write("\n")
+                        self.commands.append(line.strip())
+                        if self.command_delay:
+                            await asyncio.sleep(self.command_delay)
+                        output = await cli.execute(line.strip())
+                        line = ""
+                        if cli.closed:
+                            break
+                        if output:
+                            process.stdout.write(f"{output}\n")
+                        process.stdout.write(cli.prompt)
+                    elif char == "\x0c":
+                        # CTRL-L (keepalive) redraws the line, nothing to answer
+                        continue
+                    else:
+                        line += char
+                        process.stdout.write(char)
+        except (asyncssh.BreakReceived, asyncssh.DisconnectError, ConnectionError):
+            pass
+        finally:
+            process.exit(0)
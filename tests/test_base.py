@@ -1,13 +1,16 @@
+import asyncio
 from unittest import mock
 
 import pytest
+from emulator import DeviceEmulator
+from scrapli import AsyncScrapli
 
 from scrapli_transfer_utils.async_transfer.asyncscp.cisco_iosxe import AsyncSCPIOSXE
 from scrapli_transfer_utils.async_transfer.asyncsftp.huawei_vrp import (
     AsyncSFTPHuaweiVrp,
 )
 from scrapli_transfer_utils.async_transfer.base import AsyncTransferFeature
-from scrapli_transfer_utils.dataclasses import FileTransferResult
+from scrapli_transfer_utils.dataclasses import FileCheckResult, FileTransferResult
 from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
 
 
@@ -39,6 +42,16 @@ async def test_check_local_file_fail(async_scp_iosxe_object):
         assert check_file.size == 0
 
 
+@pytest.mark.parametrize("feature_class", [AsyncTransferFeature, AsyncSCPIOSXE])
+async def test_check_local_file_on_class(feature_class):
+    # used to be a staticmethod
+    check_file = await feature_class.check_local_file("", "files/test_file.txt")
+    missing = await feature_class.check_local_file("", "i_dont_exist.txt")
+
+    assert (check_file.hash, check_file.size) == ("2cc937eb4a09d18565fde23002a35284", 31)
+    assert (missing.hash, missing.size) == ("", 0)
+
+
 @pytest.mark.scrapli_replay
 async def test_file_transfer_all_opts(async_scp_iosxe_object):
     async_scp_iosxe_object.host = "10.1.1.154"
@@ -88,3 +101,58 @@ async def test_file_transfer_all_overwrite_false(async_scp_iosxe_object):
             assert file_trans.transferred is False
             assert file_trans.exists is True
             assert file_trans.verified is True
+
+
+@pytest.mark.parametrize("operation", ["get", "put"])
+async def test_file_transfer_checks_overlap(async_sftp_huawei_vrp_object, operation):
+    sftp = AsyncSrapliTransferUtils(async_sftp_huawei_vrp_object)
+    device_queried = asyncio.Event()
+    file_data = FileCheckResult(hash="aaa", size=10, free=100)
+
+    async def check_local_file(device_fs, file_name):
+        # only finishes if the device is queried at the same time
+        await asyncio.wait_for(device_queried.wait(), 1)
+        return file_data
+
+    async def check_device_file(device_fs, file_name):
+        assert device_fs == "flash:/"
+        device_queried.set()
+        return file_data
+
+    with mock.patch.object(
+        sftp, "check_local_file", side_effect=check_local_file
+    ), mock.patch.object(
+        sftp, "check_device_file", side_effect=check_device_file
+    ), mock.patch.object(
+        sftp, "_get_device_fs", return_value="flash:/"
+    ):
+        file_trans = await sftp.file_transfer(operation, "image.bin")
+
+    assert (file_trans.exists, file_trans.verified, file_trans.transferred) == (True, True, False)
+    assert file_trans.timings.src_check > 0
+    assert file_trans.timings.dst_check > 0
+    assert file_trans.timings.transfer == 0
+
+
+@pytest.mark.parametrize("platform", ["cisco_iosxe", "huawei_vrp"])
+async def test_file_transfer_keepalive(platform):
+    async def _async_file_transfer(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        return True
+
+    async with DeviceEmulator(platform) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn, keepalive_interval=0.01)
+            with mock.patch.object(
+                transfer, "_async_file_transfer", side_effect=_async_file_transfer
+            ), mock.patch.object(
+                conn.transport, "write", wraps=conn.transport.write
+            ) as write:
+                file_trans = await transfer.file_transfer("put", "image.bin", verify=False)
+                keepalives = write.call_args_list.count(mock.call(b"\x0c"))
+                await asyncio.sleep(0.05)
+
+                assert file_trans.transferred
+                assert keepalives >= 3
+                # stopped with the transfer
+                assert write.call_args_list.count(mock.call(b"\x0c")) == keepalives
@@ -0,0 +1,90 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from scrapli_transfer_utils.bulk import AsyncBulkFileTransfer, bulk_file_transfer
+from scrapli_transfer_utils.dataclasses import BulkTransferSpec, FileTransferResult
+
+
+class FakeConnection:
+    def __init__(self, **kwargs):
+        self.host = kwargs["host"]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeFeature:
+    running = 0
+    max_running = 0
+    running_per_site = {}
+    max_running_per_site = {}
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def file_transfer(self, **kwargs):
+        site = self.conn.host.split("-")[0]
+        FakeFeature.running += 1
+        FakeFeature.running_per_site[site] = FakeFeature.running_per_site.get(site, 0) + 1
+        FakeFeature.max_running = max(FakeFeature.max_running, FakeFeature.running)
+        FakeFeature.max_running_per_site[site] = max(
+            FakeFeature.max_running_per_site.get(site, 0), FakeFeature.running_per_site[site]
+        )
+        await asyncio.sleep(0.01)
+        FakeFeature.running -= 1
+        FakeFeature.running_per_site[site] -= 1
+        if self.conn.host.endswith("fail"):
+            raise ConnectionResetError("reset by peer")
+        return FileTransferResult(True, True, True, bytes_transferred=1000, retries=1)
+
+
+@pytest.fixture()
+def fake_devices():
+    FakeFeature.running = 0
+    FakeFeature.max_running = 0
+    FakeFeature.running_per_site = {}
+    FakeFeature.max_running_per_site = {}
+    with mock.patch("scrapli_transfer_utils.bulk.AsyncScrapli", FakeConnection), mock.patch(
+        "scrapli_transfer_utils.bulk.AsyncSrapliTransferUtils", FakeFeature
+    ):
+        yield [
+            {"host": f"{site}-{idx}", "platform": "cisco_iosxe", "site": site}
+            for site in ("ams", "rtm")
+            for idx in range(10)
+        ]
+
+
+async def test_bulk_file_transfer_concurrency(fake_devices):
+    bulk = AsyncBulkFileTransfer(
+        fake_devices,
+        BulkTransferSpec("put", src="image.bin"),
+        max_concurrency=4,
+        max_site_concurrency=3,
+    )
+
+    results = [bulk_result async for bulk_result in bulk.run()]
+
+    assert len(results) == 20
+    assert FakeFeature.max_running <= 4
+    assert max(FakeFeature.max_running_per_site.values()) <= 3
+    assert bulk.stats.completed == 20
+    assert bulk.stats.verified == 20
+    assert bulk.stats.failed == 0
+    assert bulk.stats.bytes_transferred == 20_000
+    assert bulk.stats.retries == 20
+    assert bulk.stats.throughput == 20_000 / bulk.stats.duration
+
+
+async def test_bulk_file_transfer_failure(fake_devices):
+    fake_devices.append({"host": "ams-fail", "platform": "cisco_iosxe", "site": "ams"})
+
+    stats = await bulk_file_transfer(fake_devices, BulkTransferSpec("put", src="image.bin"))
+
+    assert stats.total == 21
+    assert stats.transferred == 20
+    assert stats.failed == 1
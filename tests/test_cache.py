@@ -0,0 +1,300 @@
+import hashlib
+import json
+import os
+from unittest import mock
+
+from scrapli_transfer_utils.cache import DeviceHashCache, DeviceStateCache, LocalHashCache
+from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
+
+
+def test_local_hash_cache_hit(tmp_path):
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(b"image")
+    cache = LocalHashCache()
+
+    cache.set(str(file_name), os.stat(file_name), "abc")
+
+    assert cache.get(str(file_name), os.stat(file_name)) == "abc"
+
+
+def test_local_hash_cache_drops_changed_file(tmp_path):
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(b"image")
+    cache = LocalHashCache()
+    cache.set(str(file_name), os.stat(file_name), "abc")
+
+    file_name.write_bytes(b"new image")
+
+    assert cache.get(str(file_name), os.stat(file_name)) is None
+    assert len(cache) == 0
+
+
+def test_local_hash_cache_lru(tmp_path):
+    cache = LocalHashCache(maxsize=2)
+    for name in ("a", "b", "c"):
+        file_name = tmp_path / name
+        file_name.write_bytes(name.encode())
+        cache.set(str(file_name), os.stat(file_name), name)
+
+    assert len(cache) == 2
+    assert cache.get(str(tmp_path / "a"), os.stat(tmp_path / "a")) is None
+    assert cache.get(str(tmp_path / "c"), os.stat(tmp_path / "c")) == "c"
+
+
+def test_local_hash_cache_persistent(tmp_path):
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(b"image")
+    cache_file = str(tmp_path / "hashes.json")
+
+    cache = LocalHashCache(path=cache_file)
+    cache.set(str(file_name), os.stat(file_name), "abc")
+    cache.flush()
+
+    assert LocalHashCache(path=cache_file).get(str(file_name), os.stat(file_name)) == "abc"
+
+
+def test_local_hash_cache_delays_writes(tmp_path):
+    cache_file = tmp_path / "hashes.json"
+    cache = LocalHashCache(path=str(cache_file), save_delay=0.2)
+
+    with mock.patch("os.replace", wraps=os.replace) as replace:
+        for name in ("a", "b", "c"):
+            file_name = tmp_path / name
+            file_name.write_bytes(name.encode())
+            cache.set(str(file_name), os.stat(file_name), name)
+        assert not cache_file.exists()
+        cache._save_timer.join(2)
+
+    # one write for all updates
+    replace.assert_called_once()
+    assert len(json.loads(cache_file.read_text())) == 3
+    assert cache._save_timer is None
+
+
+def test_local_hash_cache_skips_bad_entries(tmp_path):
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(b"image")
+    file_stat = os.stat(file_name)
+    cache_file = tmp_path / "hashes.json"
+    cache_file.write_text(
+        json.dumps(
+            {
+                "/short": [1, 2, "abc"],
+                "/no_stat": ["a", "b", "c", "d", "abc"],
+                "/no_hashes": [1, 2, 3, 4, ["abc"]],
+                str(file_name): [
+                    file_stat.st_dev,
+                    file_stat.st_ino,
+                    file_stat.st_size,
+                    file_stat.st_mtime_ns,
+                    {"md5": "abc"},
+                ],
+            }
+        )
+    )
+
+    with mock.patch("scrapli_transfer_utils.cache.logger") as logger:
+        cache = LocalHashCache(path=str(cache_file))
+
+    assert len(cache) == 1
+    assert cache.get(str(file_name), file_stat) == "abc"
+    assert logger.warning.call_count == 3
+
+
+def test_local_hash_cache_per_algorithm(tmp_path):
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(b"image")
+    cache = LocalHashCache()
+
+    cache.set(str(file_name), os.stat(file_name), "abc")
+    cache.set(str(file_name), os.stat(file_name), "def", "sha512")
+
+    assert cache.get(str(file_name), os.stat(file_name)) == "abc"
+    assert cache.get(str(file_name), os.stat(file_name), "sha512") == "def"
+    assert cache.get(str(file_name), os.stat(file_name), "sha256") is None
+    assert len(cache) == 1
+
+
+def test_local_hash_cache_loads_md5_only_format(tmp_path):
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(b"image")
+    file_stat = os.stat(file_name)
+    cache_file = tmp_path / "hashes.json"
+    cache_file.write_text(
+        json.dumps(
+            {
+                str(file_name): [
+                    file_stat.st_dev,
+                    file_stat.st_ino,
+                    file_stat.st_size,
+                    file_stat.st_mtime_ns,
+                    "abc",
+                ]
+            }
+        )
+    )
+
+    assert LocalHashCache(path=str(cache_file)).get(str(file_name), file_stat, "md5") == "abc"
+
+
+async def test_check_local_file_uses_cache(async_scp_iosxe_object, tmp_path):
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(b"i am a test file for some tests")
+    cache = LocalHashCache()
+    cache.set(str(file_name), os.stat(file_name), "cached")
+
+    scp = AsyncSrapliTransferUtils(async_scp_iosxe_object, local_hash_cache=cache)
+    check_file = await scp.check_local_file(device_fs=None, file_name=str(file_name))
+
+    assert check_file.hash == "cached"
+
+
+async def test_check_local_file_fills_cache(async_scp_iosxe_object, tmp_path):
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(b"i am a test file for some tests")
+    cache = LocalHashCache()
+
+    scp = AsyncSrapliTransferUtils(async_scp_iosxe_object, local_hash_cache=cache)
+    await scp.check_local_file(device_fs=None, file_name=str(file_name))
+
+    assert cache.get(str(file_name), os.stat(file_name)) == "2cc937eb4a09d18565fde23002a35284"
+
+
+async def test_check_local_file_fills_cache_local_algorithms(async_scp_iosxe_object, tmp_path):
+    data = b"i am a test file for some tests"
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(data)
+    cache = LocalHashCache()
+
+    scp = AsyncSrapliTransferUtils(
+        async_scp_iosxe_object, local_hash_cache=cache, local_hash_algorithms=("sha256",)
+    )
+    await scp.check_local_file(device_fs=None, file_name=str(file_name))
+
+    assert cache.get(str(file_name), os.stat(file_name), "sha256") == hashlib.sha256(
+        data
+    ).hexdigest()
+
+
+def test_device_hash_cache_hit():
+    cache = DeviceHashCache()
+    cache.set("10.0.0.1", "flash:/", "image.bin", 100, "Dec 8 2022 08:12:53 +01:00", "abc")
+
+    assert cache.get("10.0.0.1", "flash:/", "image.bin", 100, "Dec 8 2022 08:12:53 +01:00") == (
+        "abc"
+    )
+    assert cache.get("10.0.0.2", "flash:/", "image.bin", 100, "Dec 8 2022 08:12:53 +01:00") is None
+
+
+def test_device_hash_cache_per_algorithm():
+    cache = DeviceHashCache()
+    timestamp = "Dec 8 2022 08:12:53 +01:00"
+    cache.set("10.0.0.1", "flash:/", "image.bin", 100, timestamp, "abc")
+    cache.set("10.0.0.1", "flash:/", "image.bin", 100, timestamp, "def", "sha512")
+
+    assert cache.get("10.0.0.1", "flash:/", "image.bin", 100, timestamp) == "abc"
+    assert cache.get("10.0.0.1", "flash:/", "image.bin", 100, timestamp, "sha512") == "def"
+    assert len(cache) == 1
+
+
+def test_device_hash_cache_drops_changed_file():
+    cache = DeviceHashCache()
+    cache.set("10.0.0.1", "flash:/", "image.bin", 100, "Dec 8 2022 08:12:53 +01:00", "abc")
+
+    assert cache.get("10.0.0.1", "flash:/", "image.bin", 100, "Dec 9 2022 08:12:53 +01:00") is None
+    assert len(cache) == 0
+
+
+def test_device_hash_cache_ignores_files_without_timestamp():
+    cache = DeviceHashCache()
+    cache.set("10.0.0.1", "system:/", "running-config", 100, "", "abc")
+
+    assert len(cache) == 0
+
+
+def test_device_state_cache_ttl():
+    cache = DeviceStateCache(ttl=60)
+
+    with mock.patch("scrapli_transfer_utils.cache.monotonic", return_value=100):
+        cache.set("10.1.1.1", "device_fs", "flash:/")
+        cache.set("10.1.1.1", "transfer_capable", None)
+    with mock.patch("scrapli_transfer_utils.cache.monotonic", return_value=150):
+        assert cache.get("10.1.1.1", "device_fs") == "flash:/"
+        assert cache.get("10.1.1.1", "transfer_capable") is None
+    with mock.patch("scrapli_transfer_utils.cache.monotonic", return_value=161):
+        assert cache.get("10.1.1.1", "device_fs") is None
+    assert len(cache) == 0
+
+
+def test_device_state_cache_invalidate_host():
+    cache = DeviceStateCache()
+    cache.set("10.1.1.1", "device_fs", "flash:/")
+    cache.set("10.1.1.1", "transfer_capable", True)
+    cache.set("10.1.1.2", "device_fs", "flash:/")
+
+    cache.invalidate("10.1.1.1", "transfer_capable")
+    assert cache.get("10.1.1.1", "transfer_capable") is None
+    cache.invalidate("10.1.1.1")
+    assert len(cache) == 1
+
+
+async def test_device_state_memoized_per_connection(async_sftp_huawei_vrp_object):
+    host_cache = DeviceStateCache(ttl=600)
+
+    async def ensure_transfer_capability(force):
+        return True
+
+    with mock.patch(
+        "scrapli_transfer_utils.async_transfer.asyncsftp.huawei_vrp.AsyncSFTPHuaweiVrp"
+        "._get_device_fs",
+        return_value="flash:/",
+    ) as get_device_fs, mock.patch(
+        "scrapli_transfer_utils.async_transfer.asyncsftp.huawei_vrp.AsyncSFTPHuaweiVrp"
+        "._ensure_transfer_capability",
+        side_effect=ensure_transfer_capability,
+    ) as ensure_capability:
+        for _ in range(3):
+            sftp = AsyncSrapliTransferUtils(
+                async_sftp_huawei_vrp_object, device_state_cache=host_cache
+            )
+            assert await sftp._device_fs() == "flash:/"
+            assert await sftp._transfer_capability() is not False
+
+    get_device_fs.assert_called_once()
+    ensure_capability.assert_called_once()
+    assert host_cache.get(async_sftp_huawei_vrp_object.host, "device_fs") == "flash:/"
+
+
+async def test_cached_device_fs_acquires_privilege(async_scp_iosxe_object):
+    scp = AsyncSrapliTransferUtils(async_scp_iosxe_object)
+
+    with mock.patch.object(
+        async_scp_iosxe_object, "acquire_priv"
+    ) as acquire_priv, mock.patch.object(
+        async_scp_iosxe_object,
+        "send_command",
+        return_value=mock.Mock(result="Directory of flash:/"),
+    ) as send_command:
+        assert await scp._device_fs() == "flash:/"
+        assert await scp._device_fs() == "flash:/"
+
+    send_command.assert_called_once()
+    # enable mode is still entered when the drive comes from the cache
+    assert acquire_priv.call_count == 2
+
+
+async def test_transfer_capability_not_memoized_after_config_change(async_sftp_huawei_vrp_object):
+    sftp = AsyncSrapliTransferUtils(async_sftp_huawei_vrp_object)
+
+    async def ensure_transfer_capability(force):
+        sftp.transfer_feature_to_clean = ["undo sftp server enable"]
+        return True
+
+    with mock.patch.object(
+        sftp, "_ensure_transfer_capability", side_effect=ensure_transfer_capability
+    ) as ensure_capability, mock.patch.object(sftp, "_cleanup_after_transfer"):
+        await sftp._transfer_capability(force=True)
+        await sftp._cleanup()
+        await sftp._transfer_capability(force=True)
+
+    assert ensure_capability.call_count == 2
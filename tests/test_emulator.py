@@ -0,0 +1,137 @@
+import os
+from unittest import mock
+from time import monotonic
+
+import pytest
+from emulator import DeviceEmulator
+from scrapli import AsyncScrapli
+
+from scrapli_transfer_utils.cache import LocalHashCache
+from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
+from scrapli_transfer_utils.hashing import HashingService, hash_file
+
+
+@pytest.mark.parametrize("platform", ["cisco_iosxe", "huawei_vrp"])
+async def test_emulator_put_get(tmp_path, platform):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(300_001))
+
+    async with DeviceEmulator(platform, root=str(tmp_path / "flash")) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn)
+            put_result = await transfer.file_transfer("put", str(src), "image.bin")
+            again_result = await transfer.file_transfer("put", str(src), "image.bin")
+            get_result = await transfer.file_transfer(
+                "get", "image.bin", str(tmp_path / "dst.bin")
+            )
+
+    assert (put_result.transferred, put_result.verified) == (True, True)
+    assert put_result.bytes_transferred == 300_001
+    assert (again_result.transferred, again_result.verified) == (False, True)
+    assert (get_result.transferred, get_result.verified) == (True, True)
+    assert hash_file(str(tmp_path / "flash" / "image.bin")) == hash_file(str(src))
+    assert hash_file(str(tmp_path / "dst.bin")) == hash_file(str(src))
+
+
+@pytest.mark.parametrize("platform", ["cisco_iosxe", "huawei_vrp"])
+async def test_emulator_device_file_size(tmp_path, platform):
+    data = os.urandom(1_234_567)
+    (tmp_path / "image.bin").write_bytes(data)
+
+    async with DeviceEmulator(platform, root=str(tmp_path)) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn)
+            device_fs = await transfer._device_fs()
+            check_file = await transfer.check_device_file(device_fs, "image.bin")
+
+    assert check_file.size == len(data)
+    assert check_file.hash == hash_file(str(tmp_path / "image.bin"))
+
+
+@pytest.mark.parametrize("platform", ["cisco_iosxe", "huawei_vrp"])
+async def test_emulator_transfer_disabled(tmp_path, platform):
+    src = tmp_path / "src.bin"
+    src.write_bytes(b"config")
+
+    async with DeviceEmulator(platform, transfer_enabled=False) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn)
+            refused = await transfer.file_transfer("put", str(src), "startup.cfg")
+            forced = await transfer.file_transfer(
+                "put", str(src), "startup.cfg", force_config=True
+            )
+
+        assert not refused.transferred
+        assert forced.transferred and forced.verified
+        if platform == "cisco_iosxe":
+            # cleanup restored the configuration
+            assert not device.config["ip scp server enable"]
+            assert device.config["ip ssh window-size"] == 8192
+
+
+async def test_emulator_iosxe_cli(tmp_path):
+    (tmp_path / "image.bin").write_bytes(b"x" * 1234)
+
+    async with DeviceEmulator("cisco_iosxe", root=str(tmp_path), hostname="sw1") as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            assert (await conn.get_prompt()) == "sw1#"
+            dir_output = (await conn.send_command("dir flash:/image.bin")).result
+            free_output = (await conn.send_command("dir flash:/ | i free\\)$")).result
+            missing = (await conn.send_command("verify /md5 flash:/missing.bin")).result
+
+    assert dir_output.startswith("Directory of flash:/image.bin")
+    assert " 1234 " in dir_output
+    assert free_output == f"{device.flash_size} bytes total ({device.flash_size - 1234} bytes free)"
+    assert "No such file" in missing
+
+
+async def test_emulator_link(tmp_path):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(200_000))
+
+    async with DeviceEmulator("huawei_vrp", latency=0.02, bandwidth=1_000_000) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn)
+            start_time = monotonic()
+            result = await transfer.file_transfer("put", str(src), "image.bin", verify=False)
+            duration = monotonic() - start_time
+
+    assert result.transferred
+    # 200kB at 1MB/s
+    assert duration > 0.2
+
+
+async def test_emulator_iosxe_sha512(tmp_path):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(10_000))
+
+    async with DeviceEmulator("cisco_iosxe", root=str(tmp_path / "flash")) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn, hash_algorithm="sha512")
+            result = await transfer.file_transfer("put", str(src), "image.bin")
+
+    assert (result.transferred, result.verified) == (True, True)
+    assert "verify /sha512 flash:/image.bin" in device.commands
+
+
+@pytest.mark.parametrize("platform", ["cisco_iosxe", "huawei_vrp"])
+async def test_emulator_get_hashed_while_received(tmp_path, platform):
+    (tmp_path / "flash").mkdir()
+    (tmp_path / "flash" / "image.bin").write_bytes(os.urandom(300_001))
+    dst = tmp_path / "dst.bin"
+    cache = LocalHashCache()
+    hashing_service = HashingService()
+
+    async with DeviceEmulator(platform, root=str(tmp_path / "flash")) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(
+                conn, local_hash_cache=cache, hashing_service=hashing_service
+            )
+            with mock.patch.object(
+                hashing_service, "hash_file", wraps=hashing_service.hash_file
+            ) as hash_file_mock:
+                result = await transfer.file_transfer("get", "image.bin", str(dst))
+
+    assert (result.transferred, result.verified) == (True, True)
+    hash_file_mock.assert_not_called()
+    assert cache.get(str(dst), os.stat(dst)) == hash_file(str(dst))
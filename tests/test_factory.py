@@ -6,6 +6,7 @@ from scrapli_transfer_utils.async_transfer.asyncscp.cisco_iosxe import AsyncSCPI
 from scrapli_transfer_utils.async_transfer.asyncsftp.huawei_vrp import (
     AsyncSFTPHuaweiVrp,
 )
+from scrapli_transfer_utils.exceptions import ScrapliSCPException
 from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
 
 
@@ -23,6 +24,30 @@ async def test_sftp_factory_huawei_vrp(async_sftp_huawei_vrp_object):
     assert isinstance(sftp_huawei_vrp, AsyncSFTPHuaweiVrp)
 
 
+async def test_factory_subclassed_driver():
+    class CustomIOSXEDriver(AsyncIOSXEDriver):
+        pass
+
+    conn = CustomIOSXEDriver(host="localhost", transport="asyncssh")
+
+    assert type(AsyncSrapliTransferUtils(conn)) is AsyncSCPIOSXE
+
+
+async def test_factory_unsupported_driver():
+    with pytest.raises(ScrapliSCPException):
+        AsyncSrapliTransferUtils(object())
+
+
+def test_factory_platform_map_deprecated():
+    with pytest.warns(DeprecationWarning):
+        from scrapli_transfer_utils.factory import ASYNC_CORE_PLATFORM_MAP
+
+    assert ASYNC_CORE_PLATFORM_MAP[AsyncIOSXEDriver] is AsyncSCPIOSXE
+    assert ASYNC_CORE_PLATFORM_MAP[AsyncHuaweiVRPDriver] is AsyncSFTPHuaweiVrp
+    with pytest.raises(TypeError):
+        ASYNC_CORE_PLATFORM_MAP[AsyncIOSXEDriver] = AsyncSFTPHuaweiVrp
+
+
 # async def test_factory_with_sync_fail(async_sftp_huawei_vrp_object):
 #     sftp_huawei_vrp = AsyncSrapliTransferUtils(async_sftp_huawei_vrp_object)
 #
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import threading
+from unittest import mock
+
+import pytest
+
+from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
+from scrapli_transfer_utils import hashing
+from scrapli_transfer_utils.hashing import (
+    HashingService,
+    StreamingDigest,
+    async_hash_file,
+    hash_file,
+    hash_file_digests,
+)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024, 1024 * 1024])
+def test_hash_file_chunked(tmp_path, chunk_size):
+    data = bytes(range(256)) * 1000
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(data)
+
+    assert hash_file(str(file_name), chunk_size) == hashlib.md5(data).hexdigest()
+
+
+def test_hash_file_invalid_chunk_size(tmp_path):
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(b"data")
+
+    with pytest.raises(ValueError):
+        hash_file(str(file_name), 0)
+
+
+def test_hash_file_digests_one_pass(tmp_path):
+    data = bytes(range(256)) * 1000
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(data)
+
+    assert hash_file_digests(str(file_name), ("md5", "sha512"), 7) == {
+        "md5": hashlib.md5(data).hexdigest(),
+        "sha512": hashlib.sha512(data).hexdigest(),
+    }
+
+
+def test_hash_file_unsupported_algorithm(tmp_path):
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(b"data")
+
+    with pytest.raises(ValueError):
+        hash_file(str(file_name), algorithm="nohash")
+
+
+async def test_async_hash_file(tmp_path):
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(b"i am a test file for some tests")
+
+    assert await async_hash_file(str(file_name)) == "2cc937eb4a09d18565fde23002a35284"
+
+
+async def test_check_local_file_hash_chunk_size(async_scp_iosxe_object, tmp_path):
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(b"i am a test file for some tests")
+
+    scp = AsyncSrapliTransferUtils(async_scp_iosxe_object, hash_chunk_size=4)
+
+    check_file = await scp.check_local_file(device_fs=None, file_name=str(file_name))
+
+    assert check_file.hash == "2cc937eb4a09d18565fde23002a35284"
+    assert check_file.size == 31
+
+
+def test_hash_algorithm_unsupported_by_platform(async_sftp_huawei_vrp_object):
+    with pytest.raises(ValueError):
+        AsyncSrapliTransferUtils(async_sftp_huawei_vrp_object, hash_algorithm="sha512")
+
+
+async def test_check_local_file_hash_algorithm(async_scp_iosxe_object, tmp_path):
+    data = b"i am a test file for some tests"
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(data)
+
+    scp = AsyncSrapliTransferUtils(async_scp_iosxe_object, hash_algorithm="sha512")
+
+    check_file = await scp.check_local_file(device_fs=None, file_name=str(file_name))
+
+    assert check_file.hash == hashlib.sha512(data).hexdigest()
+
+
+def test_streaming_digest_out_of_order():
+    digest = StreamingDigest(("md5", "sha256"))
+
+    digest.update_at(8, b"9")
+    digest.update_at(4, b"5678")
+    assert (digest.size, digest.complete) == (0, False)
+    digest.update_at(0, b"1234")
+
+    assert (digest.size, digest.complete) == (9, True)
+    assert digest.hexdigests() == {
+        "md5": hashlib.md5(b"123456789").hexdigest(),
+        "sha256": hashlib.sha256(b"123456789").hexdigest(),
+    }
+
+
+def test_streaming_digest_overlap():
+    digest = StreamingDigest()
+
+    digest.update_at(0, b"1234")
+    digest.update_at(2, b"34")
+
+    assert not digest.complete
+
+
+async def test_hashing_service_merges_requests(tmp_path):
+    data = bytes(range(256)) * 1000
+    file_name = tmp_path / "image.bin"
+    file_name.write_bytes(data)
+    service = HashingService(max_workers=2)
+    hash_file_digests = hashing.hash_file_digests
+    release = threading.Event()
+
+    def _hash_file_digests(*args):
+        # keep the computation running until all requests were made
+        release.wait(5)
+        return hash_file_digests(*args)
+
+    with mock.patch.object(
+        hashing, "hash_file_digests", side_effect=_hash_file_digests
+    ) as hash_file_digests_mock:
+        requests = [
+            asyncio.create_task(service.hash_file(str(file_name), algorithms))
+            for algorithms in (("md5", "sha256"), ("md5", "sha256"), ("sha256",))
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*requests)
+    service.shutdown()
+
+    assert hash_file_digests_mock.call_count == 1
+    assert results[0] == results[1] == {
+        "md5": hashlib.md5(data).hexdigest(),
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+    assert results[2] == {"sha256": hashlib.sha256(data).hexdigest()}
+
+
+async def test_hashing_service_parallel(tmp_path):
+    file_names = []
+    for name in "abcd":
+        file_name = tmp_path / name
+        file_name.write_bytes(name.encode())
+        file_names.append(str(file_name))
+    service = HashingService(max_workers=4)
+    # every worker waits until all four files are being hashed at the same time
+    barrier = threading.Barrier(4, timeout=5)
+
+    def _hash_file_digests(*args):
+        barrier.wait()
+        return hash_file_digests(*args)
+
+    with mock.patch.object(hashing, "hash_file_digests", _hash_file_digests):
+        results = await service.hash_files(file_names + file_names[:1])
+    service.shutdown()
+
+    assert list(results) == file_names
+    assert results[file_names[1]] == {"md5": hashlib.md5(b"b").hexdigest()}
+
+
+async def test_hashing_service_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        await HashingService().hash_file(str(tmp_path / "missing.bin"))
+
+
+async def test_check_local_files(async_scp_iosxe_object, tmp_path):
+    file_names = []
+    for name in "ab":
+        file_name = tmp_path / name
+        file_name.write_bytes(name.encode())
+        file_names.append(str(file_name))
+
+    scp = AsyncSrapliTransferUtils(
+        async_scp_iosxe_object, local_hash_cache=None, hashing_service=HashingService(2)
+    )
+
+    check_files = await scp.check_local_files(None, file_names + [str(tmp_path / "missing")])
+
+    assert check_files[file_names[0]].hash == hashlib.md5(b"a").hexdigest()
+    assert check_files[file_names[1]].size == 1
+    assert check_files[str(tmp_path / "missing")].hash == ""
@@ -1,14 +1,19 @@
-import asyncio
-from asyncio.subprocess import Process
+import os
 from unittest import mock
-from unittest.mock import patch
 
+import asyncssh
 import pytest
+from emulator import DeviceEmulator
+from scrapli import AsyncScrapli
 from scrapli_community.huawei.vrp.async_driver import AsyncHuaweiVRPDriver
 
+from scrapli_transfer_utils.async_transfer.asyncsftp import engine
 from scrapli_transfer_utils.async_transfer.asyncsftp.huawei_vrp import (
     AsyncSFTPHuaweiVrp,
 )
+from scrapli_transfer_utils.cache import DeviceHashCache
+from scrapli_transfer_utils.dataclasses import TransferTuning
+from scrapli_transfer_utils.exceptions import TransferFileNotFoundError
 from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
 
 
@@ -25,7 +30,7 @@ async def test_check_device_file_huawei_vrp_succes(async_sftp_huawei_vrp_object)
 
         assert check_file.hash == "259bb20835c70bce41765234d9b812de"
         assert check_file.free == 379748000
-        assert check_file.size == 14917000
+        assert check_file.size == 14917
 
 
 @pytest.mark.scrapli_replay
@@ -123,25 +128,213 @@ async def test_get_device_fs_vrp(async_sftp_huawei_vrp_object):
         assert value == "flash:/"
 
 
-@pytest.mark.scrapli_replay
-async def test_async_file_transfer_vrp_fail(async_sftp_huawei_vrp_object):
-    async with async_sftp_huawei_vrp_object as session:
-        await session.open()
-        sftp = AsyncSrapliTransferUtils(async_sftp_huawei_vrp_object)
-
-        with mock.patch.object(Process, "communicate", autospec=True) as communicate:
-            communicate.return_value = (b"lala", b"No such file or directory")
-            with pytest.raises(FileNotFoundError) as exc_info:
-                await sftp._async_file_transfer("get", "config", ".")
-
-
-@pytest.mark.scrapli_replay
-async def test_async_file_transfer_vrp_succes(async_sftp_huawei_vrp_object):
-    async with async_sftp_huawei_vrp_object as session:
-        await session.open()
-        sftp = AsyncSrapliTransferUtils(async_sftp_huawei_vrp_object)
-
-        with mock.patch.object(Process, "communicate", autospec=True) as communicate:
-            communicate.return_value = (b"lala", b"loeloe")
-            file_trans = await sftp._async_file_transfer("get", "config", ".")
-            assert file_trans == True
+@pytest.fixture()
+def sftp_session(async_sftp_huawei_vrp_object):
+    session = mock.MagicMock()
+    session.start_sftp_client.return_value.__aenter__.return_value = mock.Mock()
+    async_sftp_huawei_vrp_object.transport.session = session
+    return session
+
+
+async def test_async_file_transfer_vrp_fail(async_sftp_huawei_vrp_object, sftp_session):
+    sftp = AsyncSrapliTransferUtils(async_sftp_huawei_vrp_object)
+
+    with mock.patch(
+        "scrapli_transfer_utils.async_transfer.asyncsftp.huawei_vrp.sftp_get",
+        side_effect=asyncssh.SFTPNoSuchFile("No such file"),
+    ):
+        with pytest.raises(FileNotFoundError) as exc_info:
+            await sftp._async_file_transfer("get", "config", ".")
+
+    assert isinstance(exc_info.value, TransferFileNotFoundError)
+    assert exc_info.value.reason == "No such file"
+
+
+async def test_async_file_transfer_vrp_succes(async_sftp_huawei_vrp_object, sftp_session):
+    sftp = AsyncSrapliTransferUtils(async_sftp_huawei_vrp_object)
+
+    with mock.patch(
+        "scrapli_transfer_utils.async_transfer.asyncsftp.huawei_vrp.sftp_get",
+        return_value=31,
+    ) as sftp_get:
+        file_trans = await sftp._async_file_transfer("get", "config", ".")
+
+    assert file_trans is True
+    sftp_get.assert_called_once()
+    sftp_session.start_sftp_client.assert_called_once()
+
+
+async def test_check_device_file_huawei_vrp_cached(async_sftp_huawei_vrp_object):
+    dir_output = mock.Mock(
+        result=(
+            "Directory of flash:/\n\n"
+            "   10  -rw-         14,917  Feb 05 2025 13:26:13   axess_20250205132038.cfg\n"
+            " \n"
+            "631,960 KB total available (379,748 KB free)\n"
+        )
+    )
+    md5_output = mock.Mock(
+        result="File Name:\nflash:/axess_20250205132038.cfg\nMD5:\n259bb20835c70bce41765234d9b812de"
+    )
+    sftp = AsyncSrapliTransferUtils(
+        async_sftp_huawei_vrp_object, device_hash_cache=DeviceHashCache()
+    )
+
+    with mock.patch.object(
+        AsyncHuaweiVRPDriver, "send_command", side_effect=[dir_output, md5_output, dir_output]
+    ) as send_command:
+        first = await sftp.check_device_file("flash:/", "axess_20250205132038.cfg")
+        second = await sftp.check_device_file("flash:/", "axess_20250205132038.cfg")
+
+    assert first == second
+    assert second.hash == "259bb20835c70bce41765234d9b812de"
+    assert second.size == 14917
+    assert second.free == 379748000
+    assert send_command.call_count == 3
+
+
+@pytest.mark.parametrize(
+    "partial, overwrite, verify_size, transferred, verified, bytes_transferred",
+    [
+        ("prefix", False, 65536, True, True, 100_000),
+        ("unrelated", False, 65536, False, False, 0),
+        ("unrelated", True, 65536, True, True, 1_000_000),
+        # the sampled compare misses it, the hash verification does not
+        ("middle", False, 65536, True, False, 100_000),
+        ("middle", False, None, False, False, 0),
+    ],
+)
+async def test_file_transfer_vrp_resume_partial(
+    tmp_path, partial, overwrite, verify_size, transferred, verified, bytes_transferred
+):
+    data = os.urandom(1_000_000)
+    src = tmp_path / "image.bin"
+    src.write_bytes(data)
+    flash = tmp_path / "flash"
+    flash.mkdir()
+    device_data = {
+        "prefix": data[:900_000],
+        "unrelated": os.urandom(900_000),
+        # matches at the start and at the end, not in the middle
+        "middle": data[:400_000] + os.urandom(100_000) + data[500_000:900_000],
+    }[partial]
+    (flash / "image.bin").write_bytes(device_data)
+
+    async with DeviceEmulator("huawei_vrp", root=str(flash)) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            sftp = AsyncSrapliTransferUtils(conn, local_hash_cache=None)
+            file_trans = await sftp.file_transfer(
+                "put",
+                str(src),
+                "image.bin",
+                resume=True,
+                overwrite=overwrite,
+                tuning=TransferTuning(resume_verify_size=verify_size),
+            )
+
+    assert (file_trans.transferred, file_trans.verified) == (transferred, verified)
+    assert file_trans.bytes_transferred == bytes_transferred
+    if not transferred:
+        assert (flash / "image.bin").read_bytes() == device_data
+    elif verified:
+        assert (flash / "image.bin").read_bytes() == data
+    if transferred:
+        assert file_trans.throughput > 0
+        assert file_trans.timings.transfer > 0
+        assert file_trans.timings.verify > 0
+
+
+async def test_file_transfer_vrp_resume_reads_sampled_window(tmp_path):
+    data = os.urandom(1_000_000)
+    src = tmp_path / "image.bin"
+    src.write_bytes(data)
+    flash = tmp_path / "flash"
+    flash.mkdir()
+    (flash / "image.bin").write_bytes(data[:900_000])
+
+    read_remote = mock.AsyncMock(side_effect=engine._read_remote)
+    async with DeviceEmulator("huawei_vrp", root=str(flash)) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            sftp = AsyncSrapliTransferUtils(conn, local_hash_cache=None)
+            with mock.patch.object(engine, "_read_remote", read_remote):
+                file_trans = await sftp.file_transfer("put", str(src), "image.bin", resume=True)
+
+    assert (file_trans.transferred, file_trans.verified) == (True, True)
+    assert file_trans.bytes_transferred == 100_000
+    # only the start and the end of the partial file are read back
+    assert [call.args[1:] for call in read_remote.call_args_list] == [
+        (0, 65536),
+        (900_000 - 65536, 65536),
+    ]
+
+
+async def test_check_device_files_huawei_vrp(async_sftp_huawei_vrp_object):
+    dir_output = mock.Mock(
+        result=(
+            "Directory of flash:/\n\n"
+            "   10  -rw-         14,917  Feb 05 2025 13:26:13   axess_20250205132038.cfg\n"
+            "   11  -rw-         14,438  Apr 23 2024 10:01:02   axess_20240423095511.cfg\n"
+            "   12  -rw-              1  Apr 23 2024 10:01:02   [axess_missing.cfg]\n"
+            " \n"
+            "631,960 KB total available (379,748 KB free)\n"
+        )
+    )
+    md5_output = mock.Mock(
+        result="File Name:\nflash:/axess_20250205132038.cfg\nMD5:\n259bb20835c70bce41765234d9b812de"
+    )
+    sftp = AsyncSrapliTransferUtils(
+        async_sftp_huawei_vrp_object, device_hash_cache=DeviceHashCache()
+    )
+    sftp.device_hash_cache.set(
+        async_sftp_huawei_vrp_object.host,
+        "flash:/",
+        "axess_20240423095511.cfg",
+        14438,
+        "Apr 23 2024 10:01:02",
+        "cached",
+    )
+
+    with mock.patch.object(
+        AsyncHuaweiVRPDriver, "send_command", side_effect=[dir_output, md5_output]
+    ) as send_command:
+        results = await sftp.check_device_files(
+            "flash:/",
+            ["axess_20250205132038.cfg", "axess_20240423095511.cfg", "axess_missing.cfg"],
+        )
+
+    assert send_command.call_count == 2
+    assert results["axess_20250205132038.cfg"].hash == "259bb20835c70bce41765234d9b812de"
+    assert results["axess_20240423095511.cfg"].hash == "cached"
+    assert results["axess_missing.cfg"].hash == ""
+    assert all(result.free == 379748000 for result in results.values())
+
+
+async def test_transfer_session_vrp(async_sftp_huawei_vrp_object, sftp_session):
+    sftp = AsyncSrapliTransferUtils(async_sftp_huawei_vrp_object)
+
+    async def ensure_transfer_capability(force):
+        sftp.transfer_feature_to_clean = ["undo sftp server enable"]
+        return True
+
+    with mock.patch.object(
+        sftp, "_ensure_transfer_capability", side_effect=ensure_transfer_capability
+    ) as ensure_capability, mock.patch.object(
+        sftp, "_cleanup_after_transfer"
+    ) as cleanup, mock.patch(
+        "scrapli_transfer_utils.async_transfer.asyncsftp.huawei_vrp.sftp_put",
+        return_value=31,
+    ) as sftp_put:
+        async with sftp.transfer_session(force_config=True) as session:
+            for file_name in ["a.cfg", "b.cfg", "c.cfg"]:
+                file_trans = await session.file_transfer(
+                    "put", file_name, verify=False, device_fs="flash:/"
+                )
+                assert file_trans.transferred is True
+            cleanup.assert_not_called()
+
+    ensure_capability.assert_called_once_with(force=True)
+    cleanup.assert_called_once()
+    assert sftp_put.call_count == 3
+    # one SFTP client for the whole session
+    sftp_session.start_sftp_client.assert_called_once()
+    assert sftp._session_stack is None
@@ -5,6 +5,8 @@ import pytest
 from scrapli.driver.core import AsyncIOSXEDriver
 
 from scrapli_transfer_utils.async_transfer.asyncscp.cisco_iosxe import AsyncSCPIOSXE
+from scrapli_transfer_utils.cache import DeviceHashCache
+from scrapli_transfer_utils.dataclasses import TransferTuning
 from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
 
 
@@ -107,3 +109,145 @@ async def test_ensure_transfer_capability_iosxe_force_false_but_no_config(
 
             assert scp.transfer_feature_to_clean == []
             assert value is False
+
+
+async def test_check_device_file_iosxe_cached(async_scp_iosxe_object):
+    dir_output = mock.Mock(
+        result="15      -rw-          2814938   Dec 8 2022 08:12:53 +01:00  image.bin"
+    )
+    free_output = mock.Mock(result="2885718016 bytes total (360153088 bytes free)")
+    verify_output = mock.Mock(
+        result="verify /md5 (bootflash:/image.bin) = c61b399f34b178264d23617becf6c88b"
+    )
+    scp = AsyncSrapliTransferUtils(async_scp_iosxe_object, device_hash_cache=DeviceHashCache())
+
+    with mock.patch.object(
+        AsyncIOSXEDriver, "send_commands", return_value=[dir_output, free_output]
+    ), mock.patch.object(
+        AsyncIOSXEDriver, "send_command", return_value=verify_output
+    ) as send_command:
+        first = await scp.check_device_file("flash:/", "image.bin")
+        second = await scp.check_device_file("flash:/", "image.bin")
+
+    assert first == second
+    assert second.hash == "c61b399f34b178264d23617becf6c88b"
+    assert second.size == 2814938
+    assert second.free == 360153088
+    send_command.assert_called_once()
+
+
+async def test_async_file_transfer_iosxe_reuse_session(async_scp_iosxe_object):
+    session = mock.Mock()
+    async_scp_iosxe_object.transport.session = session
+    scp = AsyncSrapliTransferUtils(async_scp_iosxe_object)
+
+    with mock.patch(
+        "scrapli_transfer_utils.async_transfer.asyncscp.cisco_iosxe.scp_put"
+    ) as scp_copy, mock.patch(
+        "scrapli_transfer_utils.async_transfer.base.connect"
+    ) as connect:
+        value = await scp._async_file_transfer("put", "files/test.txt", "test.txt")
+
+    assert value is True
+    assert scp_copy.call_args.args[0] is session
+    assert scp_copy.call_args.args[2] == "test.txt"
+    connect.assert_not_called()
+
+
+async def test_async_file_transfer_iosxe_reuse_session_refused(async_scp_iosxe_object):
+    async_scp_iosxe_object.transport.session = mock.Mock()
+    scp = AsyncSrapliTransferUtils(async_scp_iosxe_object)
+    new_conn = mock.Mock()
+
+    with mock.patch(
+        "scrapli_transfer_utils.async_transfer.asyncscp.cisco_iosxe.scp_get",
+        side_effect=[asyncssh.ChannelOpenError(1, "administratively prohibited"), None],
+    ) as scp_copy, mock.patch(
+        "scrapli_transfer_utils.async_transfer.base.connect"
+    ) as connect:
+        connect.return_value.__aenter__.return_value = new_conn
+        value = await scp._async_file_transfer("get", "running-config", "files/test.txt")
+
+    assert value is True
+    connect.assert_called_once()
+    assert scp_copy.call_args.args[:2] == (new_conn, "running-config")
+
+
+async def test_async_file_transfer_iosxe_tuning(async_scp_iosxe_object):
+    async_scp_iosxe_object.transport.session = mock.Mock()
+    scp = AsyncSrapliTransferUtils(async_scp_iosxe_object, reuse_ssh_session=False)
+    tuning = TransferTuning(block_size=131072, window=8388608, max_pktsize=65536)
+
+    with mock.patch(
+        "scrapli_transfer_utils.async_transfer.asyncscp.cisco_iosxe.scp_put"
+    ) as scp_copy, mock.patch(
+        "scrapli_transfer_utils.async_transfer.base.connect"
+    ) as connect:
+        value = await scp._async_file_transfer(
+            "put", "files/test.txt", "test.txt", tuning=tuning
+        )
+
+    assert value is True
+    assert connect.call_args.kwargs["window"] == 8388608
+    assert connect.call_args.kwargs["max_pktsize"] == 65536
+    assert scp_copy.call_args.kwargs["block_size"] == 131072
+    assert scp_copy.call_args.kwargs["window"] == 8388608
+
+
+async def test_check_device_files_iosxe(async_scp_iosxe_object):
+    dir_output = mock.Mock(
+        result=(
+            "Directory of bootflash:/\n\n"
+            "15      -rw-          2814938   Dec 8 2022 08:12:53 +01:00  image.bin\n"
+            "16      -rw-             1024   Dec 8 2022 08:13:01 +01:00  old_image.bin.pkg\n"
+            "17      -rw-             2048   Dec 8 2022 08:13:02 +01:00  image.bin.pkg\n\n"
+            "2885718016 bytes total (360153088 bytes free)\n"
+        )
+    )
+    verify_outputs = [
+        mock.Mock(result="verify /md5 (bootflash:/image.bin) = c61b399f34b178264d23617becf6c88b"),
+        mock.Mock(result="verify /md5 (bootflash:/image.bin.pkg) = 0d3f6dbee86c4b1d5bb0df5ef4ed2e5e"),
+    ]
+    scp = AsyncSrapliTransferUtils(async_scp_iosxe_object)
+
+    with mock.patch.object(
+        AsyncIOSXEDriver, "send_command", side_effect=[dir_output, *verify_outputs]
+    ) as send_command:
+        results = await scp.check_device_files("flash:/", ["image.bin", "image.bin.pkg", "x.pkg"])
+
+    assert [call.args[0] for call in send_command.call_args_list] == [
+        "dir flash:/",
+        "verify /md5 flash:/image.bin",
+        "verify /md5 flash:/image.bin.pkg",
+    ]
+    assert results["image.bin"].hash == "c61b399f34b178264d23617becf6c88b"
+    assert results["image.bin"].size == 2814938
+    assert results["image.bin.pkg"].size == 2048
+    assert results["x.pkg"].hash == ""
+    assert all(result.free == 360153088 for result in results.values())
+
+
+async def test_transfer_session_iosxe_keeps_new_connection(async_scp_iosxe_object):
+    async_scp_iosxe_object.transport.session = mock.Mock()
+    scp = AsyncSrapliTransferUtils(async_scp_iosxe_object, reuse_ssh_session=False)
+
+    with mock.patch.object(
+        scp, "_ensure_transfer_capability", return_value=None
+    ), mock.patch(
+        "scrapli_transfer_utils.async_transfer.asyncscp.cisco_iosxe.scp_put", return_value=31
+    ) as scp_copy, mock.patch(
+        "scrapli_transfer_utils.async_transfer.base.connect"
+    ) as connect:
+        async with scp.transfer_session() as session:
+            await session.file_transfer(
+                "put", "files/test.txt", "a.txt", verify=False, device_fs="flash:/"
+            )
+            file_trans = await session.file_transfer(
+                "put", "files/test.txt", "b.txt", verify=False, device_fs="flash:/"
+            )
+            connect.return_value.__aexit__.assert_not_called()
+
+    connect.assert_called_once()
+    connect.return_value.__aexit__.assert_called_once()
+    assert scp_copy.call_count == 2
+    assert file_trans.bytes_transferred == 31
@@ -0,0 +1,132 @@
+import hashlib
+import io
+import os
+
+import aiofiles
+import pytest
+from emulator import DeviceEmulator
+from scrapli import AsyncScrapli
+
+from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
+from scrapli_transfer_utils.local import LocalSink, LocalSource
+
+
+class _Pipe(io.RawIOBase):
+    """Readable stream which can't seek"""
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._data.readinto(buffer)
+
+
+@pytest.mark.parametrize("kind", ["bytes", "memoryview", "bytesio", "pipe"])
+async def test_local_source(kind):
+    data = bytes(range(256)) * 100
+    source = {
+        "bytes": lambda: data,
+        "memoryview": lambda: memoryview(data),
+        "bytesio": lambda: io.BytesIO(data),
+        "pipe": lambda: _Pipe(data),
+    }[kind]()
+
+    local_source = LocalSource(source)
+    check = await local_source.check("sha256", chunk_size=1000)
+
+    assert check.hash == hashlib.sha256(data).hexdigest()
+    assert check.size == len(data)
+    assert await local_source.read_at(25_000, 1000) == data[25_000:26_000]
+    assert await local_source.read_at(25_500, 1000) == data[25_500:]
+
+
+async def test_local_source_starts_at_stream_position():
+    stream = io.BytesIO(b"headerdata")
+    stream.seek(6)
+
+    check = await LocalSource(stream).check()
+
+    assert check.hash == hashlib.md5(b"data").hexdigest()
+    assert check.size == 4
+
+
+def test_local_source_unsupported():
+    with pytest.raises(TypeError):
+        LocalSource(42)
+
+
+async def test_local_sink_stream_out_of_order():
+    stream = io.BytesIO()
+    sink = LocalSink(stream)
+
+    await sink.open()
+    await sink.write_at(4, b"5678")
+    assert stream.getvalue() == b""
+    await sink.write_at(0, b"1234")
+    await sink.close()
+
+    assert stream.getvalue() == b"12345678"
+    assert (await sink.check()).hash == hashlib.md5(b"12345678").hexdigest()
+
+
+async def test_local_sink_bytearray():
+    buffer = bytearray(b"old content")
+    sink = LocalSink(buffer)
+
+    assert (await sink.check()).hash == hashlib.md5(b"old content").hexdigest()
+    await sink.open()
+    await sink.write_at(4, b"5678")
+    await sink.write_at(0, b"1234")
+    await sink.close()
+
+    assert buffer == b"12345678"
+
+
+@pytest.mark.parametrize("platform", ["cisco_iosxe", "huawei_vrp"])
+async def test_file_transfer_in_memory(tmp_path, platform):
+    data = os.urandom(200_001)
+
+    async with DeviceEmulator(platform, root=str(tmp_path / "flash")) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn)
+            put_result = await transfer.file_transfer("put", data, "config.txt")
+            again_result = await transfer.file_transfer("put", io.BytesIO(data), "config.txt")
+            buffer = bytearray()
+            get_result = await transfer.file_transfer("get", "config.txt", buffer)
+            stream = io.BytesIO()
+            stream_result = await transfer.file_transfer("get", "config.txt", stream)
+
+    assert (put_result.transferred, put_result.verified) == (True, True)
+    assert (again_result.transferred, again_result.verified) == (False, True)
+    assert (get_result.transferred, get_result.verified) == (True, True)
+    assert (stream_result.transferred, stream_result.verified) == (True, True)
+    assert (tmp_path / "flash" / "config.txt").read_bytes() == data
+    assert buffer == data
+    assert stream.getvalue() == data
+
+
+async def test_file_transfer_async_file(tmp_path):
+    data = os.urandom(100_000)
+    (tmp_path / "src.bin").write_bytes(data)
+
+    async with DeviceEmulator("huawei_vrp", root=str(tmp_path / "flash")) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn)
+            async with aiofiles.open(tmp_path / "src.bin", "rb") as src:
+                put_result = await transfer.file_transfer("put", src, "image.bin")
+            async with aiofiles.open(tmp_path / "dst.bin", "wb") as dst:
+                get_result = await transfer.file_transfer("get", "image.bin", dst)
+
+    assert (put_result.transferred, put_result.verified) == (True, True)
+    assert (get_result.transferred, get_result.verified) == (True, True)
+    assert (tmp_path / "dst.bin").read_bytes() == data
+
+
+async def test_file_transfer_in_memory_needs_dst(async_scp_iosxe_object):
+    transfer = AsyncSrapliTransferUtils(async_scp_iosxe_object)
+
+    with pytest.raises(ValueError):
+        await transfer.file_transfer("put", b"data")
@@ -0,0 +1,141 @@
+import asyncio
+import os
+
+import pytest
+from emulator import DeviceEmulator
+from scrapli import AsyncScrapli
+
+from scrapli_transfer_utils.bulk import bulk_file_transfer
+from scrapli_transfer_utils.dataclasses import BulkTransferSpec, TransferProgress, TransferTuning
+from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
+from scrapli_transfer_utils.progress import ProgressReporter, ProgressStream
+
+
+async def test_progress_stream_keeps_latest_event_per_transfer():
+    stream = ProgressStream()
+    for done in (1, 2, 3):
+        stream.publish(TransferProgress("r1", "put", "a", "a", "transfer", done, 3))
+    stream.publish(TransferProgress("r2", "put", "a", "a", "transfer", 1, 3))
+    stream.close()
+
+    events = [(event.host, event.done) async for event in stream]
+
+    assert events == [("r1", 3), ("r2", 1)]
+
+
+async def test_progress_stream_waits_for_events():
+    stream = ProgressStream()
+
+    async def publish():
+        await asyncio.sleep(0.01)
+        stream.publish(TransferProgress("r1", "put", "a", "a", "done"))
+        stream.close()
+
+    task = asyncio.create_task(publish())
+    events = [event.phase async for event in stream]
+    await task
+
+    assert events == ["done"]
+
+
+async def test_progress_reporter_throttles_stream_not_handler():
+    stream = ProgressStream(max_rate=1)
+    calls = []
+    reporter = ProgressReporter(
+        "r1", "put", "a", "b", stream=stream, handler=lambda *args: calls.append(args)
+    )
+    reporter.phase("transfer")
+    for done in range(1, 101):
+        reporter("a", "b", done, 100)
+    stream.close()
+
+    events = [event async for event in stream]
+
+    assert len(calls) == 100
+    # only the latest event is kept: the completed copy
+    assert [(event.phase, event.done, event.total) for event in events] == [("transfer", 100, 100)]
+
+
+@pytest.mark.parametrize("platform", ["cisco_iosxe", "huawei_vrp"])
+async def test_file_transfer_progress(tmp_path, platform):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(1_000_000))
+    stream = ProgressStream(max_rate=None)
+    handler_calls = []
+
+    async with DeviceEmulator(platform) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn)
+
+            async def run():
+                try:
+                    return await transfer.file_transfer(
+                        "put",
+                        str(src),
+                        "image.bin",
+                        tuning=TransferTuning(block_size=65536, max_requests=1),
+                        progress_handler=lambda *args: handler_calls.append(args),
+                        progress=stream,
+                    )
+                finally:
+                    stream.close()
+
+            task = asyncio.create_task(run())
+            events = []
+            async for event in stream:
+                events.append(event)
+                # slow consumer, events are coalesced but phases are seen in order
+                await asyncio.sleep(0)
+            result = await task
+
+    phases = [event.phase for event in events]
+    assert phases[0] == "check"
+    assert phases[-1] == "done"
+    assert "transfer" in phases
+    assert phases.index("transfer") < phases.index("verify")
+    assert events[-1].result is result
+    assert events[-1].done == events[-1].total == 1_000_000
+    assert events[-1].rate == result.throughput
+    assert handler_calls[-1][2:] == (1_000_000, 1_000_000)
+
+
+async def test_file_transfer_progress_failed(tmp_path):
+    stream = ProgressStream()
+
+    async with DeviceEmulator("huawei_vrp") as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn)
+            with pytest.raises(Exception):
+                await transfer.file_transfer(
+                    "put", str(tmp_path / "missing.bin"), verify=False, progress=stream
+                )
+    stream.close()
+
+    assert [event.phase async for event in stream] == ["failed"]
+
+
+async def test_bulk_file_transfer_progress(tmp_path):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(100_000))
+    stream = ProgressStream()
+    emulators = [DeviceEmulator("huawei_vrp") for _ in range(3)]
+
+    async def run():
+        try:
+            return await bulk_file_transfer(
+                [device.scrapli_kwargs() for device in emulators],
+                BulkTransferSpec("put", str(src), progress=stream),
+            )
+        finally:
+            stream.close()
+
+    await asyncio.gather(*(device.start() for device in emulators))
+    try:
+        task = asyncio.create_task(run())
+        done_events = [event async for event in stream if event.phase == "done"]
+        stats = await task
+    finally:
+        await asyncio.gather(*(device.stop() for device in emulators))
+
+    assert stats.transferred == 3
+    assert len(done_events) == 3
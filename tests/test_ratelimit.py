@@ -0,0 +1,73 @@
+import asyncio
+import os
+from time import monotonic
+
+import pytest
+from emulator import DeviceEmulator
+from scrapli import AsyncScrapli
+
+from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
+from scrapli_transfer_utils.ratelimit import BandwidthLimiter, TokenBucket, make_throttle
+
+
+async def test_token_bucket_rate():
+    bucket = TokenBucket(rate=1_000_000, burst=10_000)
+
+    start_time = monotonic()
+    await bucket.acquire(10_000)
+    burst_time = monotonic() - start_time
+    await bucket.acquire(200_000)
+    total_time = monotonic() - start_time
+
+    assert burst_time < 0.05
+    assert 0.18 < total_time < 0.5
+
+
+async def test_token_bucket_runtime_change():
+    bucket = TokenBucket(rate=0)
+    acquire = asyncio.create_task(bucket.acquire(1000))
+
+    await asyncio.sleep(0.05)
+    assert not acquire.done()
+    bucket.rate = None
+    await asyncio.wait_for(acquire, 1)
+
+    # no debt carried over into a limit set later
+    bucket.rate = 1_000_000
+    start_time = monotonic()
+    await bucket.acquire(1000)
+    assert monotonic() - start_time < 0.05
+
+
+async def test_bandwidth_limiter_groups():
+    limiter = BandwidthLimiter(rate=100.0, group_rate=10.0)
+    limiter.group("ams").rate = 2.0
+
+    assert limiter.buckets() == [limiter.global_bucket]
+    assert limiter.buckets("ams") == [limiter.group("ams"), limiter.global_bucket]
+    assert limiter.group("ams").rate == 2.0
+    assert limiter.group("fra").rate == 10.0
+    assert make_throttle([None]) is None
+
+
+@pytest.mark.parametrize("platform", ["cisco_iosxe", "huawei_vrp"])
+async def test_file_transfer_bandwidth(tmp_path, platform):
+    data = os.urandom(300_000)
+    limiter = BandwidthLimiter(rate=1_000_000)
+    limiter.global_bucket.burst = 65536
+
+    async with DeviceEmulator(platform, root=str(tmp_path / "flash")) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn, bandwidth_limiter=limiter)
+            put_result = await transfer.file_transfer("put", data, "image.bin")
+            buffer = bytearray()
+            get_result = await transfer.file_transfer(
+                "get", "image.bin", buffer, bandwidth=TokenBucket(1e6, burst=65536)
+            )
+
+    assert (put_result.transferred, put_result.verified) == (True, True)
+    assert (get_result.transferred, get_result.verified) == (True, True)
+    assert buffer == data
+    # the first 64 KiB pass at once
+    assert put_result.timings.transfer > 0.2
+    assert get_result.timings.transfer > 0.2
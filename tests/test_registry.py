@@ -0,0 +1,63 @@
+import sys
+from importlib import metadata
+from unittest import mock
+
+import pytest
+from scrapli.driver.core import AsyncIOSXEDriver
+
+from scrapli_transfer_utils.async_transfer.asyncscp.cisco_iosxe import AsyncSCPIOSXE
+from scrapli_transfer_utils.exceptions import ScrapliSCPException
+from scrapli_transfer_utils.registry import DEFAULT_REGISTRY, PlatformRegistry
+
+
+class CustomIOSXEDriver(AsyncIOSXEDriver):
+    pass
+
+
+class CustomSCPIOSXE(AsyncSCPIOSXE):
+    pass
+
+
+def test_registry_follows_class_hierarchy():
+    assert DEFAULT_REGISTRY.get(CustomIOSXEDriver) is AsyncSCPIOSXE
+    assert DEFAULT_REGISTRY.get(object) is None
+
+
+def test_registry_closest_base_wins():
+    registry = PlatformRegistry(entry_point_group=None)
+    registry.register(AsyncIOSXEDriver, AsyncSCPIOSXE)
+    registry.register(f"{__name__}.CustomIOSXEDriver", f"{__name__}:CustomSCPIOSXE")
+
+    assert registry.get(CustomIOSXEDriver) is CustomSCPIOSXE
+    assert registry.get(AsyncIOSXEDriver) is AsyncSCPIOSXE
+
+
+def test_registry_imports_lazily_and_caches():
+    registry = PlatformRegistry(entry_point_group=None)
+    registry.register(AsyncIOSXEDriver, "not_a_module.feature:Feature")
+    registry.register("not_a_module.Driver", "not_a_module.feature:Feature")
+
+    with pytest.raises(ScrapliSCPException):
+        registry.get(AsyncIOSXEDriver)
+
+    registry.register(AsyncIOSXEDriver, AsyncSCPIOSXE)
+    with mock.patch.object(registry, "_lookup", wraps=registry._lookup) as lookup:
+        assert registry.get(AsyncIOSXEDriver) is AsyncSCPIOSXE
+        assert registry.get(AsyncIOSXEDriver) is AsyncSCPIOSXE
+    assert lookup.call_count == 1
+    assert "not_a_module" not in sys.modules
+
+
+def test_registry_entry_points():
+    registry = PlatformRegistry()
+    entry_point = metadata.EntryPoint(
+        name=f"{__name__}.CustomIOSXEDriver",
+        value=f"{__name__}:CustomSCPIOSXE",
+        group="scrapli_transfer_utils.platforms",
+    )
+
+    with mock.patch.object(metadata, "entry_points", return_value=[entry_point]) as entry_points:
+        assert registry.get(CustomIOSXEDriver) is CustomSCPIOSXE
+        assert registry.get(object) is None
+    entry_points.assert_called_once_with(group="scrapli_transfer_utils.platforms")
+
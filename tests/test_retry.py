@@ -0,0 +1,172 @@
+import io
+import os
+from unittest import mock
+
+import pytest
+from emulator import DeviceEmulator
+from scrapli import AsyncScrapli
+
+from scrapli_transfer_utils.dataclasses import RetryPolicy
+from scrapli_transfer_utils.exceptions import TransferPermissionError
+from scrapli_transfer_utils.factory import AsyncSrapliTransferUtils
+from scrapli_transfer_utils.hashing import hash_file
+from scrapli_transfer_utils.local import LocalSink
+
+NO_DELAY = RetryPolicy(max_attempts=3, base_delay=0.0)
+
+
+def test_retry_policy_delay():
+    retry = RetryPolicy(base_delay=1.0, max_delay=5.0, multiplier=2.0, jitter=0.0)
+
+    assert [retry.delay(retry_number) for retry_number in range(1, 5)] == [1.0, 2.0, 4.0, 5.0]
+
+
+def test_retry_policy_jitter():
+    retry = RetryPolicy(base_delay=2.0, jitter=0.5)
+
+    with mock.patch("random.random", side_effect=[0.0, 1.0]):
+        assert (retry.delay(1), retry.delay(1)) == (2.0, 1.0)
+
+
+@pytest.mark.parametrize("platform", ["cisco_iosxe", "huawei_vrp"])
+async def test_retry_reruns_only_transfer(tmp_path, platform):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(100_000))
+
+    async with DeviceEmulator(platform, root=str(tmp_path / "flash")) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn, local_hash_cache=None)
+            async_file_transfer = transfer._async_file_transfer
+            attempts = []
+
+            async def _async_file_transfer(*args, **kwargs):
+                attempts.append(kwargs["resume"])
+                if len(attempts) == 1:
+                    raise ConnectionResetError("Connection reset by peer")
+                return await async_file_transfer(*args, **kwargs)
+
+            with mock.patch.object(
+                transfer, "_async_file_transfer", side_effect=_async_file_transfer
+            ), mock.patch.object(
+                transfer, "check_local_file", wraps=transfer.check_local_file
+            ) as check_local_file:
+                result = await transfer.file_transfer("put", str(src), "image.bin", retry=NO_DELAY)
+
+    assert (result.transferred, result.verified, result.retries) == (True, True, 1)
+    # put can't continue from the partial device file
+    assert attempts == [False, False]
+    check_local_file.assert_called_once()
+
+
+async def test_retry_resumes_get(tmp_path):
+    data = os.urandom(1_000_000)
+    (tmp_path / "flash").mkdir()
+    (tmp_path / "flash" / "image.bin").write_bytes(data)
+    dst = tmp_path / "dst.bin"
+    failed = []
+
+    def _progress_handler(src, dst, done, total):
+        if not failed and done > total // 2:
+            failed.append(done)
+            raise ConnectionResetError("Connection reset by peer")
+
+    async with DeviceEmulator("huawei_vrp", root=str(tmp_path / "flash")) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn)
+            with mock.patch.object(
+                transfer, "_resume_offset", wraps=transfer._resume_offset
+            ) as resume_offset:
+                result = await transfer.file_transfer(
+                    "get",
+                    "image.bin",
+                    str(dst),
+                    retry=NO_DELAY,
+                    progress_handler=_progress_handler,
+                )
+
+    assert (result.transferred, result.verified, result.retries) == (True, True, 1)
+    assert result.bytes_transferred < len(data)
+    # the received part is not read back from the device
+    resume_offset.assert_not_called()
+    assert hash_file(str(dst)) == hash_file(str(tmp_path / "flash" / "image.bin"))
+
+
+class _Writer(io.RawIOBase):
+    """Writable stream which can't seek"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+@pytest.mark.parametrize("platform", ["cisco_iosxe", "huawei_vrp"])
+@pytest.mark.parametrize("seekable", [True, False])
+async def test_retry_get_into_stream(tmp_path, platform, seekable):
+    data = os.urandom(500_000)
+    (tmp_path / "flash").mkdir()
+    (tmp_path / "flash" / "image.bin").write_bytes(data)
+    stream = io.BytesIO(b"header")
+    stream.seek(0, io.SEEK_END)
+    writer = _Writer()
+    write_at = LocalSink.write_at
+    writes = []
+
+    async def _write_at(sink, offset, block):
+        writes.append(offset)
+        if len(writes) == 3:
+            raise ConnectionResetError("Connection reset by peer")
+        await write_at(sink, offset, block)
+
+    async with DeviceEmulator(platform, root=str(tmp_path / "flash")) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn)
+            with mock.patch.object(LocalSink, "write_at", _write_at):
+                if seekable:
+                    result = await transfer.file_transfer(
+                        "get", "image.bin", stream, retry=NO_DELAY
+                    )
+                else:
+                    # VRP raises it as TransferConnectionError
+                    with pytest.raises(ConnectionError):
+                        await transfer.file_transfer("get", "image.bin", writer, retry=NO_DELAY)
+
+    if seekable:
+        assert (result.transferred, result.verified, result.retries) == (True, True, 1)
+        # the second attempt replaced the data of the first one
+        assert len(stream.getvalue()) == len(b"header") + len(data)
+        assert stream.getvalue() == b"header" + data
+    else:
+        # written blocks can't be taken back, the transfer is not retried
+        assert writes.count(0) == 1
+
+
+@pytest.mark.parametrize(
+    "error, retry, attempts",
+    [
+        (ConnectionRefusedError("Connection refused"), None, 1),
+        (ConnectionRefusedError("Connection refused"), NO_DELAY, 3),
+        (TransferPermissionError("put", "a", "b", "Permission denied"), NO_DELAY, 1),
+        (
+            TransferPermissionError("put", "a", "b", "Permission denied"),
+            RetryPolicy(base_delay=0.0, retry_on=(TransferPermissionError,)),
+            3,
+        ),
+    ],
+)
+async def test_retry_gives_up(tmp_path, error, retry, attempts):
+    async with DeviceEmulator("huawei_vrp", root=str(tmp_path / "flash")) as device:
+        async with AsyncScrapli(**device.scrapli_kwargs()) as conn:
+            transfer = AsyncSrapliTransferUtils(conn)
+            with mock.patch.object(
+                transfer, "_async_file_transfer", side_effect=error
+            ) as async_file_transfer:
+                with pytest.raises(type(error)):
+                    await transfer.file_transfer("put", b"data", "data.txt", retry=retry)
+
+    assert async_file_transfer.call_count == attempts
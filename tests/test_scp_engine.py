@@ -0,0 +1,38 @@
+import os
+
+import asyncssh
+import pytest
+
+from scrapli_transfer_utils.async_transfer.asyncscp.engine import scp_get, scp_put
+
+
+@pytest.mark.parametrize("size", [0, 1, 65536, 300_001])
+async def test_scp_put_get(ssh_connection, tmp_path, size):
+    conn, root = ssh_connection
+    data = os.urandom(size)
+    src = tmp_path / "src.bin"
+    src.write_bytes(data)
+    progress = []
+
+    written = await scp_put(
+        conn,
+        str(src),
+        "image.bin",
+        block_size=8192,
+        window=262144,
+        max_pktsize=32768,
+        progress_handler=lambda *args: progress.append(args),
+    )
+    read = await scp_get(conn, "image.bin", str(tmp_path / "dst.bin"))
+
+    assert written == read == size
+    assert (root / "image.bin").read_bytes() == data
+    assert (tmp_path / "dst.bin").read_bytes() == data
+    assert progress[-1][2:] == (size, size)
+
+
+async def test_scp_get_missing_file(ssh_connection, tmp_path):
+    conn, _ = ssh_connection
+
+    with pytest.raises(asyncssh.SFTPNoSuchFile):
+        await scp_get(conn, "missing.bin", str(tmp_path / "dst.bin"))
@@ -0,0 +1,189 @@
+import os
+
+import asyncssh
+import pytest
+
+from scrapli_transfer_utils.async_transfer.asyncsftp.engine import (
+    AutoTuner,
+    sftp_get,
+    sftp_put,
+    sftp_resume_offset,
+    transfer_error,
+)
+from scrapli_transfer_utils.dataclasses import TransferTuning
+from scrapli_transfer_utils.exceptions import TransferFileNotFoundError
+
+
+@pytest.fixture()
+async def sftp_client(ssh_connection):
+    conn, root = ssh_connection
+    async with conn.start_sftp_client() as sftp:
+        yield sftp, root
+
+
+@pytest.mark.parametrize("size", [0, 1, 8191, 8192, 100_001])
+async def test_sftp_put_get(sftp_client, tmp_path, size):
+    sftp, root = sftp_client
+    data = os.urandom(size)
+    src = tmp_path / "src.bin"
+    src.write_bytes(data)
+    progress = []
+
+    written = await sftp_put(
+        sftp,
+        str(src),
+        "image.bin",
+        tuning=TransferTuning(block_size=8192, max_requests=4),
+        progress_handler=lambda *args: progress.append(args),
+    )
+    read = await sftp_get(
+        sftp,
+        "image.bin",
+        str(tmp_path / "dst.bin"),
+        tuning=TransferTuning(block_size=3000, max_requests=3),
+    )
+
+    assert written == read == size
+    assert (root / "image.bin").read_bytes() == data
+    assert (tmp_path / "dst.bin").read_bytes() == data
+    assert progress[-1] == (str(src), "image.bin", size, size)
+
+
+async def test_sftp_get_missing_file(sftp_client, tmp_path):
+    sftp, _ = sftp_client
+
+    with pytest.raises(asyncssh.SFTPNoSuchFile) as exc_info:
+        await sftp_get(sftp, "missing.bin", str(tmp_path / "dst.bin"))
+
+    error = transfer_error(exc_info.value, "get", "missing.bin", "dst.bin")
+    assert isinstance(error, TransferFileNotFoundError)
+    assert not (tmp_path / "dst.bin").exists()
+
+
+async def test_sftp_put_get_auto_tune(sftp_client, tmp_path):
+    sftp, root = sftp_client
+    data = os.urandom(500_001)
+    src = tmp_path / "src.bin"
+    src.write_bytes(data)
+    tuning = TransferTuning(block_size=1000, max_requests=2, auto_tune=True)
+
+    assert await sftp_put(sftp, str(src), "image.bin", tuning=tuning) == len(data)
+    assert await sftp_get(sftp, "image.bin", str(tmp_path / "dst.bin"), tuning) == len(data)
+
+    assert (root / "image.bin").read_bytes() == data
+    assert (tmp_path / "dst.bin").read_bytes() == data
+
+
+def test_auto_tuner_grows_while_latency_is_flat():
+    tuner = AutoTuner(
+        TransferTuning(block_size=1000, max_requests=2, auto_tune=True, max_auto_requests=4),
+        max_block_size=3000,
+    )
+    for _ in range(2):
+        tuner.request_done(0.01)
+    assert (tuner.max_requests, tuner.block_size) == (4, 1000)
+    for _ in range(4):
+        tuner.request_done(0.01)
+    assert (tuner.max_requests, tuner.block_size) == (4, 2000)
+    for _ in range(8):
+        tuner.request_done(0.01)
+    # limited by the server
+    assert (tuner.max_requests, tuner.block_size) == (4, 3000)
+
+
+def test_auto_tuner_stops_when_replies_queue_up():
+    tuner = AutoTuner(TransferTuning(max_requests=2, auto_tune=True), max_block_size=65536)
+    tuner.request_done(0.01)
+    tuner.request_done(0.05)
+    for _ in range(10):
+        tuner.request_done(0.01)
+    assert (tuner.max_requests, tuner.block_size) == (2, 65536)
+
+
+def test_auto_tuner_disabled():
+    tuner = AutoTuner(TransferTuning(max_requests=2), max_block_size=65536)
+    for _ in range(10):
+        tuner.request_done(0.01)
+    assert tuner.max_requests == 2
+
+
+async def test_sftp_put_resume(sftp_client, tmp_path):
+    sftp, root = sftp_client
+    data = os.urandom(200_000)
+    src = tmp_path / "src.bin"
+    src.write_bytes(data)
+    (root / "image.bin").write_bytes(data[:150_000])
+
+    offset = await sftp_resume_offset(sftp, "put", str(src), "image.bin")
+    written = await sftp_put(sftp, str(src), "image.bin", offset=offset)
+
+    assert offset == 150_000
+    assert written == len(data)
+    assert (root / "image.bin").read_bytes() == data
+
+
+async def test_sftp_get_resume(sftp_client, tmp_path):
+    sftp, root = sftp_client
+    data = os.urandom(200_000)
+    (root / "image.bin").write_bytes(data)
+    dst = tmp_path / "dst.bin"
+    dst.write_bytes(data[:1000])
+
+    offset = await sftp_resume_offset(sftp, "get", "image.bin", str(dst))
+    read = await sftp_get(sftp, "image.bin", str(dst), offset=offset)
+
+    assert offset == 1000
+    assert read == len(data)
+    assert dst.read_bytes() == data
+
+
+@pytest.mark.parametrize(
+    "partial",
+    [b"", b"x" * 1000, None],
+    ids=["empty", "mismatch", "missing"],
+)
+async def test_sftp_resume_offset_start_over(sftp_client, tmp_path, partial):
+    sftp, root = sftp_client
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(200_000))
+    if partial is not None:
+        (root / "image.bin").write_bytes(partial)
+
+    assert await sftp_resume_offset(sftp, "put", str(src), "image.bin") == 0
+
+
+async def test_sftp_resume_offset_compares_whole_prefix(sftp_client, tmp_path):
+    sftp, root = sftp_client
+    data = os.urandom(3_000_000)
+    src = tmp_path / "src.bin"
+    src.write_bytes(data)
+    # differs only in the middle of the partial file
+    (root / "image.bin").write_bytes(data[:1_000_000] + b"x" + data[1_000_001:2_500_000])
+
+    whole = await sftp_resume_offset(sftp, "put", str(src), "image.bin", verify_size=None)
+    assert whole == 0
+    # only the start and the end are compared by default
+    assert await sftp_resume_offset(sftp, "put", str(src), "image.bin") == 2_500_000
+
+
+async def test_sftp_get_failure_keeps_contiguous_prefix(sftp_client, tmp_path):
+    sftp, root = sftp_client
+    (root / "image.bin").write_bytes(os.urandom(100_000))
+    dst = tmp_path / "dst.bin"
+
+    def _fail(src, dst, received, total):
+        if received >= 50_000:
+            raise ConnectionError("link down")
+
+    with pytest.raises(ConnectionError):
+        await sftp_get(
+            sftp,
+            "image.bin",
+            str(dst),
+            TransferTuning(block_size=10_000, max_requests=4),
+            progress_handler=_fail,
+        )
+
+    partial = dst.read_bytes()
+    assert 0 < len(partial) < 100_000
+    assert partial == (root / "image.bin").read_bytes()[: len(partial)]
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import threading
+from unittest import mock
+
+import pytest
+from emulator import DeviceEmulator
+
+from scrapli_transfer_utils.dataclasses import BulkTransferSpec
+from scrapli_transfer_utils.sync import BackgroundLoop, SyncTransferUtils
+
+
+@pytest.fixture()
+def background_loop():
+    loop = BackgroundLoop()
+    yield loop
+    loop.stop()
+
+
+@pytest.fixture()
+def emulators(background_loop):
+    devices = [DeviceEmulator(platform) for platform in ("cisco_iosxe", "huawei_vrp")]
+    for device in devices:
+        background_loop.run(device.start())
+    yield devices
+    for device in devices:
+        background_loop.run(device.stop())
+
+
+def test_background_loop_runs_in_thread(background_loop):
+    async def thread_name():
+        return threading.current_thread().name
+
+    assert background_loop.run(thread_name()) == "scrapli-transfer-loop"
+    assert background_loop.submit(thread_name()).result() == "scrapli-transfer-loop"
+
+
+def test_background_loop_stop_cancels_tasks():
+    loop = BackgroundLoop()
+    started = threading.Event()
+    cancelled = []
+
+    async def sleep():
+        started.set()
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    future = loop.submit(sleep())
+    assert started.wait(5)
+    event_loop = loop._loop
+    loop.stop()
+
+    assert cancelled == [True]
+    assert future.cancelled()
+    assert event_loop.is_closed()
+
+
+def test_sync_file_transfer(tmp_path, background_loop, emulators):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(100_000))
+
+    with SyncTransferUtils(background_loop=background_loop) as transfer:
+        futures = [
+            transfer.file_transfer(device.scrapli_kwargs(), "put", str(src), "image.bin")
+            for device in emulators
+        ]
+        results = [future.result(timeout=30) for future in futures]
+        # second transfer reuses the connection
+        again = transfer.file_transfer(emulators[0].scrapli_kwargs(), "put", str(src), "image.bin")
+        assert again.result(timeout=30).verified
+        assert len(transfer._connections) == 2
+
+    assert all(result.transferred and result.verified for result in results)
+    assert not transfer._connections
+    with pytest.raises(RuntimeError):
+        transfer.file_transfer(emulators[0].scrapli_kwargs(), "put", str(src))
+
+
+def test_sync_file_transfer_error_reconnects(tmp_path, background_loop, emulators):
+    device = emulators[1].scrapli_kwargs()
+
+    with SyncTransferUtils(background_loop=background_loop) as transfer:
+        failed = transfer.file_transfer(device, "put", str(tmp_path / "missing.bin"), verify=False)
+        with pytest.raises(Exception):
+            failed.result(timeout=30)
+        assert transfer._connections[next(iter(transfer._connections))].conn is None
+
+        (tmp_path / "src.bin").write_bytes(b"config")
+        result = transfer.file_transfer(device, "put", str(tmp_path / "src.bin")).result(timeout=30)
+
+    assert result.transferred
+
+
+def test_sync_bulk_file_transfer(tmp_path, background_loop, emulators):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(10_000))
+
+    with SyncTransferUtils(background_loop=background_loop) as transfer:
+        stats = transfer.bulk_file_transfer(
+            [device.scrapli_kwargs() for device in emulators], BulkTransferSpec("put", str(src))
+        ).result(timeout=30)
+
+    assert stats.transferred == 2
+
+
+def test_sync_transfer_utils_own_loop():
+    transfer = SyncTransferUtils()
+    transfer.close()
+
+    assert transfer.background_loop._thread is None
+
+
+@pytest.mark.parametrize("wait_futures, cancel_futures", [(False, False), (True, True)])
+def test_sync_transfer_utils_close_cancels_before_closing(
+    background_loop, wait_futures, cancel_futures
+):
+    transfer = SyncTransferUtils(background_loop=background_loop)
+    started = threading.Event()
+    events = []
+
+    async def transfer_file():
+        started.set()
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+
+    async def close():
+        events.append("closed")
+
+    transfer._connections["device"] = mock.Mock(close=close)
+    future = transfer._submit(transfer_file())
+    assert started.wait(5)
+    transfer.close(wait_futures=wait_futures, cancel_futures=cancel_futures)
+
+    assert future.cancelled()
+    # the connection is closed after the transfer using it ended
+    assert events == ["cancelled", "closed"]